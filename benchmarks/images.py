@@ -0,0 +1,32 @@
+import math
+
+import cv2
+import numpy as np
+
+# Encoder names accepted by the benchmarks, mapped to OpenCV extensions
+FORMATS = {"jpeg": ".jpg", "png": ".png", "webp": ".webp"}
+
+
+def synthetic_image(megapixels: float, seed: int = 0) -> np.ndarray:
+    """4:3 BGR image with smooth gradients, shapes and text so codecs and filters do real work"""
+    width = int(math.sqrt(megapixels * 1e6 * 4 / 3))
+    height = int(width * 3 / 4)
+    rng = np.random.default_rng(seed)
+
+    coarse = rng.integers(0, 256, (max(height // 64, 2), max(width // 64, 2), 3), dtype=np.uint8)
+    image = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+    scale = width / 1000
+    for _ in range(40):
+        color = tuple(int(v) for v in rng.integers(0, 256, 3))
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        cv2.circle(image, center, int(rng.integers(5, 100) * scale) + 1, color, -1)
+        cv2.putText(image, "IMAGE API", center, cv2.FONT_HERSHEY_SIMPLEX, scale, color[::-1], max(int(scale * 2), 1))
+    return image
+
+
+def encode(image: np.ndarray, image_format: str) -> bytes:
+    """Encode an image in one of FORMATS"""
+    ok, buffer = cv2.imencode(FORMATS[image_format], image)
+    if not ok:
+        raise ValueError(f"Could not encode {image_format}")
+    return buffer.tobytes()
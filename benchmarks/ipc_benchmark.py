@@ -0,0 +1,93 @@
+"""Compare moving images to worker processes by pickling vs through shared memory.
+
+Each case sends one image to a worker and gets a same-sized image back:
+``echo`` returns the input unchanged (pure transport cost), ``flip`` does a
+cheap real transform. ``pickle`` uses a plain spawn ProcessPoolExecutor;
+``shared`` uses SharedArrayWorkers with its recycled segment pool.
+
+Examples:
+    python -m benchmarks.ipc_benchmark
+    python -m benchmarks.ipc_benchmark --sizes 2,12 --output ipc.json
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.images import synthetic_image
+from benchmarks.run_benchmarks import measure, summarize
+from src.core.image_processor import ImageAnalyzer
+from src.core.shared_pool import SharedArrayWorkers, sweep_orphaned_segments
+
+DEFAULT_SIZES = (2, 12, 48)
+
+
+def echo(image: np.ndarray) -> np.ndarray:
+    return image
+
+
+def flip(image: np.ndarray) -> np.ndarray:
+    return ImageAnalyzer.flip_image(image, "horizontal")
+
+
+def run(args) -> dict:
+    """Time every transport and operation at each size"""
+    results = {}
+    # Segments left behind by an earlier run that was killed
+    sweep_orphaned_segments()
+    pickling = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+    shared = SharedArrayWorkers(max_workers=1)
+    transports = {
+        "pickle": lambda fn, image: pickling.submit(fn, image).result(),
+        "shared": lambda fn, image: shared.submit(fn, image).result()
+    }
+    try:
+        for size in args.sizes:
+            image = synthetic_image(size)
+            megapixels = image.shape[0] * image.shape[1] / 1e6
+            for operation in (echo, flip):
+                for transport, call in transports.items():
+                    name = f"{operation.__name__}[{transport}] @{size}MP"
+                    samples = measure(lambda: call(operation, image), args.min_time, args.min_iterations,
+                                      args.max_iterations)
+                    # Peak memory is not comparable across processes; report transport throughput instead
+                    result = summarize(samples, megapixels, 0)
+                    del result["peak_memory_mb"]
+                    result["megabytes_per_second"] = 2 * image.nbytes / 2 ** 20 / (result["mean_ms"] / 1000)
+                    results[name] = result
+                    print(f"{name:30s} p50 {result['p50_ms']:9.2f} ms  "
+                          f"{result['megabytes_per_second']:8.0f} MB/s round trip", file=sys.stderr)
+                pickled = results[f"{operation.__name__}[pickle] @{size}MP"]["p50_ms"]
+                sharing = results[f"{operation.__name__}[shared] @{size}MP"]["p50_ms"]
+                print(f"{operation.__name__} @{size}MP: shared memory {pickled / sharing:.1f}x faster", file=sys.stderr)
+    finally:
+        pickling.shutdown()
+        shared.shutdown()
+    return {"results": results, "segments": shared.stats()}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda value: [float(v) for v in value.split(",")],
+                        default=list(DEFAULT_SIZES), help="image sizes in megapixels (default: 2,12,48)")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to spend per case")
+    parser.add_argument("--min-iterations", type=int, default=5)
+    parser.add_argument("--max-iterations", type=int, default=100)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run(args)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
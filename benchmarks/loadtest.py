@@ -0,0 +1,277 @@
+"""Drive the API with a weighted mix of requests at rising concurrency and report where it saturates.
+
+Each concurrency level runs that many closed-loop clients for ``--duration``
+seconds; every client picks an operation by weight, sends a pre-encoded
+synthetic image and immediately sends the next request. Without ``--url``
+the app from main.py runs in-process over an ASGI transport (with its
+lifespan); with ``--url`` the requests go to a running server, so uvicorn
+worker counts and settings can be compared on one machine.
+
+The saturation point is the first level whose goodput (successful requests
+per second; fast 503 rejections would inflate raw throughput) gains less
+than ``--min-gain`` over the previous one, or whose error rate exceeds
+``--max-error-rate``; the level before it is the useful concurrency.
+
+Examples:
+    python -m benchmarks.loadtest --concurrency 1,2,4,8,16 --output load.json
+    python -m benchmarks.loadtest --mix analyze=50,resize=50 --sizes 12 --duration 20
+    uvicorn main:app --workers 4 & python -m benchmarks.loadtest --url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+from benchmarks.images import FORMATS, encode, synthetic_image
+from benchmarks.run_benchmarks import percentile
+
+DEFAULT_MIX = {"analyze": 70, "resize": 20, "crop": 10}
+DEFAULT_SIZES = (0.3, 2)
+DEFAULT_CONCURRENCY = (1, 2, 4, 8, 16)
+# Distinct images per size, so an enabled result cache does not answer every request
+IMAGE_VARIANTS = 4
+
+
+class Payload:
+    """One encoded test image and its dimensions"""
+
+    __slots__ = ("content", "filename", "width", "height")
+
+    def __init__(self, content: bytes, filename: str, width: int, height: int):
+        self.content = content
+        self.filename = filename
+        self.width = width
+        self.height = height
+
+
+def operation_request(operation: str, payload: Payload) -> tuple:
+    """(path, query params) of one request"""
+    if operation == "analyze":
+        return "/analyze", None
+    if operation == "resize":
+        return "/resize", {"width": max(payload.width // 2, 1), "height": max(payload.height // 2, 1)}
+    if operation == "crop":
+        return "/crop", {"x": payload.width // 4, "y": payload.height // 4,
+                         "width": payload.width // 2, "height": payload.height // 2}
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def make_payloads(sizes: list, image_format: str) -> list:
+    payloads = []
+    for size in sizes:
+        for seed in range(IMAGE_VARIANTS):
+            image = synthetic_image(size, seed)
+            payloads.append(Payload(encode(image, image_format), f"load{FORMATS[image_format]}",
+                                    image.shape[1], image.shape[0]))
+    return payloads
+
+
+def summarize_level(concurrency: int, elapsed: float, samples: list) -> dict:
+    """Throughput, latency percentiles and errors of one level from (operation, seconds, status) samples"""
+    latencies = [seconds for _, seconds, _ in samples]
+    statuses = Counter(str(status) for _, _, status in samples)
+    errors = sum(1 for _, _, status in samples if not (isinstance(status, int) and status < 400))
+
+    def latency(values: list) -> dict:
+        if not values:
+            return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+        return {f"p{int(q * 100)}_ms": round(percentile(values, q) * 1000, 3) for q in (0.50, 0.95, 0.99)}
+
+    operations = {}
+    for operation in sorted({operation for operation, _, _ in samples}):
+        own = [(seconds, status) for op, seconds, status in samples if op == operation]
+        operations[operation] = {
+            "requests": len(own),
+            "errors": sum(1 for _, status in own if not (isinstance(status, int) and status < 400)),
+            **latency([seconds for seconds, _ in own])
+        }
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+        "goodput_rps": round((len(samples) - errors) / elapsed, 3) if elapsed else 0.0,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        **latency(latencies),
+        "statuses": dict(statuses),
+        "operations": operations
+    }
+
+
+def saturation_point(levels: list, min_gain: float, max_error_rate: float) -> dict:
+    """First level that adds under ``min_gain`` goodput (successful requests/s) or exceeds the error budget"""
+    best = None
+    for previous, level in zip([None] + levels, levels):
+        if level["error_rate"] > max_error_rate:
+            reason = "error_rate"
+        elif previous is not None and level["goodput_rps"] < previous["goodput_rps"] * (1 + min_gain):
+            reason = "throughput_plateau"
+        else:
+            best = level
+            continue
+        return {
+            "saturated_at": level["concurrency"],
+            "reason": reason,
+            "useful_concurrency": best["concurrency"] if best else None,
+            "goodput_rps": best["goodput_rps"] if best else None
+        }
+    return {
+        "saturated_at": None,
+        "reason": "not_reached",
+        "useful_concurrency": best["concurrency"] if best else None,
+        "goodput_rps": best["goodput_rps"] if best else None
+    }
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, duration: float, mix: dict,
+                    payloads: list, rng: random.Random) -> dict:
+    """Run ``concurrency`` closed-loop clients for ``duration`` seconds"""
+    operations = list(mix)
+    weights = list(mix.values())
+    samples = []
+    deadline = time.perf_counter() + duration
+
+    async def client_loop():
+        while time.perf_counter() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            payload = rng.choice(payloads)
+            path, params = operation_request(operation, payload)
+            files = {"file": (payload.filename, payload.content, "application/octet-stream")}
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, params=params, files=files)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            samples.append((operation, time.perf_counter() - start, status))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return summarize_level(concurrency, time.perf_counter() - start, samples)
+
+
+async def run(args) -> dict:
+    """Run every concurrency level and return the report"""
+    payloads = make_payloads(args.sizes, args.format)
+    rng = random.Random(args.seed)
+    levels = []
+
+    async def sweep(client):
+        for concurrency in args.concurrency:
+            level = await run_level(client, concurrency, args.duration, args.mix, payloads, rng)
+            levels.append(level)
+            print(f"concurrency {concurrency:4d}  {level['goodput_rps']:8.1f} ok/s  "
+                  f"p50 {level['p50_ms'] or 0:9.2f} ms  p99 {level['p99_ms'] or 0:9.2f} ms  "
+                  f"errors {level['error_rate']:.1%}", file=sys.stderr)
+
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        limits = httpx.Limits(max_connections=max(args.concurrency))
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits) as client:
+            await sweep(client)
+    else:
+        await run_in_process(sweep, timeout, args.with_cache)
+
+    return {
+        "config": {
+            "target": args.url or "in-process",
+            "mix": args.mix,
+            "sizes_mp": args.sizes,
+            "format": args.format,
+            "duration_s": args.duration,
+            "concurrency": args.concurrency,
+            "with_cache": args.with_cache
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "max_workers": os.environ.get("IMAGE_API_MAX_WORKERS")
+        },
+        "levels": levels,
+        "saturation": saturation_point(levels, args.min_gain, args.max_error_rate)
+    }
+
+
+async def run_in_process(sweep, timeout: httpx.Timeout, with_cache: bool):
+    """Run ``sweep`` against main.app over an ASGI transport, inside the app's lifespan"""
+    from main import app
+    from src.core import similarity
+    from src.utils import cache, storage
+
+    # Per-request INFO logs would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        storage._store = storage.OutputStore(Path(directory))
+        similarity._index = similarity.PersistentHashIndex(Path(directory) / "index.npz", save_every=0)
+        if not with_cache:
+            cache._cache = cache.ResultCache(memory_bytes=0, disk_bytes=0)
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=timeout) as client:
+                await sweep(client)
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        operation, _, weight = part.partition("=")
+        operation = operation.strip()
+        if operation not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation: {operation} (use {', '.join(DEFAULT_MIX)})")
+        try:
+            mix[operation] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"bad weight for {operation}: {weight!r}")
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError("at least one weight must be positive")
+    return mix
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server (default: main.app in-process)")
+    parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX),
+                        help="operation weights (default: analyze=70,resize=20,crop=10)")
+    parser.add_argument("--sizes", type=lambda value: [float(v) for v in value.split(",")],
+                        default=list(DEFAULT_SIZES), help="image sizes in megapixels (default: 0.3,2)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="jpeg", help="upload encoding")
+    parser.add_argument("--concurrency", type=lambda value: [int(v) for v in value.split(",")],
+                        default=list(DEFAULT_CONCURRENCY), help="client counts to sweep (default: 1,2,4,8,16)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--min-gain", type=float, default=0.1,
+                        help="throughput gain a level must add to count as unsaturated (default: 0.1)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="error budget per level (default: 0.01)")
+    parser.add_argument("--with-cache", action="store_true", help="keep the result cache enabled (in-process only)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the request mix")
+    parser.add_argument("--output", type=Path, help="write the report as JSON (default: stdout)")
+    args = parser.parse_args(argv)
+    if any(concurrency < 1 for concurrency in args.concurrency):
+        parser.error("concurrency levels must be positive")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    document = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(document)
+    else:
+        print(document)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
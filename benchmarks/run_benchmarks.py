@@ -0,0 +1,257 @@
+"""Benchmark ImageAnalyzer and the HTTP endpoints, and compare against a baseline.
+
+Examples:
+    python -m benchmarks.run_benchmarks --output benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/baseline.json --threshold 0.15
+    python -m benchmarks.run_benchmarks --sizes 0.3,2 --formats jpeg --only analyze
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from benchmarks.images import FORMATS, encode, synthetic_image
+from src.core.image_processor import FILTER_TYPES, ImageAnalyzer
+
+DEFAULT_SIZES = (0.3, 2, 12, 48)
+DEFAULT_FORMATS = ("jpeg", "png", "webp")
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """Linear-interpolated percentile of a list of samples"""
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples: list, megapixels: float, peak_bytes: int) -> dict:
+    """Latency percentiles, throughput and peak memory of one case"""
+    mean = statistics.fmean(samples)
+    return {
+        "iterations": len(samples),
+        "mean_ms": mean * 1000,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "ops_per_second": 1 / mean if mean else 0.0,
+        "megapixels_per_second": megapixels / mean if mean else 0.0,
+        "peak_memory_mb": peak_bytes / 2 ** 20
+    }
+
+
+def measure(fn, min_time: float, min_iterations: int, max_iterations: int) -> list:
+    """Call ``fn`` repeatedly and return per-call latencies in seconds"""
+    fn()  # warm-up
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_iterations and (len(samples) < min_iterations or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def peak_memory(fn) -> int:
+    """Peak traced allocation (NumPy/OpenCV output buffers included) of one call"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def analyzer_cases(image: np.ndarray) -> dict:
+    """One callable per ImageAnalyzer method (each filter separately)"""
+    height, width = image.shape[:2]
+    cases = {
+        "calculate_blur_score": lambda: ImageAnalyzer.calculate_blur_score(image),
+        "calculate_brightness": lambda: ImageAnalyzer.calculate_brightness(image),
+        "calculate_contrast": lambda: ImageAnalyzer.calculate_contrast(image),
+        "count_objects": lambda: ImageAnalyzer.count_objects(image),
+        "detect_objects[count]": lambda: ImageAnalyzer.detect_objects(image, boxes=False),
+        "detect_objects[boxes]": lambda: ImageAnalyzer.detect_objects(image),
+        "analyze_all": lambda: ImageAnalyzer.analyze_all(image),
+        "get_quality_rating": lambda: ImageAnalyzer.get_quality_rating(60, 60, 60),
+        "enhance_image": lambda: ImageAnalyzer.enhance_image(image),
+        "enhance_image[auto_levels]": lambda: ImageAnalyzer.enhance_image(image, mode="auto_levels"),
+        "enhance_image[clahe]": lambda: ImageAnalyzer.enhance_image(image, mode="clahe"),
+        "resize_image": lambda: ImageAnalyzer.resize_image(image, 640, 480),
+        "resize_by_percentage": lambda: ImageAnalyzer.resize_by_percentage(image, 50),
+        "crop_image": lambda: ImageAnalyzer.crop_image(image, width // 4, height // 4, width // 2, height // 2),
+        "rotate_image": lambda: ImageAnalyzer.rotate_image(image, 30),
+        "flip_image": lambda: ImageAnalyzer.flip_image(image, "horizontal"),
+    }
+    for filter_type in FILTER_TYPES:
+        cases[f"apply_filter[{filter_type}]"] = lambda f=filter_type: ImageAnalyzer.apply_filter(image, f)
+    return cases
+
+
+def decode_cases(content: bytes) -> dict:
+    """Decode-path callables for one encoded file"""
+    return {
+        "read_image": lambda: ImageAnalyzer.read_image(content),
+        "read_image[thumbnail]": lambda: ImageAnalyzer.read_image(content, target_size=(320, 240)),
+        "probe_size": lambda: ImageAnalyzer.probe_size(content),
+    }
+
+
+class HttpBench:
+    """In-process ASGI client for /analyze, /resize and /crop"""
+
+    def __init__(self, use_cache: bool):
+        import httpx
+
+        from main import app
+        from src.core import similarity
+        from src.utils import cache, storage
+
+        # Per-request INFO logs would dominate the small-image timings
+        logging.getLogger().setLevel(logging.WARNING)
+        self._output_dir = tempfile.TemporaryDirectory()
+        storage._store = storage.OutputStore(Path(self._output_dir.name))
+        similarity._index = similarity.PersistentHashIndex(Path(self._output_dir.name) / "index.npz", save_every=0)
+        if not use_cache:
+            cache._cache = cache.ResultCache(memory_bytes=0, disk_bytes=0)
+        self.loop = asyncio.new_event_loop()
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    def cases(self, content: bytes, filename: str, width: int, height: int) -> dict:
+        def call(path, params=None):
+            files = {"file": (filename, content, "application/octet-stream")}
+            response = self.loop.run_until_complete(self.client.post(path, params=params, files=files))
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}: {response.text}")
+
+        return {
+            "http /analyze": lambda: call("/analyze"),
+            "http /resize": lambda: call("/resize", {"width": 640, "height": 480}),
+            "http /crop": lambda: call("/crop", {"x": width // 4, "y": height // 4,
+                                                  "width": width // 2, "height": height // 2}),
+        }
+
+    def close(self):
+        self.loop.run_until_complete(self.client.aclose())
+        self.loop.close()
+        self._output_dir.cleanup()
+
+
+def run(args) -> dict:
+    """Run every selected case and return the results document"""
+    results = {}
+    http = HttpBench(args.with_cache) if not args.skip_http else None
+
+    def record(name: str, fn, megapixels: float):
+        if args.only and not any(pattern in name for pattern in args.only):
+            return
+        samples = measure(fn, args.min_time, args.min_iterations, args.max_iterations)
+        results[name] = summarize(samples, megapixels, peak_memory(fn))
+        print(f"{name:55s} p50 {results[name]['p50_ms']:10.2f} ms  "
+              f"{results[name]['megapixels_per_second']:8.1f} MP/s  "
+              f"peak {results[name]['peak_memory_mb']:8.1f} MB", file=sys.stderr)
+
+    try:
+        for size in args.sizes:
+            image = synthetic_image(size)
+            megapixels = image.shape[0] * image.shape[1] / 1e6
+            for name, fn in analyzer_cases(image).items():
+                record(f"{name} @{size}MP", fn, megapixels)
+
+            for image_format in args.formats:
+                content = encode(image, image_format)
+                for name, fn in decode_cases(content).items():
+                    record(f"{name} @{size}MP {image_format}", fn, megapixels)
+                if http is not None:
+                    filename = f"bench{FORMATS[image_format]}"
+                    for name, fn in http.cases(content, filename, image.shape[1], image.shape[0]).items():
+                        record(f"{name} @{size}MP {image_format}", fn, megapixels)
+    finally:
+        if http is not None:
+            http.close()
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count()
+        },
+        "results": results
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Cases whose p50 latency grew by more than ``threshold`` over the baseline"""
+    regressions = []
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None or reference["p50_ms"] == 0:
+            continue
+        change = result["p50_ms"] / reference["p50_ms"] - 1
+        if change > threshold:
+            regressions.append({
+                "case": name,
+                "baseline_p50_ms": reference["p50_ms"],
+                "current_p50_ms": result["p50_ms"],
+                "change": change
+            })
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda value: [float(v) for v in value.split(",")],
+                        default=list(DEFAULT_SIZES), help="image sizes in megapixels (default: 0.3,2,12,48)")
+    parser.add_argument("--formats", type=lambda value: value.split(","), default=list(DEFAULT_FORMATS),
+                        help="encodings for decode and HTTP cases (default: jpeg,png,webp)")
+    parser.add_argument("--only", action="append", help="run only cases whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to spend per case")
+    parser.add_argument("--min-iterations", type=int, default=5)
+    parser.add_argument("--max-iterations", type=int, default=200)
+    parser.add_argument("--skip-http", action="store_true", help="skip the in-process HTTP cases")
+    parser.add_argument("--with-cache", action="store_true", help="keep the result cache enabled for HTTP cases")
+    parser.add_argument("--output", type=Path, help="write results (a new baseline) as JSON")
+    parser.add_argument("--compare", type=Path, help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed p50 slowdown before a case counts as a regression (default: 0.15)")
+    args = parser.parse_args(argv)
+    unknown = set(args.formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown formats: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    current = run(args)
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2))
+
+    if args.compare:
+        regressions = compare(current, json.loads(args.compare.read_text()), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['case']}: {regression['baseline_p50_ms']:.2f} ms -> "
+                  f"{regression['current_p50_ms']:.2f} ms ({regression['change']:+.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions beyond threshold", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,58 +1,120 @@
+from src.utils.startup import STARTUP, FirstRequestMiddleware  # first, so import time is measured from here
+
+import asyncio
 import logging
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pathlib import Path
-from src.routers import analysis
+from src.core.batch import shutdown_process_pool
+from src.core.executor import get_executor
+from src.core.frames import shutdown_frame_pool
+from src.core.jobs import shutdown_job_manager
+from src.core.similarity import flush_similarity_index
+from src.core.warmup import WARMUP_ENABLED, warm_up
+from src.routers import analysis, jobs, stream, transformations
+from src.utils.cache import get_result_cache
+from src.utils.file_handler import UPLOAD_DIR
+from src.utils.metrics import METRICS_ENABLED, REGISTRY, MetricsMiddleware
+from src.utils.storage import get_output_store
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# ---------------- Upload Directory ----------------
-UPLOAD_DIR = Path("uploads")
-if not UPLOAD_DIR.exists():
-    UPLOAD_DIR.mkdir()
-    logger.info(f"Created missing uploads directory at: {UPLOAD_DIR.resolve()}")
-else:
-    logger.info(f"Uploads directory already exists: {UPLOAD_DIR.resolve()}")
-
-# ---------------- FastAPI App ----------------
-app = FastAPI(
-    title="Smart Image Processing API",
-    description="Analyze, enhance, and transform images with quality metrics",
-    version="2.0.0"
-)
-
-# ---------------- Middleware ----------------
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# ---------------- Routers ----------------
-app.include_router(analysis.router)
-
-# ---------------- Endpoints ----------------
-@app.get("/")
+STARTUP.mark("imported")
+
+# ---------------- Service Endpoints ----------------
+service = APIRouter(tags=["Service"])
+
+@service.get("/")
 def root():
     """Root endpoint to verify API is running."""
     return {"status": "OK", "message": "Smart Image Processing API is live!"}
 
-@app.get("/health")
+@service.get("/health")
 def health_check():
     """Health check endpoint for CI/CD monitoring."""
     logger.info("Health check requested")
     return {"status": "healthy"}
 
+@service.get("/executor/stats")
+def executor_stats():
+    """Queue depth, rejection count and wait times of the shared executor."""
+    return get_executor().stats()
+
+@service.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage timings, size histograms and in-flight requests in Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@service.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters and sizes of the result cache tiers."""
+    return get_result_cache().stats()
+
+@service.get("/storage/stats")
+def storage_stats():
+    """Size, quota and eviction counters of the stored transformation outputs."""
+    return get_output_store().stats()
+
+@service.get("/startup/stats")
+def startup_stats():
+    """Milliseconds from the start of imports to import end, app creation, readiness and first response."""
+    return STARTUP.stats()
+
+# ---------------- Lifecycle ----------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the uploads directory, optionally warm up, and run the output sweeper while the app is up;
+    stop workers and save the hash index on shutdown."""
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    logger.info(f"Uploads directory: {UPLOAD_DIR.resolve()}")
+    store = get_output_store()
+    store.sweep()
+    store.start_sweeper()
+    if app.state.warmup:
+        STARTUP.warmup_ms = await asyncio.to_thread(warm_up)
+    STARTUP.mark("ready")
+    yield
+    store.stop_sweeper()
+    shutdown_job_manager()
+    shutdown_process_pool()
+    shutdown_frame_pool()
+    flush_similarity_index()
+
+# ---------------- App Factory ----------------
+def create_app(warmup: bool = None) -> FastAPI:
+    """Build the API. OpenCV and NumPy load on first use unless warm-up (IMAGE_API_WARMUP=1) is on.
+
+    Serve with ``uvicorn main:app`` or ``uvicorn --factory main:create_app``.
+    """
+    app = FastAPI(
+        title="Smart Image Processing API",
+        description="Analyze, enhance, and transform images with quality metrics",
+        version="2.0.0",
+        lifespan=lifespan
+    )
+    app.state.warmup = WARMUP_ENABLED if warmup is None else warmup
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    if METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+    app.add_middleware(FirstRequestMiddleware)
+
+    for router in (service, analysis.router, transformations.router, jobs.router, stream.router):
+        app.include_router(router)
+
+    STARTUP.mark("app_created")
+    return app
 
-app.include_router(analysis.router)
-#added the new routing
 
-# Create uploads directory
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
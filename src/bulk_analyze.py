@@ -0,0 +1,289 @@
+"""Analyze a directory tree or JSONL manifest of images offline, across all cores.
+
+Results stream out in input order as JSONL or CSV. A checkpoint file next to
+the output records how many inputs are done and the output size at that
+point, so an interrupted run continues exactly where it stopped.
+
+Examples:
+    python -m src.bulk_analyze /data/archive --output scores.jsonl
+    python -m src.bulk_analyze manifest.jsonl --path-key file --format csv --output scores.csv --resume
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from src.core.batch import BATCH_WORKERS, analyze_path
+from src.routers.analysis import generate_recommendations
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff"}
+CSV_COLUMNS = (
+    "index", "path", "status", "width", "height", "size_kb", "blur_score", "brightness", "contrast",
+    "object_count", "quality_rating", "recommendations", "error"
+)
+
+
+def iter_directory(root: Path):
+    """Yield image paths under ``root`` in a stable (sorted) order, one directory at a time"""
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if Path(name).suffix.lower() in IMAGE_EXTENSIONS:
+                path = os.path.join(directory, name)
+                yield path, path
+
+
+def iter_manifest(manifest: Path, path_key: str):
+    """Yield (label, path) from a JSONL manifest; relative paths resolve against its directory"""
+    with open(manifest, encoding="utf-8") as lines:
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                label = json.loads(line)[path_key]
+            except (ValueError, KeyError, TypeError):
+                raise ValueError(f"{manifest}:{line_number}: no '{path_key}' field")
+            yield label, str(manifest.parent / label)
+
+
+def to_record(index: int, label: str, outcome) -> dict:
+    """Output record for one input from its analysis or exception"""
+    record = {"index": index, "path": label}
+    if isinstance(outcome, BaseException):
+        record.update({"status": "error", "error": str(outcome) or type(outcome).__name__})
+        return record
+    metrics = outcome["analysis"]
+    record.update({
+        "status": "ok",
+        "image_info": outcome["image_info"],
+        "analysis": metrics,
+        "recommendations": generate_recommendations(metrics["blur_score"], metrics["brightness"], metrics["contrast"])
+    })
+    return record
+
+
+def format_jsonl(record: dict) -> bytes:
+    return (json.dumps(record) + "\n").encode()
+
+
+def format_csv(record: dict) -> bytes:
+    row = {"index": record["index"], "path": record["path"], "status": record["status"],
+           "error": record.get("error", "")}
+    if record["status"] == "ok":
+        row.update({key: record["image_info"][key] for key in ("width", "height", "size_kb")})
+        row.update(record["analysis"])
+        row["recommendations"] = "; ".join(record["recommendations"])
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, CSV_COLUMNS, extrasaction="ignore").writerow(row)
+    return buffer.getvalue().encode()
+
+
+def csv_header() -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(CSV_COLUMNS)
+    return buffer.getvalue().encode()
+
+
+def load_checkpoint(path: Path, source: str) -> dict:
+    checkpoint = json.loads(path.read_text())
+    if checkpoint["source"] != source:
+        raise ValueError(f"Checkpoint {path} belongs to {checkpoint['source']}, not {source}")
+    return checkpoint
+
+
+def save_checkpoint(path: Path, checkpoint: dict):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(checkpoint))
+    os.replace(tmp_path, path)
+
+
+def _run_inline(analyze, path: str, fast: bool) -> Future:
+    future = Future()
+    try:
+        future.set_result(analyze(path, fast))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+class WorkerCrashed(RuntimeError):
+    """A worker process died while analyzing this input on its own"""
+
+
+def analyze_stream(inputs, workers: int, prefetch: int, fast: bool = False, analyze=analyze_path):
+    """Yield (label, analysis or exception) in input order.
+
+    At most ``prefetch`` files are in flight, so memory stays flat however
+    long ``inputs`` is. Files are read inside the workers; only paths and
+    small result dicts cross the process boundary. ``workers=0`` runs
+    everything in this process.
+
+    A worker that dies (segfault, OOM kill) breaks the whole pool and fails
+    every file in flight, most of which never ran. The pool is then
+    restarted, the file at the head is retried alone and only reported as
+    ``WorkerCrashed`` if it kills a worker again; the rest are resubmitted.
+    """
+    pool = None
+    context = multiprocessing.get_context("spawn")
+
+    def start_pool():
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+    def submit(path: str) -> Future:
+        if pool is None:
+            return _run_inline(analyze, path, fast)
+        try:
+            return pool.submit(analyze, path, fast)
+        except BrokenProcessPool as e:
+            future = Future()
+            future.set_exception(e)
+            return future
+
+    def restart_pool():
+        nonlocal pool
+        pool.shutdown(wait=True, cancel_futures=True)
+        pool = start_pool()
+
+    if workers > 0:
+        pool = start_pool()
+    window = deque()
+    inputs = iter(inputs)
+    try:
+        while True:
+            while len(window) < prefetch:
+                item = next(inputs, None)
+                if item is None:
+                    break
+                label, path = item
+                window.append((label, path, submit(path)))
+            if not window:
+                return
+            label, path, future = window.popleft()
+            try:
+                outcome = future.result()
+            except BrokenProcessPool:
+                restart_pool()
+                try:
+                    outcome = submit(path).result()
+                except BrokenProcessPool:
+                    restart_pool()
+                    outcome = WorkerCrashed("Worker process died while analyzing this file")
+                except Exception as e:
+                    outcome = e
+                window = deque((pending, pending_path, submit(pending_path)) for pending, pending_path, _ in window)
+            except Exception as e:
+                outcome = e
+            yield label, outcome
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run(args) -> dict:
+    """Analyze every input not yet covered by the checkpoint; returns a run summary"""
+    source = str(args.source.resolve())
+    if args.source.is_dir():
+        inputs = iter_directory(args.source)
+    else:
+        inputs = iter_manifest(args.source, args.path_key)
+
+    to_stdout = args.output is None
+    checkpoint_path = None if to_stdout else Path(f"{args.output}.checkpoint")
+    checkpoint = {"source": source, "completed": 0, "failed": 0, "offset": 0}
+    if args.resume and checkpoint_path is not None and checkpoint_path.exists():
+        checkpoint = load_checkpoint(checkpoint_path, source)
+        print(f"Resuming after {checkpoint['completed']} inputs", file=sys.stderr)
+    inputs = itertools.islice(inputs, checkpoint["completed"], None)
+
+    formatter = format_csv if args.format == "csv" else format_jsonl
+    if to_stdout:
+        output = sys.stdout.buffer
+    else:
+        output = open(args.output, "r+b" if checkpoint["offset"] else "wb")
+        # Drop anything written after the last checkpoint (a crash mid-batch)
+        output.truncate(checkpoint["offset"])
+        output.seek(checkpoint["offset"])
+    if args.format == "csv" and checkpoint["offset"] == 0:
+        output.write(csv_header())
+
+    start = time.perf_counter()
+    last_report = start
+    processed = failed = 0
+    try:
+        for label, outcome in analyze_stream(inputs, args.workers, args.prefetch, args.fast):
+            record = to_record(checkpoint["completed"], label, outcome)
+            output.write(formatter(record))
+            checkpoint["completed"] += 1
+            processed += 1
+            if record["status"] != "ok":
+                failed += 1
+                checkpoint["failed"] += 1
+
+            if checkpoint_path is not None and processed % args.checkpoint_every == 0:
+                output.flush()
+                checkpoint["offset"] = output.tell()
+                save_checkpoint(checkpoint_path, checkpoint)
+            now = time.perf_counter()
+            if now - last_report >= args.progress_interval:
+                print(f"{checkpoint['completed']} done, {processed / (now - start):.1f} images/s", file=sys.stderr)
+                last_report = now
+    finally:
+        output.flush()
+        if checkpoint_path is not None:
+            checkpoint["offset"] = output.tell()
+            save_checkpoint(checkpoint_path, checkpoint)
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "processed": processed,
+        "failed": failed,
+        "total_completed": checkpoint["completed"],
+        "elapsed_seconds": round(elapsed, 3),
+        "images_per_second": round(processed / elapsed, 2) if elapsed else 0.0
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", type=Path, help="directory to walk or JSONL manifest")
+    parser.add_argument("--path-key", default="path", help="manifest field holding the image path (default: path)")
+    parser.add_argument("--output", type=Path, help="results file (default: stdout, without checkpointing)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS,
+                        help="worker processes (default: one per core; 0 runs in-process)")
+    parser.add_argument("--prefetch", type=int, help="files in flight at once (default: 4 per worker)")
+    parser.add_argument("--fast", action="store_true", help="analyze reduced decodes (see analyze_bytes)")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint next to --output")
+    parser.add_argument("--checkpoint-every", type=int, default=100, help="inputs between checkpoints")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="seconds between progress lines")
+    args = parser.parse_args(argv)
+    if not args.source.exists():
+        parser.error(f"{args.source} does not exist")
+    if args.prefetch is None:
+        args.prefetch = max(args.workers, 1) * 4
+    if args.prefetch < 1:
+        parser.error("--prefetch must be at least 1")
+    if args.checkpoint_every < 1:
+        parser.error("--checkpoint-every must be at least 1")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    summary = run(args)
+    print(json.dumps(summary), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.core.image_processor import ImageAnalysis, ImageAnalyzer
+from src.utils.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# Worker count for the batch pool; defaults to one process per core
+BATCH_WORKERS = int(os.environ.get("IMAGE_API_BATCH_WORKERS", 0)) or os.cpu_count() or 1
+
+# Fast analysis decodes luma only, at the smallest 1/2, 1/4 or 1/8 scale covering this size
+FAST_ANALYSIS_SIZE = (512, 512)
+
+# objects=boxes reports at most this many (largest) bounding boxes; object_count still counts all
+MAX_REPORTED_OBJECTS = 256
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def analyze_bytes(file_content: bytes, fast: bool = False, objects: str = "legacy") -> dict:
+    """Decode and analyze one encoded image (also runs inside pool workers).
+
+    ``fast`` analyses a reduced grayscale decode (see FAST_ANALYSIS_SIZE),
+    which is several times quicker on large JPEGs. Measured against full
+    decodes of 12 MP JPEGs, brightness stays within 0.05 points and
+    contrast reads up to 0.5 points lower. blur_score depends on
+    resolution and reads higher on the reduced image (about 2x for sharp
+    photos, far more for soft ones), so fast blur scores and ratings are
+    only comparable with other fast results.
+
+    ``objects`` selects the object counter (see ImageAnalysis.to_dict);
+    ``boxes`` also returns an ``objects`` entry with bounding boxes and
+    areas in full-resolution coordinates.
+    """
+    start = time.perf_counter()
+    if fast:
+        width, height = ImageAnalyzer.probe_size(file_content)
+        image = ImageAnalyzer.read_image(file_content, target_size=FAST_ANALYSIS_SIZE, grayscale=True,
+                                         size=(width, height))
+    else:
+        image = ImageAnalyzer.read_image(file_content)
+        height, width = image.shape[:2]
+    with stage("metrics"):
+        analysis = ImageAnalysis(image)
+        metrics = analysis.to_dict(objects)
+        # The hash reuses the gray plane the metrics already converted
+        perceptual_hash = f"{analysis.perceptual_hash:016x}"
+        histogram = analysis.histogram.summary()
+        if objects == "boxes":
+            detection = analysis.detect_objects().scaled(width / image.shape[1], height / image.shape[0])
+    result = {
+        "image_info": {
+            "width": width,
+            "height": height,
+            "size_kb": len(file_content) / 1024,
+            "analyzed_width": image.shape[1],
+            "analyzed_height": image.shape[0]
+        },
+        "analysis": metrics,
+        "histogram": histogram,
+        "perceptual_hash": perceptual_hash,
+        "processing_ms": round((time.perf_counter() - start) * 1000, 3)
+    }
+    if objects == "boxes":
+        result["objects"] = detection.to_dict(MAX_REPORTED_OBJECTS)
+    return result
+
+
+def analyze_path(path: str, fast: bool = False) -> dict:
+    """Read and analyze one file inside a worker so the parent never holds its bytes"""
+    with open(path, "rb") as handle:
+        return analyze_bytes(handle.read(), fast)
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared batch process pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn avoids forking a server process that already runs threads
+                context = multiprocessing.get_context("spawn")
+                _pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS, mp_context=context)
+                logger.info(f"Started batch process pool with {BATCH_WORKERS} workers")
+    return _pool
+
+
+def reset_process_pool(broken: ProcessPoolExecutor):
+    """Drop a pool broken by a crashed worker so the next get_process_pool starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+            logger.warning("Batch process pool broke (a worker died); replacing it")
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_process_pool():
+    """Stop the shared batch process pool if it was started"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
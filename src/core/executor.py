@@ -0,0 +1,142 @@
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Concurrent CPU-bound jobs; OpenCV and NumPy release the GIL, so threads scale
+MAX_WORKERS = int(os.environ.get("IMAGE_API_MAX_WORKERS", 0)) or os.cpu_count() or 1
+# Jobs allowed to wait for a worker before new work is rejected
+MAX_QUEUE = int(os.environ.get("IMAGE_API_MAX_QUEUE", 0)) or MAX_WORKERS * 4
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the executor queue is full and work is rejected"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Server is busy, retry later")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """Thread pool with a concurrency limit, a bounded queue and wait-time stats.
+
+    Work is admitted while fewer than ``max_workers + max_queue`` jobs are
+    pending; beyond that :meth:`run` fails fast with :class:`ExecutorSaturated`
+    so the caller can answer 503 instead of piling up latency.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_queue: int = MAX_QUEUE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-worker")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_service = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs admitted but not yet picked up by a worker"""
+        return self._pending - self._running
+
+    def _retry_after(self) -> int:
+        mean_service = self._total_service / self._completed if self._completed else 1.0
+        backlog = self._pending / self.max_workers
+        return max(1, math.ceil(mean_service * backlog))
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on a worker thread and await its result"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturated(self._retry_after())
+            self._pending += 1
+            self._submitted += 1
+
+        enqueued = time.perf_counter()
+        context = contextvars.copy_context()
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                wait = started - enqueued
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            try:
+                return context.run(fn, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._total_service += time.perf_counter() - started
+
+        def done(future):
+            with self._lock:
+                self._pending -= 1
+                if not future.cancelled():
+                    self._completed += 1
+
+        future = self._pool.submit(task)
+        future.add_done_callback(done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth, throughput counters and wait times"""
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": self._pending - self._running,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "mean_wait_ms": round(self._total_wait / started * 1000, 3) if started else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+                "mean_service_ms": round(self._total_service / self._completed * 1000, 3) if self._completed else 0.0
+            }
+
+    def prestart(self, timeout: float = 5.0):
+        """Start every worker thread now rather than on the first requests"""
+        barrier = threading.Barrier(self.max_workers)
+
+        def rendezvous():
+            # Each worker blocks until all have started, so none is reused for a second task
+            try:
+                barrier.wait(timeout)
+            except threading.BrokenBarrierError:
+                pass
+
+        for future in [self._pool.submit(rendezvous) for _ in range(self.max_workers)]:
+            future.result()
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker threads"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> BoundedExecutor:
+    """Return the shared executor used by the HTTP handlers"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = BoundedExecutor()
+                logger.info(f"Started executor with {MAX_WORKERS} workers, queue limit {MAX_QUEUE}")
+    return _executor
@@ -0,0 +1,447 @@
+from __future__ import annotations
+
+import io
+import logging
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.image_processor import OBJECT_MODES, HistogramStats, ImageAnalysis, ImageAnalyzer
+from src.utils.lazy import lazy_import
+from src.utils.metrics import observe_image, stage
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+# Threads analysing or transforming frames of one clip in parallel; OpenCV releases the GIL
+FRAME_WORKERS = int(os.environ.get("IMAGE_API_FRAME_WORKERS", 0)) or os.cpu_count() or 1
+# Most frames a single request may analyse or re-encode (after sampling)
+MAX_FRAMES = int(os.environ.get("IMAGE_API_MAX_FRAMES", 500))
+
+# Multi-frame output containers: name -> (media type, extension)
+FRAME_FORMATS = {
+    "webp": ("image/webp", ".webp"),
+    "tiff": ("image/tiff", ".tiff"),
+    "mp4": ("video/mp4", ".mp4")
+}
+# Frame duration assumed when a container does not record one (10 fps)
+DEFAULT_FRAME_MS = 100.0
+# Scene-change detection compares area-averaged gray thumbnails of this size
+SCENE_THUMBNAIL_SIZE = (32, 32)
+CLIP_METRICS = ("blur_score", "brightness", "contrast", "object_count")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class Frame:
+    """One decoded frame with its position in the clip"""
+
+    __slots__ = ("index", "timestamp_ms", "duration_ms", "image")
+
+    def __init__(self, index: int, timestamp_ms: float, duration_ms: float, image: np.ndarray):
+        self.index = index
+        self.timestamp_ms = timestamp_ms
+        self.duration_ms = duration_ms
+        self.image = image
+
+
+def _iter_pil_frames(content: bytes, step: int):
+    from PIL import Image, ImageSequence, UnidentifiedImageError
+
+    try:
+        pil_image = Image.open(io.BytesIO(content))
+    except (UnidentifiedImageError, OSError):
+        raise ValueError("Invalid image format")
+    with pil_image:
+        timestamp = 0.0
+        for index, pil_frame in enumerate(ImageSequence.Iterator(pil_image)):
+            duration = float(pil_frame.info.get("duration") or DEFAULT_FRAME_MS)
+            if index % step == 0:
+                # Skipped frames are still seeked through (GIF/WebP frames build on their predecessor)
+                # but never converted
+                with stage("decode"):
+                    rgb = np.asarray(pil_frame.convert("RGB"))
+                    image = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+                observe_image(image)
+                yield Frame(index, timestamp, duration * step, image)
+            timestamp += duration
+
+
+def _open_video(content: bytes):
+    """cv2.VideoCapture over the bytes in memory, or a temporary file on older OpenCV builds.
+
+    Returns (capture, source); ``source`` is the stream the capture reads
+    from (the caller must keep it alive) or the temporary file's path.
+    """
+    stream = io.BytesIO(content)
+    try:
+        # Stream sources need an explicit backend (OpenCV 4.10+)
+        return cv2.VideoCapture(stream, cv2.CAP_FFMPEG, []), stream
+    except (cv2.error, TypeError, SystemError):
+        pass
+    handle = tempfile.NamedTemporaryFile(suffix=".video", delete=False)
+    with handle:
+        handle.write(content)
+    return cv2.VideoCapture(handle.name), handle.name
+
+
+def _iter_video_frames(content: bytes, step: int):
+    capture, source = _open_video(content)
+    try:
+        if not capture.isOpened():
+            raise ValueError("Invalid image or video format")
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        frame_ms = 1000.0 / fps if fps and fps > 0 else DEFAULT_FRAME_MS
+        index = 0
+        while True:
+            if index % step:
+                # grab() demuxes and decodes without the colour conversion read() adds
+                if not capture.grab():
+                    return
+            else:
+                with stage("decode"):
+                    ok, image = capture.read()
+                if not ok:
+                    return
+                observe_image(image)
+                yield Frame(index, index * frame_ms, frame_ms * step, image)
+            index += 1
+    finally:
+        capture.release()
+        if isinstance(source, str):
+            os.unlink(source)
+
+
+def iter_frames(content: bytes, step: int = 1):
+    """Lazily decode every ``step``-th frame of an animated image, multi-page TIFF or video.
+
+    Formats Pillow can open (GIF, WebP, TIFF, APNG and all still images)
+    are read from memory; anything else is handed to OpenCV's video
+    backend. Only the frame being yielded is held in memory.
+    """
+    if step < 1:
+        raise ValueError("Step must be at least 1")
+    if ImageAnalyzer.header_size(content) is None:
+        return _iter_video_frames(content, step)
+    return _iter_pil_frames(content, step)
+
+
+def _thumbnail(image: np.ndarray) -> np.ndarray:
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, SCENE_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+def sample_frames(frames, scene_threshold: float = None, max_frames: int = MAX_FRAMES):
+    """Yield at most ``max_frames`` of ``frames``.
+
+    With ``scene_threshold`` (0-100) a frame is kept only when its gray
+    thumbnail differs from the last kept frame by more than that
+    percentage of full scale on average, so static stretches are analysed
+    once. The first frame is always kept.
+    """
+    kept = 0
+    previous = None
+    for frame in frames:
+        if kept >= max_frames:
+            return
+        if scene_threshold is not None:
+            thumbnail = _thumbnail(frame.image)
+            if previous is not None:
+                change = float(np.abs(thumbnail - previous).mean()) / 255 * 100
+                if change <= scene_threshold:
+                    continue
+            previous = thumbnail
+        kept += 1
+        yield frame
+
+
+def get_frame_pool() -> ThreadPoolExecutor:
+    """Return the shared frame worker pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=FRAME_WORKERS, thread_name_prefix="frame-worker")
+                logger.info(f"Started frame pool with {FRAME_WORKERS} workers")
+    return _pool
+
+
+def shutdown_frame_pool():
+    """Stop the shared frame pool if it was started"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def map_frames(fn, frames, window: int = None):
+    """Yield ``(frame, fn(frame))`` in clip order, running ``fn`` on the frame pool.
+
+    At most ``window`` frames (default two per worker) are decoded and in
+    flight at once, so memory stays flat however long the clip is.
+    """
+    pool = get_frame_pool()
+    window = window or FRAME_WORKERS * 2
+    pending = deque()
+    frames = iter(frames)
+    try:
+        while True:
+            while len(pending) < window:
+                frame = next(frames, None)
+                if frame is None:
+                    break
+                pending.append((frame, pool.submit(fn, frame)))
+            if not pending:
+                return
+            frame, future = pending.popleft()
+            yield frame, future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def _analyze_frame(frame: Frame, objects: str):
+    analysis = ImageAnalysis(frame.image)
+    return analysis.to_dict(objects), analysis.histogram
+
+
+def analyze_frames(content: bytes, step: int = 1, scene_threshold: float = None,
+                   max_frames: int = MAX_FRAMES, objects: str = "count") -> dict:
+    """Per-frame metrics of a clip and their clip-level aggregate.
+
+    Frames are sampled (every ``step``-th, optionally only on scene
+    changes), analysed in parallel and reduced as they complete: the gray
+    histograms merge exactly into one clip histogram and each metric is
+    summarised by its mean, min, max and standard deviation. ``objects``
+    defaults to the cheap connected-component count.
+    """
+    if objects not in OBJECT_MODES:
+        raise ValueError(f"Unknown objects mode: {objects}. Use one of: {', '.join(OBJECT_MODES)}")
+    sampled = sample_frames(iter_frames(content, step), scene_threshold, max_frames)
+    histogram = HistogramStats()
+    frames = []
+    width = height = None
+    with stage("metrics"):
+        for frame, (metrics, frame_histogram) in map_frames(lambda frame: _analyze_frame(frame, objects), sampled):
+            if width is None:
+                height, width = frame.image.shape[:2]
+            histogram = histogram.merge(frame_histogram)
+            frames.append({"index": frame.index, "timestamp_ms": round(frame.timestamp_ms, 3), "analysis": metrics})
+    if not frames:
+        raise ValueError("No frames could be decoded")
+
+    values = {name: np.array([frame["analysis"][name] for frame in frames], dtype=np.float64)
+              for name in CLIP_METRICS}
+    summary = {
+        name: {"mean": round(float(series.mean()), 2), "min": round(float(series.min()), 2),
+               "max": round(float(series.max()), 2), "std": round(float(series.std()), 2)}
+        for name, series in values.items()
+    }
+    means = {name: summary[name]["mean"] for name in ("blur_score", "brightness", "contrast")}
+    return {
+        "clip_info": {
+            "width": width,
+            "height": height,
+            "analyzed_frames": len(frames),
+            "last_frame_index": frames[-1]["index"],
+            "step": step,
+            "scene_threshold": scene_threshold
+        },
+        "summary": {
+            **summary,
+            "quality_rating": ImageAnalyzer.get_quality_rating(means["blur_score"], means["brightness"],
+                                                               means["contrast"])
+        },
+        "histogram": histogram.summary(),
+        "frames": frames
+    }
+
+
+def _webp_anim_module():
+    """Pillow's libwebp binding if it has the streaming interface used below (Pillow >= 11), else None"""
+    from PIL import Image
+
+    try:
+        from PIL import _webp
+    except ImportError:
+        return None
+    if not hasattr(_webp, "WebPAnimEncoder") or not hasattr(Image.Image, "getim"):
+        return None
+    return _webp
+
+
+class WebPAnimationWriter:
+    """Animated WebP built frame by frame.
+
+    Pillow's save_all() wants every frame up front, so this drives the same
+    libwebp animation encoder Pillow uses (a private interface, checked for
+    at run time), one frame at a time; the encoder keeps only compressed
+    frames. If that interface is missing or has changed, frames are
+    buffered as PNG and encoded with the public save_all() in finish().
+    """
+
+    def __init__(self, quality: int):
+        self._webp = _webp_anim_module()
+        self.quality = quality
+        self._encoder = None
+        self._size = None
+        self._timestamp = 0.0
+        self._buffered = []
+        self._durations = []
+
+    def _start_encoder(self, rgb):
+        # background, loop forever, no minimize_size, gif2webp keyframe defaults, no mixed mode, quiet
+        encoder = self._webp.WebPAnimEncoder(rgb.size, 0, 0, False, 3, 5, False, False)
+        encoder.add(rgb.getim(), 0, False, self.quality, 100, 4)
+        return encoder
+
+    def add(self, image: np.ndarray, duration_ms: float):
+        from PIL import Image
+
+        rgb = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_GRAY2RGB if image.ndim == 2 else cv2.COLOR_BGR2RGB))
+        first = self._size is None
+        if first:
+            self._size = rgb.size
+            if self._webp is not None:
+                try:
+                    self._encoder = self._start_encoder(rgb)
+                except (TypeError, AttributeError, ValueError) as e:
+                    logger.warning(f"Pillow's WebP animation encoder is unusable ({e}); buffering frames")
+                    self._webp = None
+        elif rgb.size != self._size:
+            raise ValueError("All frames of an animation must have the same size")
+
+        if self._encoder is not None:
+            if not first:
+                self._encoder.add(rgb.getim(), round(self._timestamp), False, self.quality, 100, 4)
+        else:
+            buffer = io.BytesIO()
+            rgb.save(buffer, format="PNG", compress_level=1)
+            self._buffered.append(buffer.getvalue())
+        self._durations.append(round(duration_ms))
+        self._timestamp += duration_ms
+
+    def finish(self) -> bytes:
+        if self._size is None:
+            raise ValueError("No frames to encode")
+        if self._encoder is not None:
+            self._encoder.add(None, round(self._timestamp), False, self.quality, 100, 0)
+            return self._encoder.assemble(b"", b"", b"")
+
+        from PIL import Image
+
+        frames = [Image.open(io.BytesIO(data)) for data in self._buffered]
+        output = io.BytesIO()
+        frames[0].save(output, format="WEBP", save_all=True, append_images=frames[1:],
+                       duration=self._durations, loop=0, quality=self.quality, method=4)
+        return output.getvalue()
+
+    def close(self):
+        self._encoder = None
+        self._buffered = []
+
+
+class TiffPageWriter:
+    """Multi-page TIFF (deflate-compressed) written page by page"""
+
+    def __init__(self, quality: int = None):
+        from PIL import TiffImagePlugin
+
+        self._buffer = io.BytesIO()
+        self._writer = TiffImagePlugin.AppendingTiffWriter(self._buffer, new=True)
+        self._pages = 0
+
+    def add(self, image: np.ndarray, duration_ms: float = None):
+        from PIL import Image
+
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        Image.fromarray(image).save(self._writer, format="TIFF", compression="tiff_adobe_deflate")
+        self._writer.newFrame()
+        self._pages += 1
+
+    def finish(self) -> bytes:
+        if not self._pages:
+            raise ValueError("No frames to encode")
+        self._writer.close()
+        return self._buffer.getvalue()
+
+    def close(self):
+        self._writer.close()
+
+
+class VideoFileWriter:
+    """MPEG-4 video via cv2.VideoWriter, streamed to a temporary file.
+
+    The frame rate comes from the first frame's duration; ``quality`` is
+    not used by the mp4v codec.
+    """
+
+    def __init__(self, quality: int = None):
+        self._handle = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False)
+        self._handle.close()
+        self._writer = None
+
+    def add(self, image: np.ndarray, duration_ms: float):
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        size = (image.shape[1], image.shape[0])
+        if self._writer is None:
+            fps = 1000.0 / duration_ms if duration_ms else 1000.0 / DEFAULT_FRAME_MS
+            self._writer = cv2.VideoWriter(self._handle.name, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+            if not self._writer.isOpened():
+                raise RuntimeError("No MPEG-4 encoder available")
+            self._size = size
+        elif size != self._size:
+            raise ValueError("All frames of a video must have the same size")
+        self._writer.write(image)
+
+    def finish(self) -> bytes:
+        if self._writer is None:
+            raise ValueError("No frames to encode")
+        self._writer.release()
+        with open(self._handle.name, "rb") as handle:
+            return handle.read()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+        if os.path.exists(self._handle.name):
+            os.unlink(self._handle.name)
+
+
+FRAME_WRITERS = {"webp": WebPAnimationWriter, "tiff": TiffPageWriter, "mp4": VideoFileWriter}
+
+
+def transform_frames(content: bytes, transform, image_format: str = "webp", quality: int = 80,
+                     step: int = 1, max_frames: int = MAX_FRAMES) -> tuple:
+    """Apply ``transform`` to every ``step``-th frame in parallel and re-encode the clip.
+
+    Frames are decoded, transformed and handed to the encoder in order
+    through map_frames' bounded window, so neither the decoded input nor
+    the transformed output is ever held in full. Returns (encoded bytes,
+    frame count, output (width, height)).
+    """
+    if image_format not in FRAME_FORMATS:
+        raise ValueError(f"Unsupported multi-frame format: {image_format}. Use one of: {', '.join(FRAME_FORMATS)}")
+    writer = FRAME_WRITERS[image_format](quality)
+    count = 0
+    size = None
+    frames = sample_frames(iter_frames(content, step), max_frames=max_frames)
+    try:
+        for frame, result in map_frames(lambda frame: transform(frame.image), frames):
+            with stage("encode"):
+                writer.add(result, frame.duration_ms)
+            count += 1
+            size = (result.shape[1], result.shape[0])
+        with stage("encode"):
+            body = writer.finish()
+    finally:
+        writer.close()
+    return body, count, size
@@ -1,65 +1,244 @@
-import cv2
-import numpy as np
-from PIL import Image, ImageEnhance, ImageFilter
+from __future__ import annotations
+
+import functools
+from io import BytesIO
+
+from src.utils.lazy import lazy_import
+from src.utils.metrics import observe_image, stage
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# EXIF tag holding the camera orientation
+EXIF_ORIENTATION = 0x0112
+
+# Filter names accepted by ImageAnalyzer.apply_filter
+FILTER_TYPES = ("blur", "sharpen", "edge", "smooth", "grayscale", "sepia")
+
+# Pillow's ImageFilter kernels (BLUR, SHARPEN, FIND_EDGES, SMOOTH) as (rows, scale)
+FILTER_KERNEL_SPECS = {
+    "blur": ([
+        [1, 1, 1, 1, 1],
+        [1, 0, 0, 0, 1],
+        [1, 0, 0, 0, 1],
+        [1, 0, 0, 0, 1],
+        [1, 1, 1, 1, 1]
+    ], 16),
+    "sharpen": ([[-2, -2, -2], [-2, 32, -2], [-2, -2, -2]], 16),
+    "edge": ([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]], 1),
+    "smooth": ([[1, 1, 1], [1, 5, 1], [1, 1, 1]], 13)
+}
+
+# enhance_image modes: fixed Pillow-style factors, or parameters derived from the histogram
+ENHANCE_MODES = ("classic", "auto_levels", "clahe")
+
+# Object counting: the contour-based legacy count, or connected components (count only / with boxes)
+OBJECT_MODES = ("legacy", "count", "boxes")
+THRESHOLD_METHODS = ("otsu", "adaptive")
+# Connected components run on a plane whose longer side is at most this many pixels
+DETECTION_MAX_DIMENSION = 1024
+# Components smaller than this many (full-resolution) pixels are treated as noise
+MIN_OBJECT_AREA = 16
+
+
+@functools.cache
+def filter_kernel(filter_type: str) -> np.ndarray:
+    """float32 kernel of a FILTER_KERNEL_SPECS filter, pre-divided by its scale (built on first use)"""
+    rows, scale = FILTER_KERNEL_SPECS[filter_type]
+    return np.array(rows, dtype=np.float32) / scale
+
+
+@functools.cache
+def sepia_matrix() -> np.ndarray:
+    """Desaturate (ITU-R 601 luma, BGR order) and darken to 80%, as the old PIL sepia did"""
+    return np.full((3, 3), 0.8, dtype=np.float32) * np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+def _filter_keep_border(image: np.ndarray, kernel: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """cv2.filter2D that leaves the outer kernel-radius border untouched, like Pillow"""
+    pad = kernel.shape[0] // 2
+    top, bottom = image[:pad].copy(), image[-pad:].copy()
+    left, right = image[:, :pad].copy(), image[:, -pad:].copy()
+    out = cv2.filter2D(image, -1, kernel, dst=out, borderType=cv2.BORDER_REPLICATE)
+    out[:, :pad], out[:, -pad:] = left, right
+    out[:pad], out[-pad:] = top, bottom
+    return out
+
+
+def _enhance_lut(mean: int) -> np.ndarray:
+    """Contrast 1.3 around ``mean`` followed by brightness 1.1, truncated like Pillow's blend"""
+    values = np.arange(256, dtype=np.float32)
+    contrast = np.clip(np.float32(mean) + np.float32(1.3) * (values - mean), 0, 255).astype(np.uint8)
+    brightness = np.clip(np.float32(1.1) * contrast.astype(np.float32), 0, 255)
+    return brightness.astype(np.uint8)
+
+
+def _auto_levels_lut(stats: "HistogramStats") -> np.ndarray:
+    """Stretch the 0.5-99.5th percentile range to 0-255, with a gamma that moves the mean to mid-gray"""
+    low, high = stats.percentile(0.5), stats.percentile(99.5)
+    if high - low < 2:
+        return np.arange(256, dtype=np.uint8)
+    normalized = np.clip((np.arange(256, dtype=np.float64) - low) / (high - low), 0, 1)
+    mean = min(max((stats.mean - low) / (high - low), 0.05), 0.95)
+    gamma = min(max(np.log(0.5) / np.log(mean), 0.5), 2.0)
+    return np.round(normalized ** gamma * 255).astype(np.uint8)
+
+
+def _clahe_clip_limit(stats: "HistogramStats") -> float:
+    """CLAHE clip limit from 1.5 (already contrasty) to 4.0 (flat), by the gray std"""
+    return float(np.clip(4.0 - (stats.std - 20) / 16, 1.5, 4.0))
+
+
+def _reduction_factor(width: int, height: int, target_size: tuple = None, scale: float = None) -> int:
+    """Largest libjpeg DCT scale denominator (1, 2, 4 or 8) that still meets the request"""
+    for factor in (8, 4, 2):
+        if target_size is not None:
+            if width // factor >= target_size[0] and height // factor >= target_size[1]:
+                return factor
+        elif scale is not None and 1 / factor >= scale:
+            return factor
+    return 1
+
 
 class ImageAnalyzer:
     """Handles image analysis and processing operations"""
     
     @staticmethod
-    def read_image(file_content: bytes) -> np.ndarray:
-        """Convert bytes to OpenCV image"""
+    def read_image(file_content: bytes, target_size: tuple = None, scale: float = None,
+                   grayscale: bool = False, size: tuple = None) -> np.ndarray:
+        """Convert bytes to OpenCV image.
+
+        With ``target_size`` (width, height) or ``scale`` the image is decoded
+        at the smallest of 1/2, 1/4 or 1/8 resolution that is still at least
+        that large, so JPEGs are downscaled in the DCT domain by libjpeg;
+        callers finish with a small resize. ``size`` is the header size when
+        the caller already probed it. ``grayscale`` decodes luma only.
+        """
+        factor = 1
+        if target_size is not None or scale is not None:
+            size = size or ImageAnalyzer.header_size(file_content)
+            # Without a readable header, decode at full resolution and let OpenCV judge the bytes
+            if size is not None:
+                factor = _reduction_factor(*size, target_size, scale)
+
+        if factor == 1:
+            flags = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+        else:
+            flags = getattr(cv2, f"IMREAD_REDUCED_{'GRAYSCALE' if grayscale else 'COLOR'}_{factor}")
+
         nparr = np.frombuffer(file_content, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        with stage("decode"):
+            img = cv2.imdecode(nparr, flags)
         if img is None:
             raise ValueError("Invalid image format")
+        observe_image(img)
         return img
 
+    @staticmethod
+    def header_size(file_content: bytes):
+        """(width, height) as read_image would return it, from the header only; None if Pillow can't tell.
+
+        Pillow refuses images above its decompression-bomb limit (about
+        179 MP) and some formats OpenCV decodes, so None is not an error.
+        """
+        from PIL import Image, UnidentifiedImageError
+
+        try:
+            with Image.open(BytesIO(file_content)) as pil_image:
+                width, height = pil_image.size
+                orientation = pil_image.getexif().get(EXIF_ORIENTATION, 1)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            return None
+        # OpenCV applies the EXIF orientation, which swaps the axes for 90-degree turns
+        if orientation in (5, 6, 7, 8):
+            width, height = height, width
+        return width, height
+
+    @staticmethod
+    def probe_size(file_content: bytes) -> tuple:
+        """(width, height) as read_image would return it; from the header, or by a full decode if need be"""
+        size = ImageAnalyzer.header_size(file_content)
+        if size is None:
+            image = ImageAnalyzer.read_image(file_content)
+            size = (image.shape[1], image.shape[0])
+        return size
+
+    @staticmethod
+    def percentage_size(width: int, height: int, percentage: int) -> tuple:
+        """Target (width, height) of resize_by_percentage"""
+        if percentage <= 0 or percentage > 500:
+            raise ValueError("Percentage must be between 1 and 500")
+        return int(width * percentage / 100), int(height * percentage / 100)
+
     @staticmethod
     def calculate_blur_score(image: np.ndarray) -> float:
         """Calculate blur detection score (0-100)"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-        blur_score = min(100, (laplacian_var / 500) * 100)
-        return round(blur_score, 2)
+        return ImageAnalysis(image).blur_score
     
     @staticmethod
     def calculate_brightness(image: np.ndarray) -> float:
         """Calculate average brightness (0-100)"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        brightness = np.mean(gray)
-        return round((brightness / 255) * 100, 2) 
+        return ImageAnalysis(image).brightness
 
     @staticmethod
     def count_objects(image: np.ndarray) -> int:
         """Detect and count objects in image"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY) #Changed alpha value orginally 255
-        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        return len(contours)
+        return ImageAnalysis(image).object_count
     
+    @staticmethod
+    def detect_objects(image: np.ndarray, threshold: str = "otsu", min_area: int = MIN_OBJECT_AREA,
+                       max_dimension: int = DETECTION_MAX_DIMENSION, boxes: bool = True) -> "DetectedObjects":
+        """Bright connected regions with their bounding boxes and areas (see ImageAnalysis.detect_objects)"""
+        return ImageAnalysis(image).detect_objects(threshold, min_area, max_dimension, boxes)
+
     @staticmethod
     def calculate_contrast(image: np.ndarray) -> float:
         """Calculate image contrast (0-100)"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        contrast = np.std(gray)
-        return round((contrast / 128) * 100, 2)
+        return ImageAnalysis(image).contrast
+
+    @staticmethod
+    def analyze_all(image: np.ndarray) -> dict:
+        """Compute every quality metric and the rating, sharing one grayscale plane"""
+        with stage("metrics"):
+            return ImageAnalysis(image).to_dict()
     
     @staticmethod
-    def enhance_image(image: np.ndarray) -> np.ndarray:
-        """Auto-enhance image quality"""
-        pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-        
-        enhancer = ImageEnhance.Contrast(pil_image)
-        pil_image = enhancer.enhance(1.3)
-        
-        enhancer = ImageEnhance.Brightness(pil_image)
-        pil_image = enhancer.enhance(1.1)
-        
-        enhancer = ImageEnhance.Sharpness(pil_image)
-        pil_image = enhancer.enhance(1.2)
-        
-        enhanced = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-        return enhanced
+    def perceptual_hash(image: np.ndarray) -> int:
+        """64-bit difference hash (dHash) of an image"""
+        return ImageAnalysis(image).perceptual_hash
+
+    @staticmethod
+    def enhance_image(image: np.ndarray, out: np.ndarray = None, mode: str = "classic") -> np.ndarray:
+        """Auto-enhance image quality.
+
+        ``classic`` applies fixed factors (contrast 1.3, brightness 1.1,
+        sharpness 1.2). ``auto_levels`` stretches the tonal range found in
+        the histogram; ``clahe`` equalizes lightness locally with a clip
+        limit picked from the gray-level spread.
+        """
+        if mode not in ENHANCE_MODES:
+            raise ValueError(f"Unknown enhance mode: {mode}. Use one of: {', '.join(ENHANCE_MODES)}")
+        if mode == "auto_levels":
+            stats = ImageAnalysis(image).histogram
+            return cv2.LUT(image, _auto_levels_lut(stats), dst=out)
+        if mode == "clahe":
+            stats = ImageAnalysis(image).histogram
+            clahe = cv2.createCLAHE(clipLimit=_clahe_clip_limit(stats), tileGridSize=(8, 8))
+            if image.ndim == 2:
+                return clahe.apply(image, dst=out)
+            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+            lab[:, :, 0] = clahe.apply(np.ascontiguousarray(lab[:, :, 0]))
+            return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR, dst=out)
+
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        mean = int(cv2.mean(gray)[0] + 0.5)
+
+        # Contrast and brightness are per-value, so both fold into one lookup table
+        out = cv2.LUT(image, _enhance_lut(mean), dst=out)
+
+        # Sharpness extrapolates away from the smoothed image, as ImageEnhance.Sharpness does
+        smoothed = _filter_keep_border(out, filter_kernel("smooth"))
+        return cv2.addWeighted(out, 1.2, smoothed, -0.2, 0, dst=out)
     
 
     @staticmethod
@@ -89,11 +268,8 @@ class ImageAnalyzer:
     @staticmethod
     def resize_by_percentage(image: np.ndarray, percentage: int) -> np.ndarray:
         """Resize image by percentage (50 = 50% of original)"""
-        if percentage <= 0 or percentage > 500:
-            raise ValueError("Percentage must be between 1 and 500")
         height, width = image.shape[:2]
-        new_width = int(width * percentage / 100)
-        new_height = int(height * percentage / 100)
+        new_width, new_height = ImageAnalyzer.percentage_size(width, height, percentage)
         resized = cv2.resize(image, (new_width, new_height))
         return resized
     
@@ -111,28 +287,16 @@ class ImageAnalyzer:
     
 
     @staticmethod
-    def apply_filter(image: np.ndarray, filter_type: str) -> np.ndarray:
-        """Apply various filters to image"""
-        pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-        
-        if filter_type == "blur":
-            filtered = pil_image.filter(ImageFilter.BLUR)
-        elif filter_type == "sharpen":
-            filtered = pil_image.filter(ImageFilter.SHARPEN)
-        elif filter_type == "edge":
-            filtered = pil_image.filter(ImageFilter.FIND_EDGES)
-        elif filter_type == "smooth":
-            filtered = pil_image.filter(ImageFilter.SMOOTH)
-        elif filter_type == "grayscale":
-            filtered = pil_image.convert('L').convert('RGB')
-        elif filter_type == "sepia":
-            filtered = ImageEnhance.Color(pil_image).enhance(0)
-            filtered = ImageEnhance.Brightness(filtered).enhance(0.8)
-        else:
-            raise ValueError(f"Unknown filter: {filter_type}")
-        
-        result = cv2.cvtColor(np.array(filtered), cv2.COLOR_RGB2BGR)
-        return result
+    def apply_filter(image: np.ndarray, filter_type: str, out: np.ndarray = None) -> np.ndarray:
+        """Apply various filters to image, optionally into a preallocated (or the same) buffer"""
+        if filter_type in FILTER_KERNEL_SPECS:
+            return _filter_keep_border(image, filter_kernel(filter_type), out)
+        if filter_type == "grayscale":
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=out)
+        if filter_type == "sepia":
+            return cv2.transform(image, sepia_matrix(), dst=out)
+        raise ValueError(f"Unknown filter: {filter_type}")
     
     @staticmethod
     def rotate_image(image: np.ndarray, angle: float) -> np.ndarray:
@@ -152,4 +316,248 @@ class ImageAnalyzer:
             flipped = cv2.flip(image, 0)
         else:
             raise ValueError("Direction must be 'horizontal' or 'vertical'")
-        return flipped
\ No newline at end of file
+        return flipped
+
+
+class HistogramStats:
+    """Tonal statistics derived from a 256-bin gray-level histogram.
+
+    Histograms of disjoint regions (tiles, frames, a batch) add up, so
+    partial results merge exactly with :meth:`merge`.
+    """
+
+    def __init__(self, counts: np.ndarray = None):
+        self.counts = np.zeros(256, dtype=np.int64) if counts is None else counts.astype(np.int64)
+
+    @classmethod
+    def of(cls, gray: np.ndarray) -> "HistogramStats":
+        """Histogram of an 8-bit single-channel image"""
+        return cls(cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel())
+
+    def merge(self, other: "HistogramStats") -> "HistogramStats":
+        """Statistics of both regions together"""
+        return HistogramStats(self.counts + other.counts)
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def mean(self) -> float:
+        count = self.count
+        return float(self.counts @ np.arange(256)) / count if count else 0.0
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation"""
+        count = self.count
+        if not count:
+            return 0.0
+        levels = np.arange(256, dtype=np.float64)
+        variance = float(self.counts @ (levels - self.mean) ** 2) / count
+        return variance ** 0.5
+
+    def percentile(self, percent: float) -> int:
+        """Smallest gray level with at least ``percent`` % of pixels at or below it"""
+        cumulative = np.cumsum(self.counts)
+        if not cumulative[-1]:
+            return 0
+        return int(np.searchsorted(cumulative, cumulative[-1] * percent / 100))
+
+    def summary(self) -> dict:
+        """Mean, spread, percentiles, clipping ratios and dynamic range, as returned by /analyze"""
+        count = self.count or 1
+        p1, p99 = self.percentile(1), self.percentile(99)
+        return {
+            "mean": round(self.mean, 2),
+            "std": round(self.std, 2),
+            "percentiles": {str(percent): self.percentile(percent) for percent in (1, 5, 25, 50, 75, 95, 99)},
+            "shadow_clipping": round(float(self.counts[0]) / count, 4),
+            "highlight_clipping": round(float(self.counts[255]) / count, 4),
+            "dynamic_range": p99 - p1
+        }
+
+
+class DetectedObjects:
+    """Objects found by connected-component labelling.
+
+    ``boxes`` is an (N, 4) int32 array of x, y, width, height and ``areas``
+    an int64 array of pixel counts, both in full-resolution coordinates and
+    sorted by decreasing area. Count-only detection leaves both empty.
+    """
+
+    __slots__ = ("count", "boxes", "areas")
+
+    def __init__(self, count: int, boxes: np.ndarray = None, areas: np.ndarray = None):
+        self.count = count
+        self.boxes = boxes if boxes is not None else np.empty((0, 4), dtype=np.int32)
+        self.areas = areas if areas is not None else np.empty(0, dtype=np.int64)
+
+    def scaled(self, scale_x: float, scale_y: float) -> "DetectedObjects":
+        """Boxes and areas mapped into a coordinate system scaled by (scale_x, scale_y)"""
+        if scale_x == 1 and scale_y == 1:
+            return self
+        factors = np.array([scale_x, scale_y, scale_x, scale_y])
+        boxes = np.rint(self.boxes * factors).astype(np.int32)
+        areas = np.rint(self.areas * (scale_x * scale_y)).astype(np.int64)
+        return DetectedObjects(self.count, boxes, areas)
+
+    def to_dict(self, limit: int = None) -> dict:
+        """JSON form; ``limit`` keeps only the largest objects"""
+        return {
+            "count": self.count,
+            "boxes": self.boxes[:limit].tolist(),
+            "areas": self.areas[:limit].tolist()
+        }
+
+
+class ImageAnalysis:
+    """Lazily computed quality metrics for a single image.
+
+    The grayscale plane is converted once and shared by every metric, and
+    brightness, contrast and the tonal summary all come from one histogram.
+    """
+
+    def __init__(self, image: np.ndarray):
+        self.image = image
+        self._gray = None
+        self._histogram = None
+        self._blur_score = None
+        self._object_count = None
+        self._detections = {}
+        self._perceptual_hash = None
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale plane, converted on first use"""
+        if self._gray is None:
+            if self.image.ndim == 2:
+                self._gray = self.image
+            else:
+                self._gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def histogram(self) -> HistogramStats:
+        """Gray-level histogram statistics, computed on first use"""
+        if self._histogram is None:
+            self._histogram = HistogramStats.of(self.gray)
+        return self._histogram
+
+    @property
+    def blur_score(self) -> float:
+        """Blur detection score (0-100)"""
+        if self._blur_score is None:
+            laplacian_var = cv2.Laplacian(self.gray, cv2.CV_64F).var()
+            self._blur_score = round(min(100.0, (laplacian_var / 500) * 100), 2)
+        return self._blur_score
+
+    @property
+    def brightness(self) -> float:
+        """Average brightness (0-100)"""
+        return round((self.histogram.mean / 255) * 100, 2)
+
+    @property
+    def contrast(self) -> float:
+        """Contrast as the standard deviation of the gray plane (0-100)"""
+        return round((self.histogram.std / 128) * 100, 2)
+
+    @property
+    def object_count(self) -> int:
+        """Number of external contours in the binarised gray plane"""
+        if self._object_count is None:
+            _, binary = cv2.threshold(self.gray, 127, 255, cv2.THRESH_BINARY)
+            contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            self._object_count = len(contours)
+        return self._object_count
+
+    def detect_objects(self, threshold: str = "otsu", min_area: int = MIN_OBJECT_AREA,
+                       max_dimension: int = DETECTION_MAX_DIMENSION, boxes: bool = True) -> DetectedObjects:
+        """Bright regions via cv2.connectedComponentsWithStats on an optionally downscaled gray plane.
+
+        ``threshold`` is ``otsu`` (global, picked from the histogram) or
+        ``adaptive`` (pixels brighter than their neighbourhood mean, for
+        uneven lighting). The plane is area-downscaled so its longer side is
+        at most ``max_dimension`` (None keeps full resolution), and
+        components below ``min_area`` full-resolution pixels are dropped.
+        With ``boxes=False`` only the count is produced.
+        """
+        if threshold not in THRESHOLD_METHODS:
+            raise ValueError(f"Unknown threshold method: {threshold}. Use one of: {', '.join(THRESHOLD_METHODS)}")
+        key = (threshold, min_area, max_dimension, boxes)
+        if key in self._detections:
+            return self._detections[key]
+
+        gray = self.gray
+        height, width = gray.shape[:2]
+        factor = 1
+        if max_dimension and max(height, width) > max_dimension:
+            # Whole-pixel factors keep INTER_AREA on its fast block-averaging path (~4x quicker)
+            factor = -(-max(height, width) // max_dimension)
+            gray = cv2.resize(gray, (max(1, width // factor), max(1, height // factor)), interpolation=cv2.INTER_AREA)
+
+        if threshold == "otsu":
+            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        else:
+            block = max(3, (min(gray.shape[:2]) // 16) | 1)
+            binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, block, -5)
+
+        min_pixels = min_area / (factor * factor)
+        if not boxes and min_pixels <= 1:
+            # Every component passes the area filter, so plain labelling (no stats) is enough
+            count, _ = cv2.connectedComponents(binary, connectivity=8, ltype=cv2.CV_32S)
+            self._detections[key] = DetectedObjects(count - 1)  # minus the background label
+            return self._detections[key]
+
+        _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8, ltype=cv2.CV_32S)
+        stats = stats[1:]  # label 0 is the background
+        keep = stats[:, cv2.CC_STAT_AREA] >= min_pixels
+        if not boxes:
+            detection = DetectedObjects(int(np.count_nonzero(keep)))
+        else:
+            stats = stats[keep]
+            order = np.argsort(-stats[:, cv2.CC_STAT_AREA], kind="stable")
+            stats = stats[order]
+            detection = DetectedObjects(
+                len(stats), stats[:, :4].astype(np.int32), stats[:, cv2.CC_STAT_AREA].astype(np.int64)
+            ).scaled(factor, factor)
+        self._detections[key] = detection
+        return detection
+
+    @property
+    def perceptual_hash(self) -> int:
+        """64-bit dHash: sign of horizontal gradients on a 9x8 area-averaged thumbnail.
+
+        Area averaging makes the hash nearly independent of the decode scale,
+        so reduced and full decodes of one image land within a bit or two.
+        """
+        if self._perceptual_hash is None:
+            thumbnail = cv2.resize(self.gray, (9, 8), interpolation=cv2.INTER_AREA)
+            bits = np.packbits(thumbnail[:, 1:] > thumbnail[:, :-1])
+            self._perceptual_hash = int.from_bytes(bits.tobytes(), "big")
+        return self._perceptual_hash
+
+    @property
+    def quality_rating(self) -> str:
+        """Quality rating derived from blur, brightness and contrast"""
+        return ImageAnalyzer.get_quality_rating(self.blur_score, self.brightness, self.contrast)
+
+    def to_dict(self, objects: str = "legacy") -> dict:
+        """All metrics in the shape used by the ``/analyze`` response.
+
+        ``objects`` picks how object_count is computed: ``legacy`` contours
+        or connected components (``count`` / ``boxes``).
+        """
+        if objects not in OBJECT_MODES:
+            raise ValueError(f"Unknown objects mode: {objects}. Use one of: {', '.join(OBJECT_MODES)}")
+        if objects == "legacy":
+            object_count = self.object_count
+        else:
+            object_count = self.detect_objects(boxes=objects == "boxes").count
+        return {
+            "blur_score": self.blur_score,
+            "brightness": self.brightness,
+            "contrast": self.contrast,
+            "object_count": object_count,
+            "quality_rating": self.quality_rating
+        }
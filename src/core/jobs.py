@@ -0,0 +1,358 @@
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from src.core.batch import analyze_bytes
+from src.core.executor import ExecutorSaturated
+from src.core.image_processor import ENHANCE_MODES, OBJECT_MODES, ImageAnalyzer
+from src.core.pipeline import TransformPipeline
+from src.core.tiling import TiledImageAnalyzer
+from src.utils.file_handler import DEFAULT_QUALITY, OUTPUT_FORMATS, UPLOAD_DIR, encode_image, negotiate_format
+from src.utils.metrics import stage
+from src.utils.storage import get_output_store
+
+logger = logging.getLogger(__name__)
+
+# Background workers, kept separate from the request executor so batch work cannot starve interactive calls
+JOB_WORKERS = int(os.environ.get("IMAGE_API_JOB_WORKERS", 0)) or max(1, (os.cpu_count() or 1) // 2)
+# Jobs allowed to wait for a worker before submissions are rejected
+JOB_MAX_BACKLOG = int(os.environ.get("IMAGE_API_JOB_BACKLOG", 256))
+JOB_DB_PATH = os.environ.get("IMAGE_API_JOB_DB", str(UPLOAD_DIR / "jobs.sqlite3"))
+# Finished jobs are purged from the store after this long
+JOB_RETENTION_SECONDS = float(os.environ.get("IMAGE_API_JOB_RETENTION_SECONDS", 7 * 24 * 3600))
+
+# Resize, rotate and filter jobs on images this large (megapixels) run tile by tile into file-backed output
+TILED_MIN_MEGAPIXELS = float(os.environ.get("IMAGE_API_TILED_MIN_MP", 48))
+TILED_OPERATIONS = ("resize", "rotate", "filter")
+
+JOB_OPERATIONS = ("analyze", "resize", "crop", "rotate", "flip", "filter", "enhance")
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    operation TEXT NOT NULL,
+    params TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    result TEXT,
+    error TEXT,
+    owner TEXT
+)
+"""
+_COLUMNS = ("id", "operation", "params", "priority", "status", "created", "started", "finished", "result", "error")
+
+
+def process_owner(pid: int = None) -> str:
+    """"<pid>:<start time>" of a process; the start time tells a reused pid apart"""
+    pid = os.getpid() if pid is None else pid
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            # Field 22; the command name (field 2) may contain spaces, so split after its ")"
+            started = stat.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        started = "0"
+    return f"{pid}:{started}"
+
+
+def owner_alive(owner: str) -> bool:
+    """Whether the process recorded as ``owner`` still runs"""
+    pid, _, _ = (owner or "").partition(":")
+    if not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return process_owner(int(pid)) == owner
+
+
+def validate_job(operation: str, params: dict):
+    """Raise ValueError unless ``params`` are complete for ``operation``"""
+    if operation not in JOB_OPERATIONS:
+        raise ValueError(f"Unknown operation: {operation}. Use one of: {', '.join(JOB_OPERATIONS)}")
+    if not isinstance(params, dict):
+        raise ValueError("Params must be a JSON object")
+    if operation in ("resize", "crop", "rotate", "flip", "filter"):
+        TransformPipeline([{**params, "op": operation}])
+    if operation == "enhance" and params.get("mode", "classic") not in ENHANCE_MODES:
+        raise ValueError(f"Unknown enhance mode: {params['mode']}. Use one of: {', '.join(ENHANCE_MODES)}")
+    if operation == "analyze" and params.get("objects", "legacy") not in OBJECT_MODES:
+        raise ValueError(f"Unknown objects mode: {params['objects']}. Use one of: {', '.join(OBJECT_MODES)}")
+    if operation != "analyze":
+        if not isinstance(params.get("format") or "", str):
+            raise ValueError("Format must be a string")
+        negotiate_format(None, params.get("format"))
+        quality = params.get("quality", DEFAULT_QUALITY)
+        if isinstance(quality, bool) or not isinstance(quality, int) or not 1 <= quality <= 100:
+            raise ValueError("Quality must be an integer between 1 and 100")
+
+
+def run_tiled(image, operation: str, params: dict):
+    """Resize, rotate or filter ``image`` tile by tile.
+
+    The result lives in a temporary-file backed array and intermediates
+    stay tile-sized, so a very large job does not need a second full-size
+    buffer of anonymous memory next to the decoded input.
+    """
+    tiled = TiledImageAnalyzer()
+    if operation == "filter":
+        return tiled.apply_filter(image, params["type"])
+    if operation == "rotate":
+        return tiled.rotate_image(image, float(params["angle"]))
+    if params.get("percentage") is not None:
+        return tiled.resize_by_percentage(image, int(params["percentage"]))
+    return tiled.resize_image(image, int(params["width"]), int(params["height"]))
+
+
+def run_operation(job_id: str, content: bytes, operation: str, params: dict) -> dict:
+    """Execute one job and return its JSON-serialisable result"""
+    if operation == "analyze":
+        return analyze_bytes(content, fast=bool(params.get("fast", False)), objects=params.get("objects", "legacy"))
+
+    image = ImageAnalyzer.read_image(content)
+    with stage("transform"):
+        if operation == "enhance":
+            result = ImageAnalyzer.enhance_image(image, mode=params.get("mode", "classic"))
+        elif operation in TILED_OPERATIONS and image.shape[0] * image.shape[1] >= TILED_MIN_MEGAPIXELS * 1e6:
+            result = run_tiled(image, operation, params)
+        else:
+            result = TransformPipeline.apply_single(image, {**params, "op": operation})
+
+    image_format = negotiate_format(None, params.get("format"))
+    with stage("encode"):
+        body = encode_image(result, image_format, params.get("quality", DEFAULT_QUALITY))
+    _, extension = OUTPUT_FORMATS[image_format]
+    with stage("write"):
+        stored = get_output_store().put(f"{job_id}_{operation}{extension}", body)
+    return {
+        "original_size": {"width": image.shape[1], "height": image.shape[0]},
+        "output_size": {"width": result.shape[1], "height": result.shape[0]},
+        "output_name": stored.name
+    }
+
+
+class JobStore:
+    """SQLite-backed record of job status and results.
+
+    Uploaded bytes are never written here; they live in the in-memory
+    queue until a worker picks the job up. Each job records the process
+    that queued it, so when several server workers share one database, a
+    starting worker only fails the unfinished jobs of processes that died.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH, owner: str = None):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.owner = owner or process_owner()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            owners = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT owner FROM jobs WHERE status IN ('queued', 'running')"
+            )]
+            # Queued inputs died with the process that held them
+            for owner in owners:
+                if owner != self.owner and not owner_alive(owner):
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = 'Interrupted by server restart', finished = ? "
+                        "WHERE status IN ('queued', 'running') AND owner IS ?", (time.time(), owner)
+                    )
+
+    def create(self, job_id: str, operation: str, params: dict, priority: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, operation, params, priority, status, created, owner) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, operation, json.dumps(params), priority, time.time(), self.owner)
+            )
+
+    def mark_running(self, job_id: str):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (time.time(), job_id))
+
+    def mark_finished(self, job_id: str, result: dict = None, error: str = None):
+        status = "failed" if error is not None else "succeeded"
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished = ?, result = ?, error = ? WHERE id = ?",
+                (status, time.time(), json.dumps(result) if result is not None else None, error, job_id)
+            )
+
+    def get(self, job_id: str):
+        """Job record as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def purge(self, finished_before: float) -> int:
+        """Delete jobs that finished before ``finished_before``"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished < ?", (finished_before,)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobManager:
+    """Priority queue of submitted jobs drained by a pool of worker threads.
+
+    Higher ``priority`` runs first, ties in submission order. At most
+    ``max_backlog`` jobs may wait; further submissions raise
+    :class:`ExecutorSaturated` so the API can answer 503.
+    """
+
+    def __init__(self, store: JobStore = None, workers: int = JOB_WORKERS, max_backlog: int = JOB_MAX_BACKLOG,
+                 retention_seconds: float = JOB_RETENTION_SECONDS):
+        self.store = store if store is not None else JobStore()
+        self.workers = workers
+        self.max_backlog = max_backlog
+        self.retention_seconds = retention_seconds
+        self._heap = []
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_service = 0.0
+        self._last_purge = 0.0
+        self._threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True) for index in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _retry_after(self) -> int:
+        mean_service = self._total_service / self._completed if self._completed else 1.0
+        return max(1, round(mean_service * len(self._heap) / max(self.workers, 1)))
+
+    def submit(self, content: bytes, operation: str, params: dict = None, priority: int = 0) -> str:
+        """Validate and enqueue a job; returns its id"""
+        params = params or {}
+        validate_job(operation, params)
+        job_id = uuid.uuid4().hex
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Job manager is shut down")
+            if len(self._heap) >= self.max_backlog:
+                self._rejected += 1
+                raise ExecutorSaturated(self._retry_after())
+            self.store.create(job_id, operation, params, priority)
+            self._sequence += 1
+            heapq.heappush(self._heap, (-priority, self._sequence, job_id, operation, params, content))
+            self._condition.notify()
+        return job_id
+
+    def get(self, job_id: str):
+        """Status and result of a job, or None if unknown"""
+        return self.store.get(job_id)
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._heap and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                _, _, job_id, operation, params, content = heapq.heappop(self._heap)
+                self._running += 1
+
+            started = time.perf_counter()
+            self.store.mark_running(job_id)
+            try:
+                result = run_operation(job_id, content, operation, params)
+                self.store.mark_finished(job_id, result=result)
+                failed = False
+            except Exception as e:
+                if not isinstance(e, ValueError):
+                    logger.error(f"Job {job_id} ({operation}) failed: {str(e)}")
+                self.store.mark_finished(job_id, error=str(e) or type(e).__name__)
+                failed = True
+
+            with self._condition:
+                self._running -= 1
+                self._completed += 1
+                self._failed += failed
+                self._total_service += time.perf_counter() - started
+                purge = time.time() - self._last_purge > 60
+                if purge:
+                    self._last_purge = time.time()
+            if purge:
+                self.store.purge(time.time() - self.retention_seconds)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "workers": self.workers,
+                "max_backlog": self.max_backlog,
+                "queued": len(self._heap),
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "mean_service_ms": round(self._total_service / self._completed * 1000, 3) if self._completed else 0.0
+            }
+
+    def shutdown(self):
+        """Stop the workers; jobs still queued are marked failed"""
+        with self._condition:
+            self._closed = True
+            abandoned = [entry[2] for entry in self._heap]
+            self._heap.clear()
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        for job_id in abandoned:
+            self.store.mark_finished(job_id, error="Cancelled by server shutdown")
+        self.store.close()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Return the shared job manager, starting its workers on first use"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager()
+                logger.info(f"Started {JOB_WORKERS} job workers, backlog limit {JOB_MAX_BACKLOG}")
+    return _manager
+
+
+def shutdown_job_manager():
+    """Stop the shared job manager if it was started"""
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.shutdown()
+            _manager = None
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from src.core.image_processor import FILTER_TYPES, ImageAnalyzer
+from src.utils.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# Operations that only move pixels around and can be folded into one affine warp
+GEOMETRIC_OPS = {"crop", "resize", "rotate", "flip"}
+PIPELINE_OPS = GEOMETRIC_OPS | {"filter"}
+REQUIRED_PARAMS = {
+    "crop": ("x", "y", "width", "height"),
+    "rotate": ("angle",),
+    "flip": ("direction",),
+    "filter": ("type",)
+}
+# Numeric parameters and the type they are converted to when planning
+NUMERIC_PARAMS = {"x": int, "y": int, "width": int, "height": int, "percentage": int, "angle": float}
+
+
+def crop_matrix(x: int, y: int) -> np.ndarray:
+    """Affine matrix (3x3) of a crop whose top-left corner is (x, y)"""
+    return np.array([[1, 0, -x], [0, 1, -y], [0, 0, 1]], dtype=np.float64)
+
+
+def scale_matrix(width: int, height: int, new_width: int, new_height: int) -> np.ndarray:
+    """Affine matrix (3x3) matching cv2.resize's pixel-centre convention"""
+    sx = new_width / width
+    sy = new_height / height
+    return np.array([[sx, 0, 0.5 * sx - 0.5], [0, sy, 0.5 * sy - 0.5], [0, 0, 1]], dtype=np.float64)
+
+
+def rotation_matrix(width: int, height: int, angle: float) -> np.ndarray:
+    """Affine matrix (3x3) of ImageAnalyzer.rotate_image"""
+    matrix = cv2.getRotationMatrix2D((width // 2, height // 2), angle, 1.0)
+    return np.vstack([matrix, [0, 0, 1]])
+
+
+def flip_matrix(width: int, height: int, direction: str) -> np.ndarray:
+    """Affine matrix (3x3) of ImageAnalyzer.flip_image"""
+    if direction == "horizontal":
+        return np.array([[-1, 0, width - 1], [0, 1, 0], [0, 0, 1]], dtype=np.float64)
+    if direction == "vertical":
+        return np.array([[1, 0, 0], [0, -1, height - 1], [0, 0, 1]], dtype=np.float64)
+    raise ValueError("Direction must be 'horizontal' or 'vertical'")
+
+
+def check_number(op: str, name: str, value, kind: type):
+    """Raise ValueError unless ``value`` converts to a finite ``kind``"""
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        int(kind(value))  # int() also rejects NaN and infinity
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"Operation '{op}' parameter '{name}' must be a number, got {value!r}")
+
+
+def warp_border_mode(operations: list) -> int:
+    """Border handling for a fused warp group.
+
+    Rotation fills uncovered corners with black like rotate_image; without
+    it, edge pixels are replicated so upscaling matches cv2.resize.
+    """
+    if any(operation["op"] == "rotate" for operation in operations):
+        return cv2.BORDER_CONSTANT
+    return cv2.BORDER_REPLICATE
+
+
+class TransformPipeline:
+    """Ordered chain of transformations executed with as few passes as possible.
+
+    Each operation is a dict such as ``{"op": "crop", "x": 0, "y": 0,
+    "width": 100, "height": 80}``, ``{"op": "resize", "width": 64,
+    "height": 64}``, ``{"op": "resize", "percentage": 50}``,
+    ``{"op": "rotate", "angle": 90}``, ``{"op": "flip", "direction":
+    "horizontal"}`` or ``{"op": "filter", "type": "sepia"}``.
+
+    Planning folds runs of geometric operations into a single
+    ``cv2.warpAffine``; a crop with no warp pending is applied as a
+    zero-copy view. Filters run between warps.
+    """
+
+    def __init__(self, operations: list):
+        if not isinstance(operations, list) or not operations:
+            raise ValueError("Operations must be a non-empty list")
+        for operation in operations:
+            if not isinstance(operation, dict) or operation.get("op") not in PIPELINE_OPS:
+                raise ValueError(f"Unknown operation: {operation}")
+            op = operation["op"]
+            if op == "resize":
+                required = ("percentage",) if operation.get("percentage") is not None else ("width", "height")
+            else:
+                required = REQUIRED_PARAMS[op]
+            missing = [name for name in required if operation.get(name) is None]
+            if missing:
+                raise ValueError(f"Operation '{op}' is missing: {', '.join(missing)}")
+            for name in required:
+                if name in NUMERIC_PARAMS:
+                    check_number(op, name, operation[name], NUMERIC_PARAMS[name])
+            if op == "filter" and operation.get("type") not in FILTER_TYPES:
+                raise ValueError(f"Unknown filter: {operation.get('type')}")
+        self.operations = operations
+
+    def plan(self, shape: tuple) -> list:
+        """Fuse the operations for an image of ``shape`` into execution steps.
+
+        Steps are ``("view", x, y, width, height)``,
+        ``("warp", matrix, (width, height), operations)`` or
+        ``("filter", filter_type)``.
+        """
+        height, width = shape[:2]
+        steps = []
+        matrix = np.eye(3)
+        fused = []
+
+        def flush():
+            nonlocal matrix, fused
+            if fused:
+                steps.append(("warp", matrix[:2], (width, height), fused))
+            matrix = np.eye(3)
+            fused = []
+
+        for operation in self.operations:
+            op = operation["op"]
+            if op == "filter":
+                flush()
+                steps.append(("filter", operation["type"]))
+            elif op == "crop":
+                x, y = int(operation["x"]), int(operation["y"])
+                crop_width, crop_height = int(operation["width"]), int(operation["height"])
+                if x < 0 or y < 0 or crop_width <= 0 or crop_height <= 0:
+                    raise ValueError("Invalid crop parameters")
+                if x + crop_width > width or y + crop_height > height:
+                    raise ValueError("Crop area exceeds image boundaries")
+                if not fused:
+                    # No warp is pending, so slicing is enough
+                    if steps and steps[-1][0] == "view":
+                        _, view_x, view_y, _, _ = steps.pop()
+                        x, y = x + view_x, y + view_y
+                    steps.append(("view", x, y, crop_width, crop_height))
+                else:
+                    matrix = crop_matrix(x, y) @ matrix
+                    fused.append(operation)
+                width, height = crop_width, crop_height
+            elif op == "resize":
+                if operation.get("percentage") is not None:
+                    new_width, new_height = ImageAnalyzer.percentage_size(
+                        width, height, int(operation["percentage"])
+                    )
+                else:
+                    new_width, new_height = int(operation["width"]), int(operation["height"])
+                if new_width <= 0 or new_height <= 0:
+                    raise ValueError("Width and height must be positive")
+                matrix = scale_matrix(width, height, new_width, new_height) @ matrix
+                fused.append(operation)
+                width, height = new_width, new_height
+            elif op == "rotate":
+                matrix = rotation_matrix(width, height, float(operation["angle"])) @ matrix
+                fused.append(operation)
+            elif op == "flip":
+                matrix = flip_matrix(width, height, operation["direction"]) @ matrix
+                fused.append(operation)
+        flush()
+        return steps
+
+    def run(self, image: np.ndarray) -> np.ndarray:
+        """Apply the planned steps to a decoded image"""
+        for step in self.plan(image.shape):
+            kind = step[0]
+            if kind == "view":
+                _, x, y, width, height = step
+                image = image[y:y+height, x:x+width]
+            elif kind == "filter":
+                image = ImageAnalyzer.apply_filter(image, step[1])
+            elif len(step[3]) == 1:
+                # A lone operation keeps the exact output of its ImageAnalyzer method
+                image = self.apply_single(image, step[3][0])
+            else:
+                _, matrix, size, operations = step
+                image = cv2.warpAffine(image, matrix, size, flags=cv2.INTER_LINEAR,
+                                       borderMode=warp_border_mode(operations))
+        return image
+
+    @staticmethod
+    def apply_single(image: np.ndarray, operation: dict) -> np.ndarray:
+        """Apply one validated operation exactly as its ImageAnalyzer method would"""
+        op = operation["op"]
+        if op == "filter":
+            return ImageAnalyzer.apply_filter(image, operation["type"])
+        if op == "crop":
+            return ImageAnalyzer.crop_image(
+                image, int(operation["x"]), int(operation["y"]), int(operation["width"]), int(operation["height"])
+            )
+        if op == "resize":
+            if operation.get("percentage") is not None:
+                return ImageAnalyzer.resize_by_percentage(image, int(operation["percentage"]))
+            return ImageAnalyzer.resize_image(image, int(operation["width"]), int(operation["height"]))
+        if op == "rotate":
+            return ImageAnalyzer.rotate_image(image, float(operation["angle"]))
+        return ImageAnalyzer.flip_image(image, operation["direction"])
@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+from src.core.image_processor import ImageAnalyzer
+from src.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+# Worker processes of the shared-memory pool; defaults to one per core
+SHM_WORKERS = int(os.environ.get("IMAGE_API_SHM_WORKERS", 0)) or os.cpu_count() or 1
+# Released segments kept for reuse (total size) before further ones are unlinked
+SHM_POOL_BYTES = int(os.environ.get("IMAGE_API_SHM_POOL_MB", 1024)) * 2 ** 20
+# Segments are named <prefix>_<owner pid>_<n>, so those of a dead owner can be found and removed
+SEGMENT_PREFIX = "imgapi"
+# Segment sizes are powers of two from here up, so images of similar size share a size class
+MIN_SEGMENT_BYTES = 2 ** 20
+SHM_DIR = "/dev/shm"
+# Attached segments a worker keeps mapped; older mappings are closed
+WORKER_ATTACH_LIMIT = 32
+# Names of unlinked segments sent with every task, so workers unmap them promptly
+RETIRED_NAMES = 64
+
+
+class ArrayRef(NamedTuple):
+    """Where an array lives: segment name, byte offset, shape and dtype string"""
+    segment: str
+    offset: int
+    shape: tuple
+    dtype: str
+
+
+def segment_size(nbytes: int) -> int:
+    """Size class of a segment holding ``nbytes``"""
+    return max(MIN_SEGMENT_BYTES, 1 << (max(nbytes, 1) - 1).bit_length())
+
+
+def _shm_available() -> int:
+    try:
+        stats = os.statvfs(SHM_DIR)
+    except OSError:
+        return -1
+    return stats.f_bavail * stats.f_frsize
+
+
+def _close(segment: shared_memory.SharedMemory):
+    try:
+        segment.close()
+    except BufferError:
+        # An array still views it; the mapping goes when that array does
+        pass
+
+
+def _destroy(segment: shared_memory.SharedMemory):
+    _close(segment)
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _destroy_all(segments: dict):
+    for segment in list(segments.values()):
+        _destroy(segment)
+    segments.clear()
+
+
+def sweep_orphaned_segments(directory: str = SHM_DIR) -> int:
+    """Unlink segments left behind by owners that no longer run (e.g. killed with their resource tracker)"""
+    removed = 0
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    for name in names:
+        parts = name.split("_")
+        if len(parts) != 3 or parts[0] != SEGMENT_PREFIX or not parts[1].isdigit():
+            continue
+        try:
+            os.kill(int(parts[1]), 0)
+            continue
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            continue
+        try:
+            os.unlink(os.path.join(directory, name))
+            removed += 1
+        except OSError:
+            pass
+    if removed:
+        logger.warning(f"Removed {removed} orphaned shared-memory segments")
+    return removed
+
+
+class SegmentPool:
+    """Shared-memory segments owned by this process, recycled by size class.
+
+    Only the owner creates and unlinks segments; workers just attach. Every
+    segment is registered with the owner's resource tracker when created, so
+    they are unlinked even if the owner crashes, and the rest are unlinked
+    on close() or at interpreter exit. Creation fails with OSError (rather
+    than a later SIGBUS) when /dev/shm lacks room for the segment.
+    """
+
+    def __init__(self, max_free_bytes: int = SHM_POOL_BYTES):
+        self.max_free_bytes = max_free_bytes
+        self._lock = threading.Lock()
+        self._live = {}
+        self._free = {}
+        self._free_bytes = 0
+        self._names = itertools.count()
+        self._closed = False
+        self.retired = deque(maxlen=RETIRED_NAMES)
+        self.created = 0
+        self.reused = 0
+        self.unlinked = 0
+        self._finalizer = weakref.finalize(self, _destroy_all, self._live)
+
+    def acquire(self, nbytes: int) -> shared_memory.SharedMemory:
+        """A segment of at least ``nbytes``, reused if one of that size class is free"""
+        size = segment_size(nbytes)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Segment pool is closed")
+            free = self._free.get(size)
+            if free:
+                self._free_bytes -= size
+                self.reused += 1
+                return free.pop()
+        available = _shm_available()
+        if 0 <= available < size:
+            raise OSError(f"Not enough shared memory for a {size} byte segment ({available} bytes free)")
+        segment = shared_memory.SharedMemory(
+            name=f"{SEGMENT_PREFIX}_{os.getpid()}_{next(self._names)}", create=True, size=size
+        )
+        with self._lock:
+            self._live[segment.name] = segment
+            self.created += 1
+        return segment
+
+    def release(self, segment: shared_memory.SharedMemory):
+        """Return a segment for reuse, or unlink it if the free list is full"""
+        size = segment_size(segment.size)
+        with self._lock:
+            if not self._closed and self._free_bytes + size <= self.max_free_bytes:
+                self._free.setdefault(size, []).append(segment)
+                self._free_bytes += size
+                return
+            self._live.pop(segment.name, None)
+            self.retired.append(segment.name)
+            self.unlinked += 1
+        _destroy(segment)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "segments": len(self._live),
+                "free_segments": sum(len(free) for free in self._free.values()),
+                "free_mb": round(self._free_bytes / 2 ** 20, 3),
+                "created": self.created,
+                "reused": self.reused,
+                "unlinked": self.unlinked
+            }
+
+    def close(self):
+        """Unlink every segment"""
+        with self._lock:
+            self._closed = True
+            self._free.clear()
+            self._free_bytes = 0
+        self._finalizer()
+
+
+# ---------------- Worker side ----------------
+_attached = OrderedDict()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    segment = _attached.get(name)
+    if segment is not None:
+        _attached.move_to_end(name)
+        return segment
+    # On Python < 3.13 attaching also registers the name with the resource tracker.
+    # Spawned workers share the owner's tracker, where the name is already registered,
+    # so this is a no-op; unregistering here would drop the owner's crash cleanup.
+    segment = shared_memory.SharedMemory(name=name)
+    _attached[name] = segment
+    while len(_attached) > WORKER_ATTACH_LIMIT:
+        _close(_attached.popitem(last=False)[1])
+    return segment
+
+
+def _forget(names: tuple):
+    """Unmap segments the owner has unlinked, so their memory is returned"""
+    for name in names:
+        segment = _attached.pop(name, None)
+        if segment is not None:
+            _close(segment)
+
+
+def _view(ref: ArrayRef) -> np.ndarray:
+    return np.ndarray(ref.shape, dtype=ref.dtype, buffer=_attach(ref.segment).buf, offset=ref.offset)
+
+
+def _run(fn, source: ArrayRef, target: str, capacity: int, retired: tuple, args: tuple, kwargs: dict):
+    """Call ``fn`` on a view of the source segment and write its result into the target segment.
+
+    Returns the result's ArrayRef, or the array itself (pickled back) when
+    it does not fit the target.
+    """
+    _forget(retired)
+    image = _view(source)
+    image.flags.writeable = False
+    result = np.asarray(fn(image, *args, **kwargs))
+    del image
+    if target is None or result.nbytes > capacity:
+        return result
+    ref = ArrayRef(target, 0, result.shape, result.dtype.str)
+    np.copyto(_view(ref), result)
+    return ref
+
+
+def _exit_with_parent():
+    """Worker initializer: exit as soon as the owner process dies.
+
+    Orphaned workers would keep the resource tracker's pipe open, so the
+    tracker would never notice the owner is gone and unlink its segments.
+    """
+    parent = multiprocessing.parent_process()
+    if parent is None:
+        return
+
+    def watch():
+        multiprocessing.connection.wait([parent.sentinel])
+        os._exit(1)
+
+    threading.Thread(target=watch, name="parent-watch", daemon=True).start()
+
+
+def _decode(content: np.ndarray, **kwargs) -> np.ndarray:
+    return ImageAnalyzer.read_image(content, **kwargs)
+
+
+# ---------------- Owner side ----------------
+class SharedArrayWorkers:
+    """Process pool that exchanges images through shared memory instead of pickles.
+
+    The input is copied once into a pooled segment and a second segment
+    receives the result; only ArrayRef descriptors cross the task queue.
+    Results are returned as arrays viewing that segment, which goes back to
+    the pool when the array (and every view of it) is garbage collected.
+    Tasks fall back to plain pickling when shared memory is exhausted or a
+    result is larger than ``out_nbytes``.
+    """
+
+    def __init__(self, max_workers: int = SHM_WORKERS, segments: SegmentPool = None):
+        self.max_workers = max_workers
+        self.segments = segments or SegmentPool()
+        # spawn avoids forking a server process that already runs threads
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"), initializer=_exit_with_parent
+        )
+        self._lock = threading.Lock()
+        self.shared = 0
+        self.pickled = 0
+
+    def _count(self, shared: bool):
+        with self._lock:
+            if shared:
+                self.shared += 1
+            else:
+                self.pickled += 1
+
+    def _acquire(self, nbytes: int):
+        try:
+            return self.segments.acquire(nbytes)
+        except OSError as e:
+            logger.warning(f"Falling back to pickling: {str(e)}")
+            return None
+
+    def _finish(self, task: Future, result: Future, source, target):
+        self.segments.release(source)
+        if not result.set_running_or_notify_cancel():
+            if target is not None:
+                self.segments.release(target)
+            return
+        try:
+            outcome = task.result()
+        except BaseException as e:
+            if target is not None:
+                self.segments.release(target)
+            result.set_exception(e)
+            return
+        if isinstance(outcome, ArrayRef):
+            array = np.ndarray(outcome.shape, dtype=outcome.dtype, buffer=target.buf, offset=outcome.offset)
+            weakref.finalize(array, self.segments.release, target)
+            self._count(True)
+        else:
+            if target is not None:
+                self.segments.release(target)
+            array = outcome
+            self._count(False)
+        result.set_result(array)
+
+    def submit(self, fn, image: np.ndarray, *args, out_nbytes: int = None, **kwargs) -> Future:
+        """Run ``fn(image, *args, **kwargs)`` in a worker; the future resolves to the result array.
+
+        ``fn`` must be picklable (a module-level function or static method)
+        and must not modify ``image``. ``out_nbytes`` bounds the result size
+        (default: the input's size).
+        """
+        image = np.asarray(image)
+        source = self._acquire(image.nbytes)
+        if source is None:
+            self._count(False)
+            return self._pool.submit(fn, image, *args, **kwargs)
+        np.copyto(np.ndarray(image.shape, dtype=image.dtype, buffer=source.buf), image)
+        capacity = image.nbytes if out_nbytes is None else out_nbytes
+        target = self._acquire(capacity)
+        ref = ArrayRef(source.name, 0, image.shape, image.dtype.str)
+        try:
+            task = self._pool.submit(
+                _run, fn, ref, target and target.name, capacity, tuple(self.segments.retired), args, kwargs
+            )
+        except BaseException:
+            self.segments.release(source)
+            if target is not None:
+                self.segments.release(target)
+            raise
+        result = Future()
+        task.add_done_callback(lambda done: self._finish(done, result, source, target))
+        return result
+
+    def decode(self, content: bytes, **kwargs) -> Future:
+        """Decode an encoded image in a worker (see ImageAnalyzer.read_image for ``kwargs``)"""
+        size = ImageAnalyzer.header_size(content)
+        # Without a readable header the result comes back pickled (or the worker raises the decode error)
+        out_nbytes = size[0] * size[1] * 3 if size else 0
+        return self.submit(_decode, np.frombuffer(content, np.uint8), out_nbytes=out_nbytes, **kwargs)
+
+    def stats(self) -> dict:
+        """Segment pool counters and how many results came back shared vs pickled"""
+        with self._lock:
+            return {"max_workers": self.max_workers, "shared": self.shared, "pickled": self.pickled,
+                    **self.segments.stats()}
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers and unlink every segment"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        self.segments.close()
+
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import functools
+import itertools
+import logging
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are not coordinated between processes
+    fcntl = None
+
+from src.utils.file_handler import UPLOAD_DIR
+from src.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+SIMILARITY_INDEX_PATH = Path(os.environ.get("IMAGE_API_SIMILARITY_INDEX", UPLOAD_DIR / "phash_index.npz"))
+# Additions between automatic saves of the index; 0 saves only at shutdown
+SIMILARITY_SAVE_EVERY = int(os.environ.get("IMAGE_API_SIMILARITY_SAVE_EVERY", 1000))
+# Largest Hamming distance at which /analyze?dedupe=true reuses an earlier analysis
+DUPLICATE_DISTANCE = int(os.environ.get("IMAGE_API_DUPLICATE_DISTANCE", 4))
+
+HASH_BITS = 64
+CHUNK_BITS = 16
+CHUNKS = HASH_BITS // CHUNK_BITS
+MAX_DISTANCE = 16
+# Entries added since the last rebuild are scanned linearly; beyond this the tables are re-sorted
+MAX_PENDING = 8192
+
+_BUCKETS = 1 << CHUNK_BITS
+
+
+@functools.cache
+def _flip_masks(radius: int) -> np.ndarray:
+    """Every CHUNK_BITS-wide value with at most ``radius`` bits set"""
+    masks = [0]
+    for flipped in range(1, radius + 1):
+        for bits in itertools.combinations(range(CHUNK_BITS), flipped):
+            masks.append(sum(1 << bit for bit in bits))
+    return np.array(masks, dtype=np.uint16)
+
+
+@functools.cache
+def _byte_popcount() -> np.ndarray:
+    return np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Set bits per uint64 element"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _byte_popcount()[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class HashIndex:
+    """Hamming-distance index of 64-bit perceptual hashes (multi-index hashing).
+
+    Each hash is split into four 16-bit chunks, and each chunk position has
+    a table of entries sorted by that chunk with the start of every value's
+    bucket. By the pigeonhole
+    principle, a hash within distance ``d`` differs from the query by at most
+    ``d // 4`` bits in some chunk. A lookup therefore probes each table for
+    the chunk values within that radius, then checks the exact distance of
+    the few candidates with a vectorised popcount.
+
+    New entries go to a pending tail that is scanned linearly until
+    MAX_PENDING accumulate and the tables are re-sorted. Memory is about 24
+    bytes per entry (plus 2 MB of bucket offsets) and its id and name.
+    """
+
+    def __init__(self):
+        self._hashes = np.empty(1024, dtype=np.uint64)
+        self._count = 0
+        self._indexed = 0
+        self._tables = []
+        self.ids = []
+        self.names = []
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _rebuild(self):
+        hashes = self._hashes[:self._count]
+        tables = []
+        for chunk in range(CHUNKS):
+            keys = ((hashes >> np.uint64(chunk * CHUNK_BITS)) & np.uint64(_BUCKETS - 1)).astype(np.uint16)
+            order = np.argsort(keys, kind="stable").astype(np.uint32)
+            # bucket_starts[v]:bucket_starts[v + 1] is the run of entries whose chunk equals v
+            bucket_starts = np.searchsorted(keys[order], np.arange(_BUCKETS + 1)).astype(np.int64)
+            tables.append((bucket_starts, order))
+        self._tables = tables
+        self._indexed = self._count
+
+    def add(self, value: int, entry_id: str, name: str = "") -> bool:
+        """Index ``value`` under ``entry_id``; returns False if that id already has this hash"""
+        with self._lock:
+            for index, _ in self._search(value, 0):
+                if self.ids[index] == entry_id:
+                    return False
+            if self._count == len(self._hashes):
+                self._hashes = np.concatenate([self._hashes, np.empty_like(self._hashes)])
+            self._hashes[self._count] = value
+            self._count += 1
+            self.ids.append(entry_id)
+            self.names.append(name)
+            if self._count - self._indexed > MAX_PENDING:
+                self._rebuild()
+            return True
+
+    def _search(self, value: int, max_distance: int) -> list:
+        query = np.uint64(value)
+        radius = max_distance // CHUNKS
+        candidates = []
+        for chunk, (bucket_starts, order) in enumerate(self._tables):
+            probes = (_flip_masks(radius) ^ ((value >> (chunk * CHUNK_BITS)) & 0xFFFF)).astype(np.int64)
+            starts = bucket_starts[probes]
+            lengths = bucket_starts[probes + 1] - starts
+            total = int(lengths.sum())
+            if total:
+                # Gather every matching bucket in one indexing operation
+                run_offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+                candidates.append(order[run_offsets + np.arange(total)])
+        if self._count > self._indexed:
+            candidates.append(np.arange(self._indexed, self._count, dtype=np.uint32))
+        if not candidates:
+            return []
+
+        # A hash may be found through several chunks; only the few close ones need de-duplicating
+        candidates = np.concatenate(candidates)
+        distances = popcount(self._hashes[candidates] ^ query)
+        close = distances <= max_distance
+        matches = set(zip(candidates[close].tolist(), distances[close].tolist()))
+        return sorted(matches, key=lambda match: (match[1], match[0]))
+
+    def query(self, value: int, max_distance: int, limit: int = 10) -> list:
+        """Entries within ``max_distance`` bits of ``value``, nearest first"""
+        if not 0 <= max_distance <= MAX_DISTANCE:
+            raise ValueError(f"Distance must be between 0 and {MAX_DISTANCE}")
+        with self._lock:
+            return [
+                {"id": self.ids[index], "name": self.names[index], "distance": distance,
+                 "perceptual_hash": f"{int(self._hashes[index]):016x}"}
+                for index, distance in self._search(value, max_distance)[:limit]
+            ]
+
+    def save(self, path: Path):
+        """Write the index atomically as a NumPy .npz archive"""
+        with self._lock:
+            names = [name.encode() for name in self.names]
+            arrays = {
+                "hashes": self._hashes[:self._count].copy(),
+                "ids": np.array(self.ids, dtype="S"),
+                "names": np.frombuffer(b"".join(names), dtype=np.uint8),
+                "name_ends": np.cumsum([len(name) for name in names], dtype=np.int64)
+            }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as handle:
+            np.savez(handle, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "HashIndex":
+        """Index previously written by save()"""
+        index = cls()
+        with np.load(path) as arrays:
+            hashes = arrays["hashes"]
+            blob = arrays["names"].tobytes()
+            ends = arrays["name_ends"].tolist()
+            index.ids = [entry_id.decode() for entry_id in arrays["ids"]]
+        starts = [0] + ends[:-1]
+        index.names = [blob[start:end].decode() for start, end in zip(starts, ends)]
+        index._hashes = np.concatenate([hashes.astype(np.uint64), np.empty(1024, dtype=np.uint64)])
+        index._count = len(hashes)
+        index._rebuild()
+        return index
+
+
+class PersistentHashIndex(HashIndex):
+    """HashIndex that reloads from ``path`` and saves itself every ``save_every`` additions.
+
+    Several server processes may share one file: a save first merges in the
+    entries other processes have saved since this one last read the file
+    (under an exclusive lock file), then atomically replaces it, so no
+    process overwrites the others' entries.
+    """
+
+    def __init__(self, path: Path = SIMILARITY_INDEX_PATH, save_every: int = SIMILARITY_SAVE_EVERY):
+        super().__init__()
+        self.path = Path(path)
+        self.save_every = save_every
+        self._unsaved = 0
+        self._seen = None
+        if self.path.exists():
+            self._seen = self._file_version()
+            loaded = HashIndex.load(self.path)
+            self._hashes, self._count, self._indexed = loaded._hashes, loaded._count, loaded._indexed
+            self._tables, self.ids, self.names = loaded._tables, loaded.ids, loaded.names
+
+    def _file_version(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def add(self, value: int, entry_id: str, name: str = "") -> bool:
+        with self._lock:
+            added = super().add(value, entry_id, name)
+            if added:
+                self._unsaved += 1
+                if self.save_every and self._unsaved >= self.save_every:
+                    self.flush()
+        return added
+
+    def _merge_saved(self) -> int:
+        """Add entries saved by other processes since this one last read or wrote the file"""
+        version = self._file_version()
+        if version is None or version == self._seen:
+            return 0
+        saved = HashIndex.load(self.path)
+        known = set(zip(self.ids, self._hashes[:self._count].tolist()))
+        merged = 0
+        for value, entry_id, name in zip(saved._hashes[:saved._count].tolist(), saved.ids, saved.names):
+            if (entry_id, value) not in known:
+                merged += HashIndex.add(self, value, entry_id, name)
+        return merged
+
+    def flush(self):
+        """Merge in other processes' saved entries and save, if anything changed since the last save"""
+        with self._lock:
+            if not self._unsaved:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path.with_name(self.path.name + ".lock"), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                merged = self._merge_saved()
+                self.save(self.path)
+                self._seen = self._file_version()
+            self._unsaved = 0
+            if merged:
+                logger.info(f"Merged {merged} entries saved by other processes into {self.path}")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index() -> PersistentHashIndex:
+    """Return the shared perceptual-hash index, loading it from disk on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = PersistentHashIndex()
+                logger.info(f"Similarity index ready with {len(_index)} entries ({SIMILARITY_INDEX_PATH})")
+    return _index
+
+
+def flush_similarity_index():
+    """Persist the shared index if it was used"""
+    if _index is not None:
+        _index.flush()
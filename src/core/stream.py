@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from src.core.batch import MAX_REPORTED_OBJECTS
+from src.core.image_processor import OBJECT_MODES, ImageAnalysis, ImageAnalyzer
+from src.utils.lazy import lazy_import
+from src.utils.metrics import observe_image, stage
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# Frame encodings accepted on a stream: compressed images, or raw 8-bit gray / BGR pixels
+STREAM_FORMATS = ("encoded", "gray", "bgr")
+STREAM_METRICS = ("blur_score", "brightness", "contrast")
+# Weight of the newest frame in the exponential moving averages
+DEFAULT_EMA_ALPHA = 0.1
+
+
+class QualityEMA:
+    """Exponentially weighted mean and standard deviation of each quality metric.
+
+    Updated in O(1) per frame (West's incremental weighted variance), so a
+    stream of any length needs no history.
+    """
+
+    def __init__(self, alpha: float = DEFAULT_EMA_ALPHA):
+        if not 0 < alpha <= 1:
+            raise ValueError("EMA alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.frames = 0
+        self._mean = dict.fromkeys(STREAM_METRICS, 0.0)
+        self._variance = dict.fromkeys(STREAM_METRICS, 0.0)
+
+    def update(self, metrics: dict):
+        self.frames += 1
+        for name in STREAM_METRICS:
+            value = metrics[name]
+            if self.frames == 1:
+                self._mean[name] = value
+                continue
+            delta = value - self._mean[name]
+            increment = self.alpha * delta
+            self._mean[name] += increment
+            self._variance[name] = (1 - self.alpha) * (self._variance[name] + delta * increment)
+
+    def to_dict(self) -> dict:
+        summary = {
+            name: {"mean": round(self._mean[name], 2), "std": round(self._variance[name] ** 0.5, 2)}
+            for name in STREAM_METRICS
+        }
+        summary["quality_rating"] = ImageAnalyzer.get_quality_rating(
+            *(self._mean[name] for name in STREAM_METRICS)
+        )
+        summary["frames"] = self.frames
+        return summary
+
+
+class StreamAnalyzer:
+    """Per-connection frame analyzer that reuses its working buffers.
+
+    The gray plane (for raw BGR frames) and the Laplacian plane are
+    allocated once per frame size and written in place, so a steady stream
+    allocates no full-resolution arrays beyond the decoder's output.
+    Encoded frames are decoded straight to luma, since every metric is
+    computed on the gray plane. blur_score, brightness and contrast match
+    ImageAnalysis; object_count uses the requested ``objects`` mode.
+    """
+
+    def __init__(self, frame_format: str = "encoded", width: int = None, height: int = None,
+                 objects: str = "count", alpha: float = DEFAULT_EMA_ALPHA):
+        if frame_format not in STREAM_FORMATS:
+            raise ValueError(f"Unknown frame format: {frame_format}. Use one of: {', '.join(STREAM_FORMATS)}")
+        if frame_format != "encoded" and not (width and height and width > 0 and height > 0):
+            raise ValueError("Raw frames need a positive width and height")
+        if objects not in OBJECT_MODES:
+            raise ValueError(f"Unknown objects mode: {objects}. Use one of: {', '.join(OBJECT_MODES)}")
+        self.frame_format = frame_format
+        self.width = width
+        self.height = height
+        self.objects = objects
+        self.ema = QualityEMA(alpha)
+        self._gray = None
+        self._laplacian = None
+
+    def _buffers(self, shape: tuple):
+        if self._laplacian is None or self._laplacian.shape != shape:
+            if self.frame_format == "bgr":
+                self._gray = np.empty(shape, dtype=np.uint8)
+            # A 3x3 Laplacian of 8-bit input fits in int16 exactly, at a quarter of float64's bandwidth
+            self._laplacian = np.empty(shape, dtype=np.int16)
+
+    def _gray_plane(self, data: bytes) -> np.ndarray:
+        if self.frame_format == "encoded":
+            with stage("decode"):
+                gray = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                raise ValueError("Invalid image format")
+            self._buffers(gray.shape)
+            return gray
+
+        channels = 1 if self.frame_format == "gray" else 3
+        expected = self.width * self.height * channels
+        if len(data) != expected:
+            raise ValueError(f"Expected {expected} bytes per {self.frame_format} frame, got {len(data)}")
+        pixels = np.frombuffer(data, np.uint8).reshape(self.height, self.width, channels)
+        self._buffers((self.height, self.width))
+        if channels == 1:
+            return pixels[:, :, 0]
+        return cv2.cvtColor(pixels, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+    def process(self, data: bytes) -> dict:
+        """Metrics of one frame, and the moving averages including it"""
+        start = time.perf_counter()
+        gray = self._gray_plane(data)
+        observe_image(gray)
+        with stage("metrics"):
+            cv2.Laplacian(gray, cv2.CV_16S, dst=self._laplacian)
+            _, laplacian_std = cv2.meanStdDev(self._laplacian)
+            mean, std = cv2.meanStdDev(gray)
+            metrics = {
+                "blur_score": round(min(100.0, (float(laplacian_std[0, 0]) ** 2 / 500) * 100), 2),
+                "brightness": round(float(mean[0, 0]) / 255 * 100, 2),
+                "contrast": round(float(std[0, 0]) / 128 * 100, 2)
+            }
+            analysis = ImageAnalysis(gray)
+            detection = None
+            if self.objects == "legacy":
+                metrics["object_count"] = analysis.object_count
+            else:
+                detection = analysis.detect_objects(boxes=self.objects == "boxes")
+                metrics["object_count"] = detection.count
+            metrics["quality_rating"] = ImageAnalyzer.get_quality_rating(
+                metrics["blur_score"], metrics["brightness"], metrics["contrast"]
+            )
+            self.ema.update(metrics)
+
+        result = {
+            "width": gray.shape[1],
+            "height": gray.shape[0],
+            "analysis": metrics,
+            "ema": self.ema.to_dict(),
+            "processing_ms": round((time.perf_counter() - start) * 1000, 3)
+        }
+        if self.objects == "boxes":
+            result["objects"] = detection.to_dict(MAX_REPORTED_OBJECTS)
+        return result
+
+
+class LatestFrame:
+    """Single-slot mailbox between a stream's reader and its analyzer.
+
+    put() never waits: a frame still waiting when the next one arrives is
+    replaced and counted as dropped, so a slow analyzer always works on the
+    newest frame instead of an ever-growing backlog.
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, data: bytes):
+        self.received += 1
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = (self.received, data)
+        self._ready.set()
+
+    def close(self):
+        self._closed = True
+        self._ready.set()
+
+    async def take(self):
+        """Next (sequence number, frame), or None once closed and drained"""
+        while self._frame is None:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        frame, self._frame = self._frame, None
+        return frame
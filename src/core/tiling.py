@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import math
+import tempfile
+
+from src.core.image_processor import FILTER_KERNEL_SPECS, HistogramStats, ImageAnalyzer, filter_kernel
+from src.core.pipeline import rotation_matrix, scale_matrix
+from src.utils.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# Edge length of the square tiles processed at a time
+DEFAULT_TILE_SIZE = 1024
+
+
+def iter_tiles(height: int, width: int, tile_size: int):
+    """Yield (y0, y1, x0, x1) bounds covering a height x width image"""
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield y0, min(y0 + tile_size, height), x0, min(x0 + tile_size, width)
+
+
+def scratch_array(shape: tuple, dtype="uint8", directory: str = None) -> np.memmap:
+    """Array backed by an anonymous temporary file instead of anonymous memory"""
+    with tempfile.TemporaryFile(dir=directory) as scratch:
+        # The mapping keeps its own handle, so the file can be closed (and vanishes with the array)
+        return np.memmap(scratch, dtype=dtype, mode="w+", shape=shape)
+
+
+class RunningMoments:
+    """Count, mean and sum of squared deviations, mergeable across tiles (Chan et al.)"""
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    @classmethod
+    def of(cls, values: np.ndarray) -> "RunningMoments":
+        """Moments of one block of values"""
+        mean, std = cv2.meanStdDev(values)
+        count = values.shape[0] * values.shape[1]
+        return cls(count, float(mean[0, 0]), float(std[0, 0]) ** 2 * count)
+
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        """Combine with the moments of a disjoint block"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            return RunningMoments(other.count, other.mean, other.m2)
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        mean = self.mean + delta * other.count / count
+        m2 = self.m2 + other.m2 + delta * delta * self.count * other.count / count
+        return RunningMoments(count, mean, m2)
+
+    @property
+    def variance(self) -> float:
+        """Population variance"""
+        return self.m2 / self.count if self.count else 0.0
+
+
+class TiledImageAnalyzer:
+    """Memory-bounded ImageAnalyzer operations that work on fixed-size tiles.
+
+    Kernel filters read each tile with a halo of the kernel radius so seams
+    match the full-image result, and geometric transforms only read the
+    source region a destination tile maps to. Outputs go to ``out`` or, with
+    ``use_memmap``, to temporary-file backed scratch arrays, so working
+    memory scales with the tile size rather than the image. The source may
+    itself be a ``numpy.memmap`` (for example raw pixels or ``np.load(...,
+    mmap_mode="r")``); encoded files still have to be decoded in full.
+    """
+
+    def __init__(self, tile_size: int = DEFAULT_TILE_SIZE, use_memmap: bool = True, scratch_dir: str = None):
+        if tile_size <= 0:
+            raise ValueError("Tile size must be positive")
+        self.tile_size = tile_size
+        self.use_memmap = use_memmap
+        self.scratch_dir = scratch_dir
+
+    def _allocate(self, shape: tuple, dtype="uint8") -> np.ndarray:
+        if self.use_memmap:
+            return scratch_array(shape, dtype, self.scratch_dir)
+        return np.empty(shape, dtype=dtype)
+
+    def apply_filter(self, image: np.ndarray, filter_type: str, out: np.ndarray = None) -> np.ndarray:
+        """Tiled ImageAnalyzer.apply_filter with halo overlap for kernel filters"""
+        halo = filter_kernel(filter_type).shape[0] // 2 if filter_type in FILTER_KERNEL_SPECS else 0
+        height, width = image.shape[:2]
+        if out is None:
+            out = self._allocate(image.shape, image.dtype)
+
+        for y0, y1, x0, x1 in iter_tiles(height, width, self.tile_size):
+            hy0, hy1 = max(y0 - halo, 0), min(y1 + halo, height)
+            hx0, hx1 = max(x0 - halo, 0), min(x1 + halo, width)
+            filtered = ImageAnalyzer.apply_filter(image[hy0:hy1, hx0:hx1], filter_type)
+            out[y0:y1, x0:x1] = filtered[y0 - hy0:y1 - hy0, x0 - hx0:x1 - hx0]
+        return out
+
+    def warp_affine(self, image: np.ndarray, matrix: np.ndarray, size: tuple, out: np.ndarray = None,
+                    border_mode: int = None) -> np.ndarray:
+        """Tiled bilinear cv2.warpAffine into a ``size`` = (width, height) output.
+
+        ``border_mode`` defaults to cv2.BORDER_CONSTANT (black fill).
+        """
+        if border_mode is None:
+            border_mode = cv2.BORDER_CONSTANT
+        width, height = size
+        src_height, src_width = image.shape[:2]
+        if out is None:
+            out = self._allocate((height, width) + image.shape[2:], image.dtype)
+
+        matrix = np.vstack([np.asarray(matrix, dtype=np.float64)[:2], [0, 0, 1]])
+        inverse = np.linalg.inv(matrix)
+        for y0, y1, x0, x1 in iter_tiles(height, width, self.tile_size):
+            corners = np.array([[x0, y0, 1], [x1, y0, 1], [x0, y1, 1], [x1, y1, 1]], dtype=np.float64)
+            source = corners @ inverse.T
+            # Two extra pixels cover the bilinear neighbourhood on every side
+            sx0 = max(math.floor(source[:, 0].min()) - 2, 0)
+            sy0 = max(math.floor(source[:, 1].min()) - 2, 0)
+            sx1 = min(math.ceil(source[:, 0].max()) + 3, src_width)
+            sy1 = min(math.ceil(source[:, 1].max()) + 3, src_height)
+            if sx0 >= sx1 or sy0 >= sy1:
+                out[y0:y1, x0:x1] = 0
+                continue
+
+            shift_src = np.array([[1, 0, sx0], [0, 1, sy0], [0, 0, 1]], dtype=np.float64)
+            shift_dst = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]], dtype=np.float64)
+            tile_matrix = (shift_dst @ matrix @ shift_src)[:2]
+            out[y0:y1, x0:x1] = cv2.warpAffine(
+                image[sy0:sy1, sx0:sx1], tile_matrix, (x1 - x0, y1 - y0),
+                flags=cv2.INTER_LINEAR, borderMode=border_mode, borderValue=0
+            )
+        return out
+
+    def resize_image(self, image: np.ndarray, width: int, height: int, out: np.ndarray = None) -> np.ndarray:
+        """Tiled ImageAnalyzer.resize_image"""
+        if width <= 0 or height <= 0:
+            raise ValueError("Width and height must be positive")
+        src_height, src_width = image.shape[:2]
+        matrix = scale_matrix(src_width, src_height, width, height)
+        # cv2.resize replicates edge pixels when upscaling
+        return self.warp_affine(image, matrix, (width, height), out, border_mode=cv2.BORDER_REPLICATE)
+
+    def resize_by_percentage(self, image: np.ndarray, percentage: int, out: np.ndarray = None) -> np.ndarray:
+        """Tiled ImageAnalyzer.resize_by_percentage"""
+        height, width = image.shape[:2]
+        new_width, new_height = ImageAnalyzer.percentage_size(width, height, percentage)
+        return self.resize_image(image, new_width, new_height, out)
+
+    def rotate_image(self, image: np.ndarray, angle: float, out: np.ndarray = None) -> np.ndarray:
+        """Tiled ImageAnalyzer.rotate_image"""
+        height, width = image.shape[:2]
+        return self.warp_affine(image, rotation_matrix(width, height, angle), (width, height), out)
+
+    def analyze(self, image: np.ndarray) -> dict:
+        """Blur, brightness, contrast, rating and histogram summary merged from per-tile partials.
+
+        Object counting is not included: contours crossing tile seams cannot
+        be counted from independent tiles.
+        """
+        height, width = image.shape[:2]
+        histogram = HistogramStats()
+        laplacian_moments = RunningMoments()
+
+        for y0, y1, x0, x1 in iter_tiles(height, width, self.tile_size):
+            # One pixel of halo gives the 3x3 Laplacian its true neighbours at seams
+            hy0, hy1 = max(y0 - 1, 0), min(y1 + 1, height)
+            hx0, hx1 = max(x0 - 1, 0), min(x1 + 1, width)
+            tile = image[hy0:hy1, hx0:hx1]
+            gray = tile if tile.ndim == 2 else cv2.cvtColor(tile, cv2.COLOR_BGR2GRAY)
+            laplacian = cv2.Laplacian(gray, cv2.CV_64F)
+
+            inner = (slice(y0 - hy0, y1 - hy0), slice(x0 - hx0, x1 - hx0))
+            histogram = histogram.merge(HistogramStats.of(np.ascontiguousarray(gray[inner])))
+            laplacian_moments = laplacian_moments.merge(RunningMoments.of(laplacian[inner]))
+
+        blur_score = round(min(100.0, (laplacian_moments.variance / 500) * 100), 2)
+        brightness = round((histogram.mean / 255) * 100, 2)
+        contrast = round((histogram.std / 128) * 100, 2)
+        return {
+            "blur_score": blur_score,
+            "brightness": brightness,
+            "contrast": contrast,
+            "quality_rating": ImageAnalyzer.get_quality_rating(blur_score, brightness, contrast),
+            "histogram": histogram.summary()
+        }
@@ -0,0 +1,65 @@
+import logging
+import os
+import time
+
+from src.core.executor import get_executor
+from src.core.frames import get_frame_pool
+from src.core.image_processor import ImageAnalysis, ImageAnalyzer
+from src.core.similarity import get_similarity_index
+from src.utils.cache import get_result_cache
+from src.utils.file_handler import OUTPUT_FORMATS, encode_image
+from src.utils.lazy import lazy_import
+
+logger = logging.getLogger(__name__)
+
+# Run warm-up during start-up so the first request pays no import, codec or thread start-up cost
+WARMUP_ENABLED = os.environ.get("IMAGE_API_WARMUP", "0") == "1"
+
+
+def warm_up() -> dict:
+    """Load OpenCV/NumPy/Pillow, exercise every codec and metric and start the worker threads.
+
+    Returns the milliseconds each step took.
+    """
+    timings = {}
+
+    def timed(step: str, fn):
+        start = time.perf_counter()
+        result = fn()
+        timings[step] = round((time.perf_counter() - start) * 1000, 3)
+        return result
+
+    def imports():
+        np = lazy_import("numpy")
+        # Any attribute access executes a lazily imported module
+        lazy_import("cv2").getNumThreads()
+        from PIL import Image
+        Image.init()
+        # Small gradient with a bright block, so thresholds and contours find something
+        image = np.zeros((48, 64, 3), dtype=np.uint8)
+        image[:, :, 1] = np.linspace(0, 255, 64, dtype=np.uint8)
+        image[12:36, 16:48] = 255
+        return image
+
+    image = timed("imports", imports)
+
+    def codecs():
+        for image_format in OUTPUT_FORMATS:
+            body = encode_image(image, image_format, 90)
+            ImageAnalyzer.probe_size(body)
+            ImageAnalyzer.read_image(body, target_size=(16, 16))
+
+    timed("codecs", codecs)
+
+    def metrics():
+        analysis = ImageAnalysis(image)
+        analysis.to_dict()
+        analysis.detect_objects()
+        analysis.histogram.summary()
+        return analysis.perceptual_hash
+
+    timed("metrics", metrics)
+    timed("thread_pools", lambda: (get_executor().prestart(), get_frame_pool()))
+    timed("caches", lambda: (get_result_cache(), get_similarity_index()))
+    logger.info(f"Warm-up finished: {timings}")
+    return timings
@@ -1,11 +1,18 @@
+import asyncio
 import logging
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Response
 from datetime import datetime
 
-# NOTE: These imports assume code is in src.core and src.utils.
-# They should be uncommented and fixed when those files are merged.
-# from src.core.image_processor import ImageProcessor
-# from src.utils.file_handler import read_image
+from src.core.batch import analyze_bytes, get_process_pool, reset_process_pool
+from src.core.executor import ExecutorSaturated, get_executor
+from src.core.frames import MAX_FRAMES, analyze_frames
+from src.core.image_processor import OBJECT_MODES, ImageAnalyzer
+from src.core.similarity import DUPLICATE_DISTANCE, MAX_DISTANCE, get_similarity_index
+from src.utils.cache import cache_key, content_hash, get_result_cache
+from src.utils.metrics import observe_upload, stage
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +21,15 @@ router = APIRouter(
     tags=["Analysis"]
 )
 
+# Upper bound on files accepted by a single /analyze/batch request
+MAX_BATCH_FILES = 500
+# Upper bound on the combined size of the files in one /analyze/batch request
+MAX_BATCH_BYTES = int(float(os.environ.get("IMAGE_API_MAX_BATCH_MB", 256)) * 1024 * 1024)
+# Keys an analysis cached by an older release may lack; such entries are recomputed
+RESULT_KEYS = ("histogram", "perceptual_hash")
+# Decode size used to hash uploads for /similar and duplicate checks (reduced JPEG decode)
+HASH_DECODE_SIZE = (64, 64)
+
 
 def generate_recommendations(blur: float, brightness: float, contrast: float) -> list[str]:
     """
@@ -42,26 +58,138 @@ def generate_recommendations(blur: float, brightness: float, contrast: float) ->
     return recommendations if recommendations else ["Image quality is good!"]
 
 
+def _quick_hash(content: bytes) -> int:
+    """Perceptual hash from a reduced luma-only decode"""
+    gray = ImageAnalyzer.read_image(content, target_size=HASH_DECODE_SIZE, grayscale=True)
+    return ImageAnalyzer.perceptual_hash(gray)
+
+
+def _find_duplicate(content: bytes, fast: bool, objects: str = "legacy"):
+    """Cached analysis of a near-duplicate seen before, with the match, or (None, None)"""
+    with stage("dedupe"):
+        value = _quick_hash(content)
+        cache = get_result_cache()
+        for match in get_similarity_index().query(value, DUPLICATE_DISTANCE, limit=5):
+            cached = cache.get_json(cache_key(match["id"], "analyze", fast=fast, objects=objects))
+            if cached is not None and all(name in cached for name in RESULT_KEYS):
+                return cached, match
+    return None, None
+
+
+def _check_objects_mode(objects: str):
+    if objects not in OBJECT_MODES:
+        raise ValueError(f"Unknown objects mode: {objects}. Use one of: {', '.join(OBJECT_MODES)}")
+
+
+def _analyze_in_pool(contents: list, fast: bool, objects: str) -> list:
+    """Analysis or exception per upload, from the batch process pool.
+
+    A worker that dies breaks the whole pool and fails every file in
+    flight. The pool is then replaced and those files are retried together;
+    files that break it again are retried one at a time, so only a file
+    that kills a worker on its own is reported as failed.
+    """
+    outcomes = [None] * len(contents)
+    pending = list(range(len(contents)))
+    for alone in (False, False, True):
+        broken = []
+        for group in ([[index] for index in pending] if alone else [pending]):
+            pool = get_process_pool()
+            futures = {}
+            for index in group:
+                try:
+                    futures[index] = pool.submit(analyze_bytes, contents[index], fast, objects)
+                except BrokenProcessPool as e:
+                    outcomes[index] = e
+            for index, future in futures.items():
+                try:
+                    outcomes[index] = future.result()
+                except Exception as e:
+                    outcomes[index] = e
+            crashed = [index for index in group if isinstance(outcomes[index], BrokenProcessPool)]
+            if crashed:
+                reset_process_pool(pool)
+                broken.extend(crashed)
+        pending = broken
+        if not pending:
+            break
+    return outcomes
+
+
+def _index_hashes(seen: list):
+    """Add (hex hash, content, filename) triples to the similarity index"""
+    index = get_similarity_index()
+    for perceptual_hash, content, filename in seen:
+        index.add(int(perceptual_hash, 16), content_hash(content), filename)
+
+
+def _analyze_cached(content: bytes, fast: bool, filename: str = "", dedupe: bool = False,
+                    objects: str = "legacy"):
+    """Serve the analysis from the result cache or compute it; runs on the executor.
+
+    Returns (result, cache_hit, duplicate_match). With ``dedupe`` a near
+    duplicate of an earlier upload reuses that upload's analysis instead of
+    analysing again.
+    """
+    cache = get_result_cache()
+    with stage("cache_lookup"):
+        digest = content_hash(content)
+        key = cache_key(digest, "analyze", fast=fast, objects=objects)
+        cached = cache.get_json(key)
+    if cached is not None and all(name in cached for name in RESULT_KEYS):
+        return cached, True, None
+
+    if dedupe:
+        duplicate, match = _find_duplicate(content, fast, objects)
+        if duplicate is not None:
+            width, height = ImageAnalyzer.probe_size(content)
+            result = {
+                **duplicate,
+                "image_info": {**duplicate["image_info"], "width": width, "height": height,
+                               "size_kb": len(content) / 1024}
+            }
+            cache.put_json(key, result)
+            return result, False, match
+
+    result = analyze_bytes(content, fast, objects)
+    result.pop("processing_ms")
+    cache.put_json(key, result)
+    get_similarity_index().add(int(result["perceptual_hash"], 16), digest, filename or "")
+    return result, False, None
+
+
 @router.post("/analyze")
-async def analyze_image(file: UploadFile = File(...)):
-    """Analyze image quality without modification"""
+async def analyze_image(
+    response: Response,
+    file: UploadFile = File(...),
+    fast: bool = Query(False),
+    dedupe: bool = Query(False),
+    objects: str = Query("legacy")
+):
+    """Analyze image quality without modification.
+
+    fast=true analyzes a reduced decode; dedupe=true answers near-duplicates
+    of earlier uploads with their analysis (see /similar). objects=count
+    counts connected components on a downscaled plane (cheaper than the
+    legacy contour count); objects=boxes also returns their bounding boxes.
+    """
     try:
-        content = await file.read()
+        _check_objects_mode(objects)
+        with stage("upload_buffer"):
+            content = await file.read()
+        observe_upload(content)
         logger.info(f"Received file for analysis: {file.filename}")
         logger.debug(f"File size: {len(content)/1024:.2f} KB")
         
-        # NOTE: Replace the placeholders below with the actual calls to src.core/src.utils
-        # image = read_image(content) # Use the utility layer function
-        image = None # Placeholder for OpenCV image array
-
-        # --- Commit 4 Logic: Metric Placeholders (Refactored) ---
-        metrics = {
-            "blur_score": 70.0,
-            "brightness": 55.0,
-            "contrast": 40.0,
-            "object_count": 3,
-            "quality_rating": "Good"
-        }
+        # Decode and every metric (sharing one grayscale plane) run off the event loop;
+        # repeated uploads are answered from the cache without decoding
+        result, cache_hit, duplicate = await get_executor().run(
+            _analyze_cached, content, fast, file.filename, dedupe, objects
+        )
+        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+        if duplicate is not None:
+            response.headers["X-Duplicate-Of"] = duplicate["id"]
+        metrics = result["analysis"]
 
         blur_score = metrics["blur_score"]
         brightness = metrics["brightness"]
@@ -72,14 +200,10 @@ async def analyze_image(file: UploadFile = File(...)):
         # --- Commit 5 Logic: Final Return ---
         recommendations = generate_recommendations(blur_score, brightness, contrast)
 
-        return {
+        body = {
             "filename": file.filename,
             "timestamp": datetime.now().isoformat(),
-            "image_info": {
-                "width": 100, 
-                "height": 100,
-                "size_kb": len(content) / 1024
-            },
+            "image_info": result["image_info"],
             "analysis": {
                 "blur_score": blur_score,
                 "brightness": brightness,
@@ -87,11 +211,187 @@ async def analyze_image(file: UploadFile = File(...)):
                 "object_count": object_count,
                 "quality_rating": rating
             },
+            "histogram": result["histogram"],
+            "perceptual_hash": result["perceptual_hash"],
             "recommendations": recommendations
         }
+        if "objects" in result:
+            body["objects"] = result["objects"]
+        if duplicate is not None:
+            body["duplicate_of"] = {
+                "id": duplicate["id"], "filename": duplicate["name"], "distance": duplicate["distance"]
+            }
+        return body
     
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail="Image analysis failed")
+
+
+@router.post("/analyze/batch")
+async def analyze_batch(
+    response: Response,
+    files: list[UploadFile] = File(...),
+    fast: bool = Query(False),
+    objects: str = Query("legacy")
+):
+    """Analyze many images in one request using the batch process pool"""
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_FILES} files per batch")
+    try:
+        _check_objects_mode(objects)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    too_large = HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_BYTES // 2 ** 20} MB in total")
+    if sum(file.size or 0 for file in files) > MAX_BATCH_BYTES:
+        raise too_large
+
+    start = time.perf_counter()
+    contents = []
+    total_bytes = 0
+    with stage("upload_buffer"):
+        for file in files:
+            content = await file.read()
+            total_bytes += len(content)
+            if total_bytes > MAX_BATCH_BYTES:
+                raise too_large
+            contents.append(content)
+    for content in contents:
+        observe_upload(content)
+    logger.info(f"Received batch of {len(files)} files ({total_bytes} bytes) for analysis")
+
+    try:
+        # One executor slot waits on the process pool, so a saturated server turns batches away too
+        outcomes = await get_executor().run(_analyze_in_pool, contents, fast, objects)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    results = []
+    worker_ms = []
+    seen = []
+    failed = 0
+    for index, (file, outcome) in enumerate(zip(files, outcomes)):
+        item = {"index": index, "filename": file.filename}
+        if isinstance(outcome, ValueError):
+            item.update({"status_code": 400, "error": str(outcome)})
+        elif isinstance(outcome, BaseException):
+            logger.error(f"Batch analysis error for {file.filename}: {str(outcome)}")
+            item.update({"status_code": 500, "error": "Image analysis failed"})
+        else:
+            worker_ms.append(outcome.pop("processing_ms"))
+            seen.append((outcome["perceptual_hash"], contents[index], file.filename or ""))
+            metrics = outcome["analysis"]
+            item.update({"status_code": 200, **outcome})
+            item["recommendations"] = generate_recommendations(
+                metrics["blur_score"], metrics["brightness"], metrics["contrast"]
+            )
+        if item["status_code"] != 200:
+            failed += 1
+        results.append(item)
+
+    # Hashing uploads and occasional index rebuilds stay off the event loop
+    await asyncio.to_thread(_index_hashes, seen)
+
+    elapsed = time.perf_counter() - start
+    per_file_ms = sum(worker_ms) / len(worker_ms) if worker_ms else 0.0
+    response.headers["X-Batch-Duration-Ms"] = f"{elapsed * 1000:.3f}"
+    response.headers["X-Batch-Images-Per-Second"] = f"{len(files) / elapsed:.2f}" if elapsed else "0"
+    response.headers["X-Per-File-Ms"] = f"{per_file_ms:.3f}"
+    response.headers["X-Per-File-Images-Per-Second"] = f"{1000 / per_file_ms:.2f}" if per_file_ms else "0"
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "total": len(files),
+        "succeeded": len(files) - failed,
+        "failed": failed,
+        "results": results
+    }
+
+
+@router.post("/analyze/frames")
+async def analyze_clip(
+    file: UploadFile = File(...),
+    step: int = Query(1, ge=1),
+    scene_threshold: float = Query(None, ge=0, le=100),
+    max_frames: int = Query(MAX_FRAMES, ge=1, le=MAX_FRAMES),
+    objects: str = Query("count")
+):
+    """Analyze every frame of an animated GIF/WebP, multi-page TIFF or video clip.
+
+    step=N analyzes every Nth frame; scene_threshold keeps only frames that
+    differ from the last analyzed one by more than that percentage. Frames
+    are analyzed in parallel and summarised per metric and in one histogram.
+    """
+    try:
+        _check_objects_mode(objects)
+        with stage("upload_buffer"):
+            content = await file.read()
+        observe_upload(content)
+        logger.info(f"Received clip for frame analysis: {file.filename}")
+        result = await get_executor().run(analyze_frames, content, step, scene_threshold, max_frames, objects)
+        summary = result["summary"]
+
+        return {
+            "filename": file.filename,
+            "timestamp": datetime.now().isoformat(),
+            **result,
+            "recommendations": generate_recommendations(
+                summary["blur_score"]["mean"], summary["brightness"]["mean"], summary["contrast"]["mean"]
+            )
+        }
+
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Frame analysis error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Frame analysis failed")
+
+
+def _lookup_similar(content: bytes, max_distance: int, limit: int):
+    """Hash an upload and query the index; runs on the executor"""
+    value = _quick_hash(content)
+    start = time.perf_counter()
+    with stage("similarity_lookup"):
+        matches = get_similarity_index().query(value, max_distance, limit)
+    return value, matches, (time.perf_counter() - start) * 1000
+
+
+@router.post("/similar")
+async def find_similar(
+    file: UploadFile = File(...),
+    max_distance: int = Query(8, ge=0, le=MAX_DISTANCE),
+    limit: int = Query(10, ge=1, le=100)
+):
+    """Previously analyzed images whose perceptual hash is within max_distance bits, nearest first"""
+    try:
+        with stage("upload_buffer"):
+            content = await file.read()
+        observe_upload(content)
+        value, matches, lookup_ms = await get_executor().run(_lookup_similar, content, max_distance, limit)
+
+        return {
+            "filename": file.filename,
+            "perceptual_hash": f"{value:016x}",
+            "max_distance": max_distance,
+            "matches": [
+                {"id": match["id"], "filename": match["name"], "distance": match["distance"],
+                 "perceptual_hash": match["perceptual_hash"]}
+                for match in matches
+            ],
+            "index_size": len(get_similarity_index()),
+            "lookup_ms": round(lookup_ms, 3)
+        }
+
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Similarity lookup error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Similarity lookup failed")
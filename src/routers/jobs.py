@@ -0,0 +1,72 @@
+import json
+import logging
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
+
+from src.core.executor import ExecutorSaturated
+from src.core.jobs import get_job_manager
+from src.routers.analysis import generate_recommendations
+from src.utils.metrics import observe_upload, stage
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["Jobs"]
+)
+
+
+@router.post("", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    operation: str = Form(...),
+    params: str = Form("{}"),
+    priority: int = Query(0, ge=-10, le=10)
+):
+    """Queue an analyze/resize/crop/rotate/flip/filter/enhance job and return its id at once"""
+    try:
+        job_params = json.loads(params)
+        with stage("upload_buffer"):
+            content = await file.read()
+        observe_upload(content)
+        job_id = get_job_manager().submit(content, operation, job_params, priority)
+        logger.info(f"Queued {operation} job {job_id} for {file.filename}")
+
+        return {
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/jobs/{job_id}"
+        }
+
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail="Job backlog is full, retry later",
+                            headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Job submission error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Job submission failed")
+
+
+@router.get("/stats")
+def job_stats():
+    """Backlog, worker and completion counters of the job queue"""
+    return get_job_manager().stats()
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    """Status of a job, with its result once it has succeeded"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    result = job["result"]
+    if result is not None:
+        if "output_name" in result:
+            result["download_url"] = f"/download/{result['output_name']}"
+        if "analysis" in result:
+            metrics = result["analysis"]
+            result["recommendations"] = generate_recommendations(
+                metrics["blur_score"], metrics["brightness"], metrics["contrast"]
+            )
+    return job
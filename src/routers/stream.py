@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+
+from src.core.executor import ExecutorSaturated, get_executor
+from src.core.stream import DEFAULT_EMA_ALPHA, LatestFrame, StreamAnalyzer
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/ws",
+    tags=["Streaming"]
+)
+
+
+async def _read_frames(websocket: WebSocket, slot: LatestFrame):
+    """Move binary messages into the slot until the client disconnects"""
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                slot.put(message["bytes"])
+    finally:
+        slot.close()
+
+
+@router.websocket("/analyze")
+async def analyze_stream(
+    websocket: WebSocket,
+    frame_format: str = Query("encoded", alias="format"),
+    width: int = Query(None),
+    height: int = Query(None),
+    objects: str = Query("count"),
+    alpha: float = Query(DEFAULT_EMA_ALPHA)
+):
+    """Analyze a continuous stream of binary frames, answering each with its metrics and running averages.
+
+    Frames are encoded images, or raw gray/bgr pixels of the given width and
+    height. While a frame is being analyzed only the newest arrival is kept;
+    older ones are dropped and counted in each reply's "dropped" field.
+    """
+    try:
+        analyzer = StreamAnalyzer(frame_format, width, height, objects, alpha)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    await websocket.accept()
+    logger.info(f"Stream opened ({frame_format}, objects={objects})")
+
+    slot = LatestFrame()
+    reader = asyncio.create_task(_read_frames(websocket, slot))
+    try:
+        while True:
+            frame = await slot.take()
+            if frame is None:
+                break
+            sequence, data = frame
+            try:
+                # One frame at a time per connection, so the analyzer's buffers are never shared
+                reply = await get_executor().run(analyzer.process, data)
+            except ExecutorSaturated:
+                slot.dropped += 1
+                continue
+            except ValueError as e:
+                reply = {"error": str(e)}
+            await websocket.send_json({"frame": sequence, **reply, "dropped": slot.dropped})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Stream analysis error: {str(e)}")
+        await websocket.close(code=1011)
+    finally:
+        reader.cancel()
+        logger.info(f"Stream closed after {slot.received} frames ({slot.dropped} dropped)")
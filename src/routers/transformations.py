@@ -1,78 +1,375 @@
-@app.post("/resize")
+import json
+import logging
+import os
+import time
+import uuid
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException, Query, Response
+from fastapi.responses import FileResponse
+from datetime import datetime
+
+from src.core.executor import ExecutorSaturated, get_executor
+from src.core.frames import FRAME_FORMATS, MAX_FRAMES, transform_frames
+from src.core.image_processor import ImageAnalyzer
+from src.core.pipeline import TransformPipeline
+from src.utils.cache import cache_key, content_hash, get_result_cache
+from src.utils.file_handler import (
+    DEFAULT_QUALITY, OUTPUT_FORMATS, encode_image, etag_matches, negotiate_format
+)
+from src.utils.metrics import observe_upload, stage
+from src.utils.storage import OutputTooLarge, get_output_store
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="",
+    tags=["Transformations"]
+)
+
+
+def _size(image) -> dict:
+    return {"width": image.shape[1], "height": image.shape[0]}
+
+
+def _resize(content: bytes, width: int, height: int, percentage: int):
+    """Decode at a reduced scale and resize; returns (original size, resized image)"""
+    size = ImageAnalyzer.header_size(content)
+    image = None
+    if size is None:
+        # No readable header (huge image or a format only OpenCV knows): decode in full once
+        image = ImageAnalyzer.read_image(content)
+        size = (image.shape[1], image.shape[0])
+    original_width, original_height = size
+    if percentage:
+        width, height = ImageAnalyzer.percentage_size(original_width, original_height, percentage)
+
+    if image is None:
+        # Decode at the smallest DCT scale still covering the target, then finish with a small resize
+        image = ImageAnalyzer.read_image(content, target_size=(width, height), size=size)
+    with stage("transform"):
+        resized = ImageAnalyzer.resize_image(image, width, height)
+    return {"width": original_width, "height": original_height}, resized
+
+
+def _crop(content: bytes, x: int, y: int, width: int, height: int):
+    """Decode and crop; returns (original size, cropped image)"""
+    image = ImageAnalyzer.read_image(content)
+    with stage("transform"):
+        cropped = ImageAnalyzer.crop_image(image, x, y, width, height)
+    return _size(image), cropped
+
+
+def _run_pipeline(content: bytes, pipeline: TransformPipeline):
+    """Decode once and run the fused pipeline; returns (original size, result image)"""
+    image = ImageAnalyzer.read_image(content)
+    with stage("transform"):
+        transformed = pipeline.run(image)
+    return _size(image), transformed
+
+
+def _produce(content: bytes, operation: str, params: dict, transform, args: tuple,
+             output: dict, if_none_match: str = None):
+    """Transform and encode ``content`` once, or serve it from the cache; runs on the executor.
+
+    ``output`` holds the negotiated format, quality and persist flag.
+    Streamed results are cached as encoded bytes; persisted ones go to the
+    output store and are cached as metadata naming the stored file. Returns
+    (metadata, body, etag, cache_hit); metadata is None when If-None-Match
+    already names the result and body is None for persisted output.
+    """
+    key = cache_key(content_hash(content), operation, **params, **output)
+    etag = f'"{key}"'
+    if if_none_match and not output["persist"] and etag_matches(if_none_match, etag):
+        return None, None, etag, True
+
+    cache = get_result_cache()
+    with stage("cache_lookup"):
+        if output["persist"]:
+            cached = cache.get_json(key)
+            if cached is not None and get_output_store().get(cached["output_name"]) is not None:
+                return cached, None, etag, True
+        else:
+            cached = cache.get_blob(key)
+            if cached is not None:
+                return cached[0], cached[1], etag, True
+
+    original_size, result = transform(content, *args)
+    with stage("encode"):
+        body = encode_image(result, output["format"], output["quality"])
+    metadata = {"original_size": original_size, "output_size": _size(result)}
+
+    if not output["persist"]:
+        cache.put_blob(key, metadata, body)
+        return metadata, body, etag, False
+
+    _, extension = OUTPUT_FORMATS[output["format"]]
+    with stage("write"):
+        stored = get_output_store().put(f"{uuid.uuid4()}_{operation}{extension}", body)
+    metadata["output_name"] = stored.name
+    cache.put_json(key, metadata)
+    return metadata, None, etag, False
+
+
+def _output_options(accept: str, output_format: str, quality: int, persist: bool) -> dict:
+    """Output settings shared by the transformation endpoints.
+
+    With ``persist`` the response itself is JSON, so Accept is not consulted
+    and the stored file defaults to JPEG.
+    """
+    image_format = negotiate_format(None if persist else accept, output_format)
+    if image_format is None:
+        raise HTTPException(status_code=406, detail=f"Supported output formats: {', '.join(OUTPUT_FORMATS)}")
+    return {"format": image_format, "quality": quality, "persist": persist}
+
+
+def _image_response(metadata: dict, body: bytes, etag: str, cache_hit: bool, image_format: str,
+                    filename: str, suffix: str) -> Response:
+    """Encoded image as the response body, or 304 when the client's copy is current"""
+    headers = {"ETag": etag, "X-Cache": "HIT" if cache_hit else "MISS", "Vary": "Accept"}
+    if metadata is None:
+        return Response(status_code=304, headers=headers)
+
+    media_type, extension = OUTPUT_FORMATS[image_format]
+    stem = (filename or "image").rsplit(".", 1)[0]
+    headers.update({
+        "Content-Disposition": f'inline; filename="{stem}_{suffix}{extension}"',
+        "X-Original-Width": str(metadata["original_size"]["width"]),
+        "X-Original-Height": str(metadata["original_size"]["height"]),
+        "X-Image-Width": str(metadata["output_size"]["width"]),
+        "X-Image-Height": str(metadata["output_size"]["height"])
+    })
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+@router.post("/resize")
 async def resize_image(
+    response: Response,
     file: UploadFile = File(...),
     width: int = Query(None),
     height: int = Query(None),
-    percentage: int = Query(None)
+    percentage: int = Query(None),
+    output_format: str = Query(None, alias="format"),
+    quality: int = Query(DEFAULT_QUALITY, ge=1, le=100),
+    persist: bool = Query(False),
+    accept: str = Header(None),
+    if_none_match: str = Header(None)
 ):
-    """Resize image - provide either (width, height) or percentage"""
+    """Resize image - provide either (width, height) or percentage.
+
+    The result is returned as image bytes (format from ``format`` or the
+    Accept header); ``persist=true`` stores it and returns a download URL.
+    """
     try:
         if percentage and (width or height):
             raise ValueError("Provide either percentage OR (width, height), not both")
-        
+
         if not percentage and (not width or not height):
             raise ValueError("Provide either percentage OR both width and height")
-        
-        content = await file.read()
-        image = ImageAnalyzer.read_image(content)
-        
-        if percentage:
-            resized = ImageAnalyzer.resize_by_percentage(image, percentage)
-            new_width, new_height = resized.shape[1], resized.shape[0]
-        else:
-            resized = ImageAnalyzer.resize_image(image, width, height)
-            new_width, new_height = width, height
-        
-        file_id = str(uuid.uuid4())
-        output_path = UPLOAD_DIR / f"{file_id}_resized.jpg"
-        cv2.imwrite(str(output_path), resized)
-        
+
+        output = _output_options(accept, output_format, quality, persist)
+        with stage("upload_buffer"):
+            content = await file.read()
+        observe_upload(content)
+        params = {"width": width, "height": height, "percentage": percentage}
+        metadata, body, etag, cache_hit = await get_executor().run(
+            _produce, content, "resized", params, _resize, (width, height, percentage), output, if_none_match
+        )
+        if not persist:
+            return _image_response(metadata, body, etag, cache_hit, output["format"], file.filename, "resized")
+        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+
         return {
             "filename": file.filename,
             "timestamp": datetime.now().isoformat(),
-            "original_size": {"width": image.shape[1], "height": image.shape[0]},
-            "new_size": {"width": new_width, "height": new_height},
+            "original_size": metadata["original_size"],
+            "new_size": metadata["output_size"],
             "transformation": "resize",
-            "download_url": f"/download/{file_id}_resized.jpg"
+            "download_url": f"/download/{metadata['output_name']}"
         }
-    
+
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except OutputTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Resize error: {str(e)}")
         raise HTTPException(status_code=500, detail="Image resize failed")
-    
 
-@app.post("/crop")
+
+@router.post("/crop")
 async def crop_image(
+    response: Response,
     file: UploadFile = File(...),
     x: int = Query(...),
     y: int = Query(...),
     width: int = Query(...),
-    height: int = Query(...)
+    height: int = Query(...),
+    output_format: str = Query(None, alias="format"),
+    quality: int = Query(DEFAULT_QUALITY, ge=1, le=100),
+    persist: bool = Query(False),
+    accept: str = Header(None),
+    if_none_match: str = Header(None)
 ):
     """Crop image from position (x,y) with specified dimensions"""
     try:
-        content = await file.read()
-        image = ImageAnalyzer.read_image(content)
-        cropped = ImageAnalyzer.crop_image(image, x, y, width, height)
-        
-        file_id = str(uuid.uuid4())
-        output_path = UPLOAD_DIR / f"{file_id}_cropped.jpg"
-        cv2.imwrite(str(output_path), cropped)
-        
+        output = _output_options(accept, output_format, quality, persist)
+        with stage("upload_buffer"):
+            content = await file.read()
+        observe_upload(content)
+        params = {"x": x, "y": y, "width": width, "height": height}
+        metadata, body, etag, cache_hit = await get_executor().run(
+            _produce, content, "cropped", params, _crop, (x, y, width, height), output, if_none_match
+        )
+        if not persist:
+            return _image_response(metadata, body, etag, cache_hit, output["format"], file.filename, "cropped")
+        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+
         return {
             "filename": file.filename,
             "timestamp": datetime.now().isoformat(),
-            "original_size": {"width": image.shape[1], "height": image.shape[0]},
+            "original_size": metadata["original_size"],
             "crop_region": {"x": x, "y": y, "width": width, "height": height},
-            "cropped_size": {"width": cropped.shape[1], "height": cropped.shape[0]},
+            "cropped_size": metadata["output_size"],
             "transformation": "crop",
-            "download_url": f"/download/{file_id}_cropped.jpg"
+            "download_url": f"/download/{metadata['output_name']}"
         }
-    
+
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except OutputTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Crop error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Image crop failed")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Image crop failed")
+
+
+@router.post("/transform")
+async def transform_image(
+    response: Response,
+    file: UploadFile = File(...),
+    operations: str = Form(...),
+    output_format: str = Query(None, alias="format"),
+    quality: int = Query(DEFAULT_QUALITY, ge=1, le=100),
+    persist: bool = Query(False),
+    accept: str = Header(None),
+    if_none_match: str = Header(None)
+):
+    """Apply an ordered list of operations (JSON) with a single decode and encode"""
+    try:
+        pipeline = TransformPipeline(json.loads(operations))
+        output = _output_options(accept, output_format, quality, persist)
+
+        with stage("upload_buffer"):
+            content = await file.read()
+        observe_upload(content)
+        params = {"operations": json.dumps(pipeline.operations, sort_keys=True)}
+        metadata, body, etag, cache_hit = await get_executor().run(
+            _produce, content, "transformed", params, _run_pipeline, (pipeline,), output, if_none_match
+        )
+        if not persist:
+            return _image_response(metadata, body, etag, cache_hit, output["format"], file.filename, "transformed")
+        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+
+        return {
+            "filename": file.filename,
+            "timestamp": datetime.now().isoformat(),
+            "original_size": metadata["original_size"],
+            "new_size": metadata["output_size"],
+            "transformation": "pipeline",
+            "operations": pipeline.operations,
+            "download_url": f"/download/{metadata['output_name']}"
+        }
+
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except OutputTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Transform error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Image transformation failed")
+
+
+@router.post("/transform/frames")
+async def transform_clip(
+    file: UploadFile = File(...),
+    operations: str = Form(...),
+    output_format: str = Query("webp", alias="format"),
+    quality: int = Query(80, ge=1, le=100),
+    step: int = Query(1, ge=1),
+    max_frames: int = Query(MAX_FRAMES, ge=1, le=MAX_FRAMES)
+):
+    """Apply a pipeline to every frame of an animation or video and re-encode it (webp, tiff or mp4).
+
+    Frames are transformed in parallel and streamed into the encoder in
+    order; step=N keeps every Nth frame and stretches its duration to match.
+    """
+    try:
+        pipeline = TransformPipeline(json.loads(operations))
+        if output_format not in FRAME_FORMATS:
+            raise ValueError(f"Unsupported multi-frame format: {output_format}. "
+                             f"Use one of: {', '.join(FRAME_FORMATS)}")
+
+        with stage("upload_buffer"):
+            content = await file.read()
+        observe_upload(content)
+        body, frame_count, (width, height) = await get_executor().run(
+            transform_frames, content, pipeline.run, output_format, quality, step, max_frames
+        )
+
+        media_type, extension = FRAME_FORMATS[output_format]
+        stem = (file.filename or "clip").rsplit(".", 1)[0]
+        return Response(content=body, media_type=media_type, headers={
+            "Content-Disposition": f'inline; filename="{stem}_transformed{extension}"',
+            "X-Frame-Count": str(frame_count),
+            "X-Image-Width": str(width),
+            "X-Image-Height": str(height)
+        })
+
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Frame transform error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Frame transformation failed")
+
+
+MEDIA_TYPES = {extension: media_type for media_type, extension in OUTPUT_FORMATS.values()}
+
+
+@router.get("/download/{file_id}")
+async def download_output(file_id: str, if_none_match: str = Header(None)):
+    """Serve a persisted output with Range, If-Range and If-None-Match support"""
+    store = get_output_store()
+    stored = store.get(file_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Output not found or expired")
+
+    headers = {"ETag": stored.etag}
+    expires_at = store.expires_at(stored)
+    if expires_at is not None:
+        headers["Cache-Control"] = f"private, max-age={max(0, int(expires_at - time.time()))}, immutable"
+    if if_none_match and etag_matches(if_none_match, stored.etag):
+        return Response(status_code=304, headers=headers)
+
+    path = store.path(stored)
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Output not found or expired")
+    # FileResponse streams from the file (or hands the path to the server via pathsend)
+    return FileResponse(
+        path, media_type=MEDIA_TYPES.get(path.suffix, "application/octet-stream"),
+        headers=headers, stat_result=stat_result, content_disposition_type="inline", filename=stored.name
+    )
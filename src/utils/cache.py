@@ -0,0 +1,236 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from src.utils.file_handler import UPLOAD_DIR
+
+logger = logging.getLogger(__name__)
+
+# Size limits of the two cache tiers; 0 disables a tier
+CACHE_MEMORY_BYTES = int(float(os.environ.get("IMAGE_API_CACHE_MEMORY_MB", 64)) * 1024 * 1024)
+CACHE_DISK_BYTES = int(float(os.environ.get("IMAGE_API_CACHE_DISK_MB", 512)) * 1024 * 1024)
+CACHE_DIR = Path(os.environ.get("IMAGE_API_CACHE_DIR", UPLOAD_DIR / ".cache"))
+
+
+def content_hash(content: bytes) -> str:
+    """Fast 128-bit digest of uploaded bytes"""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def cache_key(digest: str, operation: str, **params) -> str:
+    """Key for an operation with its parameters applied to hashed content"""
+    param_str = "&".join(f"{name}={params[name]}" for name in sorted(params))
+    return hashlib.blake2b(f"{digest}|{operation}|{param_str}".encode(), digest_size=16).hexdigest()
+
+
+class MemoryTier:
+    """In-memory LRU of byte values bounded by their total size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+class DiskTier:
+    """On-disk LRU of byte values, one file per key, bounded by total size"""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from existing files, oldest access first"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in self.directory.glob("*.bin"):
+            stat = path.stat()
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+        self._evict()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.bin"
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            self._path(key).unlink(missing_ok=True)
+
+    def get(self, key: str):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        try:
+            value = self._path(key).read_bytes()
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            with self._lock:
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self._size -= size
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(value)
+        os.replace(tmp_path, path)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old
+            self._entries[key] = len(value)
+            self._size += len(value)
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+class ResultCache:
+    """Two-tier (memory, then disk) cache of operation results.
+
+    Disk hits are promoted into the memory tier. Either tier can be
+    disabled by giving it a size of 0.
+    """
+
+    def __init__(self, memory_bytes: int = CACHE_MEMORY_BYTES, disk_bytes: int = CACHE_DISK_BYTES,
+                 directory: Path = CACHE_DIR):
+        self.memory = MemoryTier(memory_bytes) if memory_bytes > 0 else None
+        self.disk = DiskTier(directory, disk_bytes) if disk_bytes > 0 else None
+
+    def get(self, key: str):
+        """Cached bytes for ``key`` or None"""
+        if self.memory is not None:
+            value = self.memory.get(key)
+            if value is not None:
+                return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                if self.memory is not None:
+                    self.memory.put(key, value)
+                return value
+        return None
+
+    def put(self, key: str, value: bytes):
+        """Store ``value`` in every enabled tier"""
+        if self.memory is not None:
+            self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def get_json(self, key: str):
+        """Cached JSON document for ``key`` or None"""
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def put_json(self, key: str, document):
+        """Store a JSON-serialisable document"""
+        self.put(key, json.dumps(document).encode())
+
+    def get_blob(self, key: str):
+        """Cached (metadata, body) pair for ``key`` or None"""
+        value = self.get(key)
+        if value is None:
+            return None
+        header_length = int.from_bytes(value[:4], "big")
+        return json.loads(value[4:4 + header_length]), value[4 + header_length:]
+
+    def put_blob(self, key: str, metadata: dict, body: bytes):
+        """Store binary ``body`` together with a JSON metadata header"""
+        header = json.dumps(metadata).encode()
+        self.put(key, len(header).to_bytes(4, "big") + header + body)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and sizes of both tiers"""
+        return {
+            "memory": self.memory.stats() if self.memory is not None else None,
+            "disk": self.disk.stats() if self.disk is not None else None
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Return the shared result cache, creating it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+                logger.info(f"Result cache ready (memory {CACHE_MEMORY_BYTES} B, disk {CACHE_DISK_BYTES} B)")
+    return _cache
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from src.utils.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# Directory where transformation outputs are written
+UPLOAD_DIR = Path("uploads")
+
+# Output encodings: name -> (media type, file extension), in server preference order
+OUTPUT_FORMATS = {
+    "jpeg": ("image/jpeg", ".jpg"),
+    "webp": ("image/webp", ".webp"),
+    "png": ("image/png", ".png")
+}
+DEFAULT_QUALITY = 95
+
+
+def negotiate_format(accept: str = None, requested: str = None):
+    """Pick an output format from an explicit request or the Accept header.
+
+    Returns None when the Accept header rules out every supported image type.
+    """
+    if requested:
+        requested = requested.lower()
+        if requested == "jpg":
+            requested = "jpeg"
+        if requested not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {requested}")
+        return requested
+    if not accept:
+        return "jpeg"
+
+    weights = {}
+    for part in accept.split(","):
+        media_type, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[media_type.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for name, (media_type, _) in OUTPUT_FORMATS.items():
+        quality = weights.get(media_type, weights.get("image/*", weights.get("*/*", 0.0)))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header names ``etag`` (weak comparison)"""
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def encode_image(image: np.ndarray, image_format: str, quality: int = DEFAULT_QUALITY) -> bytes:
+    """Encode an image in memory as jpeg, webp or png"""
+    _, extension = OUTPUT_FORMATS[image_format]
+    if image_format == "jpeg":
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+    elif image_format == "webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, quality]
+    else:
+        params = []
+    ok, buffer = cv2.imencode(extension, image, params)
+    if not ok:
+        raise ValueError(f"Could not encode image as {image_format}")
+    return buffer.tobytes()
@@ -0,0 +1,42 @@
+import importlib
+import importlib.util
+import sys
+import threading
+import types
+
+_load_lock = threading.Lock()
+
+
+class _LazyModule(types.ModuleType):
+    """Stand-in that imports the real module on the first missing attribute"""
+
+    def __getattr__(self, attr):
+        # Only reached for attributes not yet copied in. The import system serialises
+        # concurrent first imports, and the lock keeps the copy below from racing.
+        with _load_lock:
+            module = importlib.import_module(self.__name__)
+            if "__file__" not in self.__dict__:
+                self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str):
+    """Module ``name``, imported on first attribute access instead of now.
+
+    Lets the API start and answer health checks without paying for OpenCV
+    and NumPy (roughly 100 ms) until the first image arrives or warm-up
+    runs. Unlike importlib's LazyLoader (not thread-safe on Python 3.11),
+    any number of threads may trigger the first load at once; they all wait
+    for the one real import. Plain ``import name`` statements are unaffected.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    return _LazyModule(name)
+
+
+def is_loaded(name: str) -> bool:
+    """Whether module ``name`` has actually been imported"""
+    return name in sys.modules
@@ -0,0 +1,234 @@
+import bisect
+import contextlib
+import contextvars
+import os
+import threading
+import time
+
+# Instrumentation switch; when off, stage() hands out a shared no-op context manager
+METRICS_ENABLED = os.environ.get("IMAGE_API_METRICS", "1") != "0"
+# Add a Server-Timing header listing the stages of each request
+SERVER_TIMING_ENABLED = os.environ.get("IMAGE_API_SERVER_TIMING", "0") == "1"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MEGAPIXEL_BUCKETS = (0.1, 0.3, 1, 2, 5, 12, 24, 48, 100)
+BYTE_BUCKETS = (16e3, 64e3, 256e3, 1e6, 4e6, 16e6, 64e6)
+
+_NULL_STAGE = contextlib.nullcontext()
+_request_stages = contextvars.ContextVar("request_stages", default=None)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, *label_values):
+        self.inc(-amount, *label_values)
+
+    def set(self, value: float, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labels, key, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "image_api_stage_seconds", "Time spent in each processing stage", LATENCY_BUCKETS, ("stage",)
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "image_api_request_seconds", "End-to-end HTTP request latency", LATENCY_BUCKETS, ("method", "route", "status")
+))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "image_api_requests_in_flight", "HTTP requests currently being served"
+))
+IMAGE_MEGAPIXELS = REGISTRY.register(Histogram(
+    "image_api_image_megapixels", "Decoded image size in megapixels", MEGAPIXEL_BUCKETS
+))
+UPLOAD_BYTES = REGISTRY.register(Histogram(
+    "image_api_upload_bytes", "Uploaded file size in bytes", BYTE_BUCKETS
+))
+
+
+class _StageTimer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, self.name)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages.append((self.name, elapsed))
+        return False
+
+
+def stage(name: str):
+    """Context manager timing one processing stage (decode, metrics, encode, ...)"""
+    if not METRICS_ENABLED:
+        return _NULL_STAGE
+    return _StageTimer(name)
+
+
+def observe_image(image):
+    """Record the decoded size of an image"""
+    if METRICS_ENABLED:
+        IMAGE_MEGAPIXELS.observe(image.shape[0] * image.shape[1] / 1e6)
+
+
+def observe_upload(content: bytes):
+    """Record the size of an uploaded file"""
+    if METRICS_ENABLED:
+        UPLOAD_BYTES.observe(len(content))
+
+
+def _server_timing(stages: list) -> bytes:
+    totals = {}
+    for name, elapsed in stages:
+        totals[name] = totals.get(name, 0.0) + elapsed
+    return ", ".join(f"{name};dur={elapsed * 1000:.3f}" for name, elapsed in totals.items()).encode()
+
+
+class MetricsMiddleware:
+    """ASGI middleware tracking in-flight requests, request latency and Server-Timing.
+
+    Time spent waiting for request body chunks is recorded as the
+    ``upload_receive`` stage: that is the actual upload. By the time a
+    route reads an UploadFile the form parser has already spooled it, so
+    the routes' ``upload_buffer`` stage only covers copying it into memory.
+    """
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages = []
+        token = _request_stages.set(stages)
+        start = time.perf_counter()
+        status = [500]
+        receiving = [0.0, 0]  # seconds waited and bytes received
+        REQUESTS_IN_FLIGHT.inc()
+
+        async def receive_wrapper():
+            receive_start = time.perf_counter()
+            message = await receive()
+            if message["type"] == "http.request":
+                receiving[0] += time.perf_counter() - receive_start
+                receiving[1] += len(message.get("body", b""))
+                if not message.get("more_body", False) and receiving[1]:
+                    STAGE_SECONDS.observe(receiving[0], "upload_receive")
+                    stages.append(("upload_receive", receiving[0]))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if self.server_timing and stages:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(stages)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], route_path, status[0])
+            _request_stages.reset(token)
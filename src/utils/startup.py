@@ -0,0 +1,62 @@
+import threading
+import time
+
+from src.utils.metrics import REGISTRY, Gauge
+
+# Taken when this module is first imported; main imports it before anything heavy
+IMPORT_STARTED = time.perf_counter()
+
+STARTUP_PHASES = ("imported", "app_created", "ready", "first_request")
+
+STARTUP_SECONDS = REGISTRY.register(Gauge(
+    "image_api_startup_seconds", "Seconds from the start of app imports to each startup phase", ("phase",)
+))
+
+
+class StartupTimer:
+    """Time from the start of app imports to each startup phase, recorded once per phase.
+
+    ``imported`` is the end of main's imports, ``app_created`` the end of
+    create_app(), ``ready`` the end of lifespan start-up (including any
+    warm-up) and ``first_request`` the completion of the first HTTP response.
+    """
+
+    def __init__(self, started: float = IMPORT_STARTED):
+        self.started = started
+        self._phases = {}
+        self._lock = threading.Lock()
+        self.warmup_ms = None
+
+    def mark(self, phase: str):
+        with self._lock:
+            if phase in self._phases:
+                return
+            elapsed = time.perf_counter() - self.started
+            self._phases[phase] = elapsed
+        STARTUP_SECONDS.set(round(elapsed, 6), phase)
+
+    def reached(self, phase: str) -> bool:
+        return phase in self._phases
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {f"{phase}_ms": round(self._phases[phase] * 1000, 3) if phase in self._phases else None
+                     for phase in STARTUP_PHASES}
+        stats["warmup"] = self.warmup_ms
+        return stats
+
+
+STARTUP = StartupTimer()
+
+
+class FirstRequestMiddleware:
+    """ASGI middleware marking ``first_request`` when the first HTTP response has been sent"""
+
+    def __init__(self, app, timer: StartupTimer = STARTUP):
+        self.app = app
+        self.timer = timer
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+        if scope["type"] == "http" and not self.timer.reached("first_request"):
+            self.timer.mark("first_request")
@@ -0,0 +1,202 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from src.utils.file_handler import OUTPUT_FORMATS, UPLOAD_DIR
+
+logger = logging.getLogger(__name__)
+
+# Stored outputs older than this are deleted by the sweeper; 0 keeps them until the quota needs room
+STORAGE_TTL_SECONDS = float(os.environ.get("IMAGE_API_STORAGE_TTL_SECONDS", 24 * 3600))
+# Total size of stored outputs; the oldest are evicted beyond it
+STORAGE_MAX_BYTES = int(float(os.environ.get("IMAGE_API_STORAGE_MB", 1024)) * 1024 * 1024)
+STORAGE_SWEEP_SECONDS = float(os.environ.get("IMAGE_API_STORAGE_SWEEP_SECONDS", 300))
+
+STORED_EXTENSIONS = {extension for _, extension in OUTPUT_FORMATS.values()}
+
+
+class OutputTooLarge(ValueError):
+    """Raised when one output alone exceeds the storage quota, so it could never be served"""
+
+    def __init__(self, size: int, max_bytes: int):
+        super().__init__(f"Output of {size} bytes exceeds the {max_bytes} byte storage quota; "
+                         f"request it without persist to receive it directly")
+        self.size = size
+        self.max_bytes = max_bytes
+
+
+class StoredObject:
+    """Index entry of one stored output"""
+
+    __slots__ = ("name", "size", "created", "etag")
+
+    def __init__(self, name: str, size: int, created: float, etag: str):
+        self.name = name
+        self.size = size
+        self.created = created
+        self.etag = etag
+
+
+class OutputStore:
+    """Transformation outputs on disk, indexed in memory and bounded by age and total size.
+
+    Objects are addressed by file name, so lookups never touch the
+    directory and names outside the index (``../``, the cache directory)
+    cannot be served. The index is rebuilt from the directory once at
+    start-up; after that only put() and the sweeper change it.
+    """
+
+    def __init__(self, directory: Path = UPLOAD_DIR, ttl_seconds: float = STORAGE_TTL_SECONDS,
+                 max_bytes: int = STORAGE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._objects = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop = threading.Event()
+        self.expired = 0
+        self.evictions = 0
+        self._load_index()
+
+    def _load_index(self):
+        """Index existing outputs, oldest first"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        found = []
+        for path in self.directory.iterdir():
+            if path.suffix in STORED_EXTENSIONS and path.is_file():
+                stat = path.stat()
+                etag = f'"{int(stat.st_mtime_ns):x}-{stat.st_size:x}"'
+                found.append(StoredObject(path.name, stat.st_size, stat.st_mtime, etag))
+        for stored in sorted(found, key=lambda stored: stored.created):
+            self._objects[stored.name] = stored
+            self._size += stored.size
+
+    def put(self, name: str, body: bytes) -> StoredObject:
+        """Write ``body`` as ``name`` and index it, evicting the oldest outputs beyond the quota.
+
+        Raises OutputTooLarge, without writing anything, if ``body`` alone exceeds the quota.
+        """
+        if len(body) > self.max_bytes:
+            raise OutputTooLarge(len(body), self.max_bytes)
+        path = self.directory / name
+        tmp_path = path.with_name(f".{name}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(body)
+        os.replace(tmp_path, path)
+        stored = StoredObject(name, len(body), time.time(),
+                              f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+        with self._lock:
+            old = self._objects.pop(name, None)
+            if old is not None:
+                self._size -= old.size
+            self._objects[name] = stored
+            self._size += stored.size
+            removed = self._evict_over_quota()
+        self._unlink(removed)
+        return stored
+
+    def get(self, name: str):
+        """Index entry for ``name`` or None if unknown or expired"""
+        with self._lock:
+            stored = self._objects.get(name)
+        if stored is None or self._is_expired(stored, time.time()):
+            return None
+        return stored
+
+    def path(self, stored: StoredObject) -> Path:
+        return self.directory / stored.name
+
+    def expires_at(self, stored: StoredObject):
+        """Epoch time at which ``stored`` expires, or None without a TTL"""
+        return stored.created + self.ttl_seconds if self.ttl_seconds > 0 else None
+
+    def _is_expired(self, stored: StoredObject, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - stored.created > self.ttl_seconds
+
+    def _evict_over_quota(self) -> list:
+        # Caller holds the lock
+        removed = []
+        while self._size > self.max_bytes and self._objects:
+            _, stored = self._objects.popitem(last=False)
+            self._size -= stored.size
+            self.evictions += 1
+            removed.append(stored)
+        return removed
+
+    def _unlink(self, removed: list):
+        for stored in removed:
+            self.path(stored).unlink(missing_ok=True)
+
+    def sweep(self) -> int:
+        """Delete expired outputs and enforce the size quota; returns the number removed"""
+        now = time.time()
+        with self._lock:
+            removed = []
+            # Insertion order is creation order, so expired entries form a prefix
+            while self._objects:
+                stored = next(iter(self._objects.values()))
+                if not self._is_expired(stored, now):
+                    break
+                self._objects.popitem(last=False)
+                self._size -= stored.size
+                self.expired += 1
+                removed.append(stored)
+            removed.extend(self._evict_over_quota())
+        self._unlink(removed)
+        if removed:
+            logger.info(f"Output sweep removed {len(removed)} files")
+        return len(removed)
+
+    def start_sweeper(self, interval: float = STORAGE_SWEEP_SECONDS):
+        """Run sweep() every ``interval`` seconds on a daemon thread"""
+        if self._sweeper is not None or interval <= 0:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"Output sweep failed: {str(e)}")
+
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=loop, name="output-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._stop.set()
+            self._sweeper.join()
+            self._sweeper = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "objects": len(self._objects),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "expired": self.expired,
+                "evictions": self.evictions
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_output_store() -> OutputStore:
+    """Return the shared output store, indexing UPLOAD_DIR on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = OutputStore()
+                logger.info(f"Output store ready ({_store.stats()['objects']} files, "
+                            f"quota {STORAGE_MAX_BYTES} B, TTL {STORAGE_TTL_SECONDS} s)")
+    return _store
@@ -1,4 +1,4 @@
-from src.core.image_processor import ImageAnalyzer
+from src.core.image_processor import DetectedObjects, HistogramStats, ImageAnalysis, ImageAnalyzer
 # E501: Line length issue resolved by cleaning up initial import comment
 
 import pytest
@@ -109,3 +109,241 @@ class TestImageAnalyzer:
         
         with pytest.raises(ValueError):
             ImageAnalyzer.read_image(invalid_bytes)
+
+
+class TestImageAnalysis:
+    """Test the fused ImageAnalysis metrics engine"""
+
+    def test_analyze_all_matches_individual_metrics(self, high_contrast_image):
+        """analyze_all should agree with the per-metric static methods"""
+        metrics = ImageAnalyzer.analyze_all(high_contrast_image)
+        assert metrics["blur_score"] == ImageAnalyzer.calculate_blur_score(high_contrast_image)
+        assert metrics["brightness"] == ImageAnalyzer.calculate_brightness(high_contrast_image)
+        assert metrics["contrast"] == ImageAnalyzer.calculate_contrast(high_contrast_image)
+        assert metrics["object_count"] == ImageAnalyzer.count_objects(high_contrast_image)
+        assert metrics["quality_rating"] == ImageAnalyzer.get_quality_rating(
+            metrics["blur_score"], metrics["brightness"], metrics["contrast"]
+        )
+
+    def test_metrics_match_numpy_reference(self, high_contrast_image):
+        """Brightness and contrast should match np.mean/np.std on the gray plane"""
+        gray = cv2.cvtColor(high_contrast_image, cv2.COLOR_BGR2GRAY)
+        metrics = ImageAnalyzer.analyze_all(high_contrast_image)
+        assert metrics["brightness"] == round((np.mean(gray) / 255) * 100, 2)
+        assert metrics["contrast"] == round((np.std(gray) / 128) * 100, 2)
+
+    def test_gray_plane_converted_once(self, sample_image, monkeypatch):
+        """The grayscale conversion should be shared by all metrics"""
+        from src.core import image_processor
+        from src.core.image_processor import ImageAnalysis
+
+        calls = []
+        real_cvt = cv2.cvtColor
+
+        def counting_cvt(*args, **kwargs):
+            calls.append(args[1] if len(args) > 1 else None)
+            return real_cvt(*args, **kwargs)
+
+        monkeypatch.setattr(image_processor.cv2, "cvtColor", counting_cvt)
+        ImageAnalysis(sample_image).to_dict()
+        assert calls.count(cv2.COLOR_BGR2GRAY) == 1, "Gray plane should be converted once"
+
+
+class TestReducedDecode:
+    """Test decode-time downscaling in read_image"""
+
+    @pytest.fixture
+    def large_jpeg(self):
+        """1600x1200 JPEG with some structure"""
+        img = np.zeros((1200, 1600, 3), dtype=np.uint8)
+        img[200:1000, 400:1200] = (40, 160, 220)
+        _, buffer = cv2.imencode('.jpg', img)
+        return buffer.tobytes()
+
+    def test_probe_size(self, large_jpeg):
+        """probe_size should read the dimensions from the header"""
+        assert ImageAnalyzer.probe_size(large_jpeg) == (1600, 1200)
+
+    def test_probe_size_invalid(self):
+        """probe_size should reject data that is not an image"""
+        with pytest.raises(ValueError):
+            ImageAnalyzer.probe_size(b"invalid image data")
+
+    def test_probe_size_beyond_pillow_limit(self, large_jpeg, monkeypatch):
+        """Images Pillow refuses as decompression bombs should still be sized and decoded"""
+        from PIL import Image
+
+        monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+        assert ImageAnalyzer.header_size(large_jpeg) is None
+        assert ImageAnalyzer.probe_size(large_jpeg) == (1600, 1200)
+        assert ImageAnalyzer.read_image(large_jpeg, target_size=(100, 75)).shape == (1200, 1600, 3)
+
+    def test_target_size_picks_reduced_decode(self, large_jpeg):
+        """The decode should shrink as far as the target allows, but no further"""
+        assert ImageAnalyzer.read_image(large_jpeg, target_size=(100, 75)).shape == (150, 200, 3)
+        assert ImageAnalyzer.read_image(large_jpeg, target_size=(250, 75)).shape == (300, 400, 3)
+        assert ImageAnalyzer.read_image(large_jpeg, target_size=(1400, 10)).shape == (1200, 1600, 3)
+
+    def test_scale_and_grayscale(self, large_jpeg):
+        """A scale hint with grayscale should give a reduced single-channel image"""
+        assert ImageAnalyzer.read_image(large_jpeg, scale=0.3, grayscale=True).shape == (600, 800)
+        assert ImageAnalyzer.read_image(large_jpeg, scale=0.25, grayscale=True).shape == (300, 400)
+
+    def test_fast_analysis_close_to_full(self, large_jpeg):
+        """Brightness and contrast from a reduced decode should stay close to the full decode"""
+        from src.core.batch import analyze_bytes
+
+        full = analyze_bytes(large_jpeg)
+        fast = analyze_bytes(large_jpeg, fast=True)
+        assert fast["image_info"]["width"] == 1600
+        assert fast["image_info"]["analyzed_width"] == 800
+        assert abs(full["analysis"]["brightness"] - fast["analysis"]["brightness"]) < 0.5
+        assert abs(full["analysis"]["contrast"] - fast["analysis"]["contrast"]) < 1
+
+
+class TestPerceptualHash:
+    """Test the dHash computed from the shared gray plane"""
+
+    def test_hash_is_stable_under_resize_and_recompression(self, sample_image):
+        """Rescaled or recompressed copies should stay within a few bits"""
+        original = ImageAnalyzer.perceptual_hash(sample_image)
+        resized = ImageAnalyzer.perceptual_hash(cv2.resize(sample_image, (50, 50), interpolation=cv2.INTER_AREA))
+        recompressed = cv2.imdecode(cv2.imencode(".jpg", sample_image, [cv2.IMWRITE_JPEG_QUALITY, 60])[1],
+                                    cv2.IMREAD_COLOR)
+        assert bin(original ^ resized).count("1") <= 4
+        assert bin(original ^ ImageAnalyzer.perceptual_hash(recompressed)).count("1") <= 4
+
+    def test_different_images_differ(self, sample_image):
+        """Unrelated images should be far apart"""
+        rng = np.random.default_rng(3)
+        noise = rng.integers(0, 256, sample_image.shape, dtype=np.uint8)
+        assert bin(ImageAnalyzer.perceptual_hash(sample_image) ^ ImageAnalyzer.perceptual_hash(noise)).count("1") > 10
+
+
+class TestHistogramStats:
+    """Test statistics derived from the gray-level histogram"""
+
+    def test_matches_numpy(self, sample_image):
+        """Mean, std and percentiles should equal direct computations"""
+        gray = cv2.cvtColor(sample_image, cv2.COLOR_BGR2GRAY)
+        stats = HistogramStats.of(gray)
+        assert stats.count == gray.size
+        assert stats.mean == pytest.approx(gray.mean())
+        assert stats.std == pytest.approx(gray.std())
+        assert stats.percentile(50) == int(np.percentile(gray, 50, method="inverted_cdf"))
+
+    def test_merge_equals_whole(self, sample_image):
+        """Histograms of two halves should merge into the whole image's"""
+        gray = cv2.cvtColor(sample_image, cv2.COLOR_BGR2GRAY)
+        merged = HistogramStats.of(gray[:37]).merge(HistogramStats.of(gray[37:]))
+        assert merged.summary() == HistogramStats.of(gray).summary()
+
+    def test_clipping_and_range(self):
+        """Clipping ratios and dynamic range should reflect the extremes"""
+        gray = np.full((10, 10), 128, dtype=np.uint8)
+        gray[0] = 0
+        gray[1, :5] = 255
+        summary = HistogramStats.of(gray).summary()
+        assert summary["shadow_clipping"] == 0.1
+        assert summary["highlight_clipping"] == 0.05
+        assert summary["dynamic_range"] == 255
+
+    def test_brightness_and_contrast_from_histogram(self, sample_image):
+        """Brightness and contrast should keep their meaning"""
+        gray = cv2.cvtColor(sample_image, cv2.COLOR_BGR2GRAY)
+        analysis = ImageAnalysis(sample_image)
+        assert analysis.brightness == round(gray.mean() / 255 * 100, 2)
+        assert analysis.contrast == round(gray.std() / 128 * 100, 2)
+
+
+class TestEnhanceModes:
+    """Test the histogram-driven enhance modes"""
+
+    @pytest.fixture
+    def flat_image(self):
+        """Low-contrast, slightly dark gradient image"""
+        ramp = np.tile(np.linspace(60, 120, 120, dtype=np.float32), (80, 1))
+        return cv2.merge([ramp, ramp * 0.9, ramp * 1.1]).astype(np.uint8)
+
+    @pytest.mark.parametrize("mode", ["auto_levels", "clahe"])
+    def test_mode_increases_contrast(self, flat_image, mode):
+        """Both modes should widen the tonal range of a flat image"""
+        enhanced = ImageAnalyzer.enhance_image(flat_image, mode=mode)
+        assert enhanced.shape == flat_image.shape
+        assert ImageAnalysis(enhanced).histogram.std > ImageAnalysis(flat_image).histogram.std
+
+    def test_auto_levels_stretches_range(self, flat_image):
+        """Auto levels should map the percentile range to nearly the full scale"""
+        before = ImageAnalysis(flat_image).histogram.summary()
+        after = ImageAnalysis(ImageAnalyzer.enhance_image(flat_image, mode="auto_levels")).histogram.summary()
+        assert before["dynamic_range"] < 70
+        assert after["dynamic_range"] > 200
+
+    def test_grayscale_and_invalid_mode(self, flat_image):
+        """Single-channel images are supported; unknown modes are rejected"""
+        gray = cv2.cvtColor(flat_image, cv2.COLOR_BGR2GRAY)
+        assert ImageAnalyzer.enhance_image(gray, mode="clahe").shape == gray.shape
+        with pytest.raises(ValueError):
+            ImageAnalyzer.enhance_image(flat_image, mode="vivid")
+
+
+class TestObjectDetection:
+    """Test connected-component object detection"""
+
+    @pytest.fixture
+    def blobs_image(self):
+        """Dark 400x300 image with three white rectangles and one 2x2 speck"""
+        image = np.full((300, 400, 3), 20, dtype=np.uint8)
+        image[20:80, 30:130] = 240    # 100x60
+        image[150:190, 200:240] = 240  # 40x40
+        image[250:270, 300:310] = 240  # 10x20
+        image[5:7, 390:392] = 240      # 2x2 speck
+        return image
+
+    def test_boxes_and_areas(self, blobs_image):
+        """Boxes should be x, y, width, height sorted by decreasing area"""
+        objects = ImageAnalyzer.detect_objects(blobs_image, max_dimension=None)
+        assert isinstance(objects, DetectedObjects)
+        assert objects.count == 3
+        assert objects.boxes.tolist() == [[30, 20, 100, 60], [200, 150, 40, 40], [300, 250, 10, 20]]
+        assert objects.areas.tolist() == [6000, 1600, 200]
+
+    def test_min_area_filter(self, blobs_image):
+        """Components below min_area pixels should be dropped"""
+        assert ImageAnalyzer.detect_objects(blobs_image, min_area=1, max_dimension=None).count == 4
+        assert ImageAnalyzer.detect_objects(blobs_image, min_area=1000, max_dimension=None).count == 2
+
+    def test_downscaled_boxes_in_full_resolution(self, blobs_image):
+        """Detection on a reduced plane should report boxes in original coordinates"""
+        objects = ImageAnalyzer.detect_objects(blobs_image, max_dimension=100)
+        assert objects.count == 3
+        assert np.abs(objects.boxes[0] - [30, 20, 100, 60]).max() <= 4
+        assert abs(int(objects.areas[0]) - 6000) < 600
+
+    def test_count_only_and_adaptive(self, blobs_image):
+        """Count-only and adaptive thresholding should agree on well separated objects"""
+        analysis = ImageAnalysis(blobs_image)
+        counted = analysis.detect_objects(boxes=False)
+        assert counted.count == 3
+        assert counted.boxes.shape == (0, 4)
+        assert analysis.detect_objects("adaptive").count == 3
+        assert analysis.to_dict(objects="count")["object_count"] == 3
+
+    def test_count_only_on_downscaled_plane(self, blobs_image, monkeypatch):
+        """At a 4x reduction the count-only path should skip component stats and still count 3"""
+        with_stats = ImageAnalyzer.detect_objects(blobs_image, max_dimension=100)
+
+        def no_stats(*args, **kwargs):
+            raise AssertionError("count-only detection should not compute component stats")
+
+        monkeypatch.setattr(cv2, "connectedComponentsWithStats", no_stats)
+        counted = ImageAnalyzer.detect_objects(blobs_image, max_dimension=100, boxes=False)
+        assert counted.count == with_stats.count == 3
+        assert counted.boxes.shape == (0, 4)
+
+    def test_invalid_modes(self, blobs_image):
+        """Unknown threshold methods and objects modes should be rejected"""
+        with pytest.raises(ValueError):
+            ImageAnalyzer.detect_objects(blobs_image, threshold="triangle")
+        with pytest.raises(ValueError):
+            ImageAnalysis(blobs_image).to_dict(objects="all")
@@ -0,0 +1,393 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from src.core.batch import analyze_bytes
+
+
+def crash_on_poison(content, fast, objects):
+    """Batch worker function that kills its process on poison uploads"""
+    if content.startswith(b"poison"):
+        os._exit(1)
+    return analyze_bytes(content, fast, objects)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """FastAPI test client with a fresh result cache and similarity index"""
+    from src.core import similarity
+    from src.utils import cache
+    monkeypatch.setattr(cache, "_cache", cache.ResultCache(directory=tmp_path / "cache"))
+    monkeypatch.setattr(similarity, "_index", similarity.PersistentHashIndex(tmp_path / "index.npz", save_every=0))
+    return TestClient(app)
+
+
+class TestAnalysisEndpoints:
+    """Test the analysis routes"""
+
+    def test_analyze_image(self, client, test_image_file):
+        """/analyze should return real metrics for an uploaded image"""
+        response = client.post("/analyze", files={"file": (test_image_file[1], test_image_file[0], "image/jpeg")})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["image_info"]["width"] == 100
+        assert body["analysis"]["quality_rating"] in {"Excellent", "Good", "Fair", "Poor"}
+        assert set(body["histogram"]) >= {"mean", "std", "percentiles", "shadow_clipping", "dynamic_range"}
+
+    def test_analyze_served_from_cache(self, client, test_image_bytes):
+        """Re-uploading the same bytes should hit the result cache"""
+        upload = {"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        first = client.post("/analyze", files=upload)
+        second = client.post("/analyze", files=upload)
+        assert first.headers["X-Cache"] == "MISS"
+        assert second.headers["X-Cache"] == "HIT"
+        assert first.json()["analysis"] == second.json()["analysis"]
+
+    def test_analyze_object_boxes(self, client, sample_image):
+        """objects=boxes should return bounding boxes; unknown modes are rejected"""
+        import cv2
+        upload = {"file": ("boxes.png", cv2.imencode(".png", sample_image)[1].tobytes(), "image/png")}
+        body = client.post("/analyze", params={"objects": "boxes"}, files=upload).json()
+        assert body["objects"]["count"] == body["analysis"]["object_count"]
+        assert len(body["objects"]["boxes"]) == len(body["objects"]["areas"])
+        assert "objects" not in client.post("/analyze", files=upload).json()
+        assert client.post("/analyze", params={"objects": "all"}, files=upload).status_code == 400
+
+    def test_analyze_invalid_image(self, client, invalid_file):
+        """/analyze should reject undecodable uploads"""
+        response = client.post("/analyze", files={"file": (invalid_file[1], invalid_file[0], "image/jpeg")})
+        assert response.status_code == 400
+
+    def test_similar_finds_earlier_upload(self, client, sample_image):
+        """/similar should report a previously analyzed image as a near match"""
+        import cv2
+        original = cv2.imencode(".jpg", sample_image)[1].tobytes()
+        resized = cv2.imencode(".png", cv2.resize(sample_image, (80, 80)))[1].tobytes()
+        analyzed = client.post("/analyze", files={"file": ("original.jpg", original, "image/jpeg")}).json()
+        assert len(analyzed["perceptual_hash"]) == 16
+
+        response = client.post("/similar", params={"max_distance": 6},
+                               files={"file": ("resized.png", resized, "image/png")})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["index_size"] == 1
+        assert body["matches"][0]["filename"] == "original.jpg"
+        assert body["matches"][0]["distance"] <= 6
+
+    def test_dedupe_reuses_analysis(self, client, sample_image):
+        """A near-duplicate upload should reuse the earlier analysis when dedupe is on"""
+        import cv2
+        original = cv2.imencode(".jpg", sample_image, [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes()
+        recompressed = cv2.imencode(".jpg", sample_image, [cv2.IMWRITE_JPEG_QUALITY, 70])[1].tobytes()
+        first = client.post("/analyze", files={"file": ("a.jpg", original, "image/jpeg")}).json()
+        response = client.post("/analyze", params={"dedupe": True},
+                               files={"file": ("b.jpg", recompressed, "image/jpeg")})
+        body = response.json()
+        assert "X-Duplicate-Of" in response.headers
+        assert body["duplicate_of"]["filename"] == "a.jpg"
+        assert body["analysis"] == first["analysis"]
+        assert body["image_info"]["size_kb"] == len(recompressed) / 1024
+
+    def test_analyze_batch(self, client, test_image_bytes, test_png_file, invalid_file):
+        """/analyze/batch should keep input order and report errors per file"""
+        files = [
+            ("files", ("a.jpg", test_image_bytes, "image/jpeg")),
+            ("files", (invalid_file[1], invalid_file[0].read(), "image/jpeg")),
+            ("files", (test_png_file[1], test_png_file[0].read(), "image/png")),
+        ]
+        response = client.post("/analyze/batch", files=files)
+        assert response.status_code == 200
+        body = response.json()
+        assert [item["filename"] for item in body["results"]] == ["a.jpg", "invalid.jpg", "test.png"]
+        assert [item["status_code"] for item in body["results"]] == [200, 400, 200]
+        assert body["failed"] == 1
+        assert "recommendations" in body["results"][0]
+        assert float(response.headers["X-Batch-Images-Per-Second"]) > 0
+        assert "X-Per-File-Ms" in response.headers
+
+    def test_analyze_batch_survives_worker_crash(self, client, test_image_bytes, monkeypatch):
+        """A crashing worker should only fail its own file, and later batches should still work"""
+        from src.routers import analysis
+        monkeypatch.setattr(analysis, "analyze_bytes", crash_on_poison)
+        files = [
+            ("files", ("a.jpg", test_image_bytes, "image/jpeg")),
+            ("files", ("poison.jpg", b"poison", "image/jpeg")),
+            ("files", ("b.jpg", test_image_bytes, "image/jpeg")),
+        ]
+        response = client.post("/analyze/batch", files=files)
+        assert response.status_code == 200
+        assert [item["status_code"] for item in response.json()["results"]] == [200, 500, 200]
+        response = client.post("/analyze/batch", files=files[:1])
+        assert [item["status_code"] for item in response.json()["results"]] == [200]
+
+    def test_analyze_batch_limits(self, client, test_image_bytes, monkeypatch):
+        """Oversized batches should get 413 and batches on a saturated server a fast 503"""
+        from src.core.executor import ExecutorSaturated
+        from src.routers import analysis
+        files = [("files", (f"{index}.jpg", test_image_bytes, "image/jpeg")) for index in range(3)]
+        monkeypatch.setattr(analysis, "MAX_BATCH_BYTES", 2 * len(test_image_bytes))
+        assert client.post("/analyze/batch", files=files).status_code == 413
+
+        class Saturated:
+            async def run(self, fn, *args):
+                raise ExecutorSaturated(7)
+
+        monkeypatch.setattr(analysis, "get_executor", Saturated)
+        response = client.post("/analyze/batch", files=files[:1])
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "7"
+
+    def test_shutdown_stops_batch_pool(self, client, temp_upload_dir, monkeypatch, test_image_bytes):
+        """Leaving the app lifespan should stop the batch worker processes"""
+        from src.core import batch
+        from src.utils import storage
+        monkeypatch.setattr(storage, "_store", storage.OutputStore(temp_upload_dir))
+        monkeypatch.setattr("main.UPLOAD_DIR", temp_upload_dir)
+        with client:
+            client.post("/analyze/batch", files=[("files", ("a.jpg", test_image_bytes, "image/jpeg"))])
+            assert batch._pool is not None
+        assert batch._pool is None
+
+
+class TestTransformationEndpoints:
+    """Test the transformation routes"""
+
+    @pytest.fixture(autouse=True)
+    def upload_dir(self, temp_upload_dir, monkeypatch):
+        """Write transformation outputs to a temporary directory"""
+        from src.utils import storage
+        monkeypatch.setattr(storage, "_store", storage.OutputStore(temp_upload_dir))
+        return temp_upload_dir
+
+    def test_resize_by_dimensions(self, client, test_image_bytes, upload_dir):
+        """/resize?persist=true should write the resized image and report its size"""
+        response = client.post(
+            "/resize", params={"width": 40, "height": 20, "persist": True},
+            files={"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        )
+        assert response.status_code == 200
+        body = response.json()
+        assert body["new_size"] == {"width": 40, "height": 20}
+        assert (upload_dir / body["download_url"].split("/")[-1]).exists()
+
+    def test_resize_served_from_cache(self, client, test_image_bytes):
+        """Repeating a resize should reuse the already written output"""
+        request = {"params": {"percentage": 50, "persist": True}, "files": {"file": ("test.jpg", test_image_bytes, "image/jpeg")}}
+        first = client.post("/resize", **request)
+        second = client.post("/resize", **request)
+        assert second.headers["X-Cache"] == "HIT"
+        assert first.json()["download_url"] == second.json()["download_url"]
+
+    def test_resize_beyond_pillow_limit(self, client, test_image_bytes, monkeypatch):
+        """Images too large for Pillow's header check should still resize"""
+        from PIL import Image
+
+        monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+        response = client.post(
+            "/resize", params={"percentage": 50, "persist": True},
+            files={"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        )
+        assert response.status_code == 200
+        assert response.json()["new_size"] == {"width": 50, "height": 50}
+
+    def test_persist_over_quota_rejected(self, client, test_image_bytes, temp_upload_dir, monkeypatch):
+        """A persisted output that can't fit the storage quota should get 413, not a dead download URL"""
+        from src.utils import storage
+        monkeypatch.setattr(storage, "_store", storage.OutputStore(temp_upload_dir, max_bytes=10))
+        response = client.post(
+            "/resize", params={"width": 40, "height": 20, "persist": True},
+            files={"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        )
+        assert response.status_code == 413
+        assert "persist" in response.json()["detail"]
+
+    def test_resize_requires_parameters(self, client, test_image_bytes):
+        """/resize without a size should be rejected"""
+        response = client.post("/resize", files={"file": ("test.jpg", test_image_bytes, "image/jpeg")})
+        assert response.status_code == 400
+
+    def test_crop(self, client, test_image_bytes):
+        """/crop should return the cropped dimensions"""
+        response = client.post(
+            "/crop", params={"x": 10, "y": 10, "width": 30, "height": 50, "persist": True},
+            files={"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        )
+        assert response.status_code == 200
+        assert response.json()["cropped_size"] == {"width": 30, "height": 50}
+
+    def test_crop_out_of_bounds(self, client, test_image_bytes):
+        """/crop outside the image should be rejected"""
+        response = client.post(
+            "/crop", params={"x": 90, "y": 0, "width": 30, "height": 10},
+            files={"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        )
+        assert response.status_code == 400
+
+    def test_transform_pipeline(self, client, test_image_bytes):
+        """/transform should apply the whole chain in one request"""
+        operations = '[{"op": "crop", "x": 0, "y": 0, "width": 80, "height": 60}, {"op": "resize", "percentage": 50}]'
+        response = client.post(
+            "/transform", params={"persist": True}, data={"operations": operations},
+            files={"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        )
+        assert response.status_code == 200
+        assert response.json()["new_size"] == {"width": 40, "height": 30}
+
+    def test_download_persisted_output(self, client, test_image_bytes):
+        """/download should serve the stored file with ranges and conditional requests"""
+        created = client.post(
+            "/resize", params={"width": 40, "height": 20, "persist": True},
+            files={"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        ).json()
+        full = client.get(created["download_url"])
+        assert full.status_code == 200
+        assert full.headers["content-type"] == "image/jpeg"
+        assert full.headers["accept-ranges"] == "bytes"
+
+        partial = client.get(created["download_url"], headers={"Range": "bytes=0-9"})
+        assert partial.status_code == 206
+        assert partial.content == full.content[:10]
+
+        cached = client.get(created["download_url"], headers={"If-None-Match": full.headers["ETag"]})
+        assert cached.status_code == 304
+
+    def test_download_unknown_output(self, client):
+        """Ids outside the store index should be 404, including path tricks"""
+        assert client.get("/download/missing.jpg").status_code == 404
+        assert client.get("/download/..%2Fmain.py").status_code == 404
+
+    def test_transform_invalid_operations(self, client, test_image_bytes):
+        """/transform should reject malformed operation lists"""
+        response = client.post(
+            "/transform", data={"operations": "not json"},
+            files={"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        )
+        assert response.status_code == 400
+        response = client.post(
+            "/transform", data={"operations": '[{"op": "resize", "width": [64], "height": {"h": 1}}]'},
+            files={"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        )
+        assert response.status_code == 400
+
+
+class TestStreamedTransformations:
+    """Test image bytes returned directly by the transformation routes"""
+
+    @pytest.fixture(autouse=True)
+    def upload_dir(self, temp_upload_dir, monkeypatch):
+        """Use an output store in a temporary directory to check nothing is written"""
+        from src.utils import storage
+        monkeypatch.setattr(storage, "_store", storage.OutputStore(temp_upload_dir))
+        return temp_upload_dir
+
+    def test_resize_streams_jpeg(self, client, test_image_bytes, upload_dir):
+        """/resize should return the encoded image without touching the disk"""
+        response = client.post(
+            "/resize", params={"width": 40, "height": 20},
+            files={"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/jpeg"
+        assert response.content[:2] == b"\xff\xd8"
+        assert response.headers["X-Image-Width"] == "40"
+        assert response.headers["X-Image-Height"] == "20"
+        assert "ETag" in response.headers
+        assert list(upload_dir.iterdir()) == []
+
+    def test_accept_negotiates_format(self, client, test_image_bytes):
+        """The Accept header should pick the output encoding"""
+        upload = {"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        webp = client.post("/resize", params={"percentage": 50}, files=upload,
+                           headers={"Accept": "image/webp,image/*;q=0.8"})
+        png = client.post("/resize", params={"percentage": 50}, files=upload, headers={"Accept": "image/png"})
+        assert webp.headers["content-type"] == "image/webp"
+        assert webp.content[8:12] == b"WEBP"
+        assert png.headers["content-type"] == "image/png"
+        assert png.content[:4] == b"\x89PNG"
+        assert webp.headers["ETag"] != png.headers["ETag"]
+
+    def test_format_parameter_overrides_accept(self, client, test_image_bytes):
+        """An explicit format query parameter should win over Accept"""
+        response = client.post(
+            "/crop", params={"x": 0, "y": 0, "width": 10, "height": 10, "format": "png"},
+            files={"file": ("test.jpg", test_image_bytes, "image/jpeg")}, headers={"Accept": "image/jpeg"}
+        )
+        assert response.headers["content-type"] == "image/png"
+
+    def test_unacceptable_format(self, client, test_image_bytes):
+        """An Accept header excluding every image type should yield 406"""
+        response = client.post(
+            "/resize", params={"percentage": 50},
+            files={"file": ("test.jpg", test_image_bytes, "image/jpeg")}, headers={"Accept": "application/json"}
+        )
+        assert response.status_code == 406
+
+    def test_if_none_match_returns_304(self, client, test_image_bytes):
+        """A matching ETag should short-circuit with 304 Not Modified"""
+        upload = {"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        first = client.post("/resize", params={"percentage": 50}, files=upload)
+        second = client.post("/resize", params={"percentage": 50}, files=upload,
+                             headers={"If-None-Match": first.headers["ETag"]})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == first.headers["ETag"]
+
+    def test_streamed_result_cached(self, client, test_image_bytes):
+        """Repeated requests should be served from the cached encoded bytes"""
+        operations = '[{"op": "rotate", "angle": 90}, {"op": "filter", "type": "sepia"}]'
+        request = {"data": {"operations": operations}, "files": {"file": ("test.jpg", test_image_bytes, "image/jpeg")}}
+        first = client.post("/transform", **request)
+        second = client.post("/transform", **request)
+        assert first.headers["X-Cache"] == "MISS"
+        assert second.headers["X-Cache"] == "HIT"
+        assert first.content == second.content
+
+
+class TestFrameEndpoints:
+    """Test the multi-frame analysis and transformation routes"""
+
+    @pytest.fixture
+    def animated_gif(self, sample_image):
+        """Six-frame GIF of a white square moving across the sample image"""
+        import io
+        from PIL import Image
+        frames = []
+        for index in range(6):
+            frame = sample_image.copy()
+            frame[40:60, index * 15:index * 15 + 20] = 255
+            frames.append(Image.fromarray(frame))
+        buffer = io.BytesIO()
+        frames[0].save(buffer, format="GIF", save_all=True, append_images=frames[1:], duration=50)
+        return buffer.getvalue()
+
+    def test_analyze_frames(self, client, animated_gif):
+        """/analyze/frames should return clip stats and per-frame metrics"""
+        response = client.post("/analyze/frames", params={"step": 2},
+                               files={"file": ("clip.gif", animated_gif, "image/gif")})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["clip_info"]["analyzed_frames"] == 3
+        assert [frame["index"] for frame in body["frames"]] == [0, 2, 4]
+        assert set(body["summary"]["brightness"]) == {"mean", "min", "max", "std"}
+        assert body["recommendations"]
+
+    def test_transform_frames(self, client, animated_gif):
+        """/transform/frames should return an animated WebP of the transformed frames"""
+        import io
+        from PIL import Image
+        response = client.post("/transform/frames", data={"operations": '[{"op": "resize", "width": 50, "height": 40}]'},
+                               files={"file": ("clip.gif", animated_gif, "image/gif")})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert response.headers["X-Frame-Count"] == "6"
+        with Image.open(io.BytesIO(response.content)) as output:
+            assert (output.n_frames, output.size) == (6, (50, 40))
+
+    def test_transform_frames_rejects_still_format(self, client, animated_gif):
+        """Single-frame output formats should be rejected"""
+        response = client.post("/transform/frames", params={"format": "jpeg"},
+                               data={"operations": '[{"op": "flip", "direction": "horizontal"}]'},
+                               files={"file": ("clip.gif", animated_gif, "image/gif")})
+        assert response.status_code == 400
@@ -0,0 +1,60 @@
+import argparse
+
+import pytest
+
+from benchmarks.loadtest import parse_mix, saturation_point, summarize_level
+from benchmarks.run_benchmarks import compare, percentile
+
+
+class TestBenchmarkComparison:
+    """Test the benchmark statistics and regression check"""
+
+    def test_percentile_interpolates(self):
+        """Percentiles should interpolate between samples"""
+        samples = [4, 1, 3, 2]
+        assert percentile(samples, 0.5) == 2.5
+        assert percentile(samples, 1.0) == 4
+        assert percentile([7], 0.99) == 7
+
+    def test_compare_flags_slowdowns_beyond_threshold(self):
+        """Only cases slower than the threshold should be reported"""
+        baseline = {"results": {"a": {"p50_ms": 10.0}, "b": {"p50_ms": 10.0}, "gone": {"p50_ms": 1.0}}}
+        current = {"results": {"a": {"p50_ms": 11.0}, "b": {"p50_ms": 13.0}, "new": {"p50_ms": 5.0}}}
+        regressions = compare(current, baseline, threshold=0.15)
+        assert [regression["case"] for regression in regressions] == ["b"]
+        assert round(regressions[0]["change"], 2) == 0.3
+
+
+class TestLoadTest:
+    """Test the load-test report"""
+
+    def test_level_summary(self):
+        """Levels should report goodput, error rate and per-operation latency"""
+        samples = [
+            ("analyze", 0.01, 200), ("analyze", 0.03, 200), ("resize", 0.02, 503), ("crop", 0.5, "ReadTimeout")
+        ]
+        level = summarize_level(4, 2.0, samples)
+        assert (level["throughput_rps"], level["goodput_rps"], level["error_rate"]) == (2.0, 1.0, 0.5)
+        assert level["statuses"] == {"200": 2, "503": 1, "ReadTimeout": 1}
+        assert level["operations"]["analyze"] == {"requests": 2, "errors": 0, "p50_ms": 20.0, "p95_ms": 29.0,
+                                                  "p99_ms": 29.8}
+
+    def test_saturation_point(self):
+        """Saturation is the first level without enough gain or over the error budget"""
+        levels = [
+            {"concurrency": 1, "goodput_rps": 10.0, "error_rate": 0.0},
+            {"concurrency": 2, "goodput_rps": 19.0, "error_rate": 0.0},
+            {"concurrency": 4, "goodput_rps": 20.0, "error_rate": 0.0},
+        ]
+        assert saturation_point(levels, 0.1, 0.01) == {
+            "saturated_at": 4, "reason": "throughput_plateau", "useful_concurrency": 2, "goodput_rps": 19.0
+        }
+        levels[1]["error_rate"] = 0.2
+        assert saturation_point(levels, 0.1, 0.01)["reason"] == "error_rate"
+        assert saturation_point(levels[:1], 0.1, 0.01)["reason"] == "not_reached"
+
+    def test_mix_parsing(self):
+        """Mixes should parse weights and reject unknown operations"""
+        assert parse_mix("analyze=70,crop=30") == {"analyze": 70.0, "crop": 30.0}
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_mix("delete=1")
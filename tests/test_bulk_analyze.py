@@ -0,0 +1,105 @@
+import csv
+import json
+import os
+
+import cv2
+import pytest
+
+from src.bulk_analyze import WorkerCrashed, analyze_stream, iter_directory, main
+from src.core.batch import analyze_path
+
+
+@pytest.fixture
+def image_tree(tmp_path, sample_image):
+    """Directory with nested images, a corrupt file and a non-image file"""
+    root = tmp_path / "images"
+    (root / "b").mkdir(parents=True)
+    cv2.imwrite(str(root / "a.jpg"), sample_image)
+    cv2.imwrite(str(root / "b" / "c.png"), sample_image)
+    cv2.imwrite(str(root / "b" / "d.jpg"), sample_image)
+    (root / "broken.jpg").write_bytes(b"not an image")
+    (root / "notes.txt").write_text("skip me")
+    return root
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def crash_on_poison(path, fast):
+    """Worker function that kills its process on files named poison*"""
+    if os.path.basename(path).startswith("poison"):
+        os._exit(1)
+    return analyze_path(path, fast)
+
+
+class TestBulkAnalyze:
+    """Test the offline bulk-analysis CLI"""
+
+    def test_directory_order(self, image_tree):
+        """Directory walks should be sorted and skip non-images"""
+        names = [label.replace(str(image_tree), "") for label, _ in iter_directory(image_tree)]
+        assert names == ["/a.jpg", "/broken.jpg", "/b/c.png", "/b/d.jpg"]
+
+    def test_jsonl_output(self, image_tree, tmp_path):
+        """Every input should produce one record, in input order"""
+        output = tmp_path / "out.jsonl"
+        assert main([str(image_tree), "--output", str(output), "--workers", "0"]) == 0
+        records = read_jsonl(output)
+        assert [record["index"] for record in records] == [0, 1, 2, 3]
+        assert [record["status"] for record in records] == ["ok", "error", "ok", "ok"]
+        assert records[0]["image_info"]["width"] == 100
+        assert records[0]["recommendations"]
+
+    def test_manifest_and_csv(self, image_tree, tmp_path):
+        """Manifests resolve relative paths and CSV output gets one header row"""
+        manifest = image_tree / "manifest.jsonl"
+        manifest.write_text('{"file": "a.jpg"}\n\n{"file": "b/c.png"}\n')
+        output = tmp_path / "out.csv"
+        main([str(manifest), "--path-key", "file", "--format", "csv", "--output", str(output), "--workers", "0"])
+        rows = list(csv.DictReader(output.open()))
+        assert [row["path"] for row in rows] == ["a.jpg", "b/c.png"]
+        assert rows[1]["quality_rating"]
+
+    def test_resume_from_checkpoint(self, image_tree, tmp_path):
+        """A resumed run should drop output written after the checkpoint and finish the rest"""
+        output = tmp_path / "out.jsonl"
+        main([str(image_tree), "--output", str(output), "--workers", "0"])
+        complete = output.read_text()
+
+        checkpoint_path = tmp_path / "out.jsonl.checkpoint"
+        checkpoint = json.loads(checkpoint_path.read_text())
+        first_two = "".join(complete.splitlines(keepends=True)[:2])
+        # Simulate a crash after two checkpointed records and a half-written third
+        checkpoint.update({"completed": 2, "failed": 1, "offset": len(first_two.encode())})
+        checkpoint_path.write_text(json.dumps(checkpoint))
+        output.write_text(first_two + '{"index": 2, "pa')
+
+        main([str(image_tree), "--output", str(output), "--workers", "0", "--resume"])
+        assert output.read_text() == complete
+        assert json.loads(checkpoint_path.read_text())["completed"] == 4
+
+    def test_process_pool(self, image_tree, tmp_path):
+        """The process pool path should give the same records as in-process runs"""
+        inline, pooled = tmp_path / "inline.jsonl", tmp_path / "pooled.jsonl"
+        main([str(image_tree), "--output", str(inline), "--workers", "0", "--fast"])
+        main([str(image_tree), "--output", str(pooled), "--workers", "1", "--prefetch", "2", "--fast"])
+        assert read_jsonl(pooled) == read_jsonl(inline)
+
+    def test_worker_crash_retries_unfinished_inputs(self, image_tree, tmp_path):
+        """A dying worker should only fail its own file; the other files in flight get rerun"""
+        cv2.imwrite(str(image_tree / "poison.png"), cv2.imread(str(image_tree / "a.jpg")))
+        names = ["a.jpg", "poison.png", "b/c.png", "b/d.jpg"]
+        inputs = [(name, str(image_tree / name)) for name in names]
+        results = list(analyze_stream(inputs, workers=1, prefetch=4, fast=True, analyze=crash_on_poison))
+        assert [label for label, _ in results] == names
+        assert isinstance(results[1][1], WorkerCrashed)
+        assert all(isinstance(outcome, dict) for index, (_, outcome) in enumerate(results) if index != 1)
+
+    @pytest.mark.parametrize("option", ["--prefetch", "--checkpoint-every"])
+    @pytest.mark.parametrize("value", ["0", "-1"])
+    def test_rejects_non_positive_options(self, image_tree, tmp_path, option, value):
+        """Values below 1 would analyze nothing or divide by zero, so they are usage errors"""
+        with pytest.raises(SystemExit) as excinfo:
+            main([str(image_tree), "--output", str(tmp_path / "out.jsonl"), option, value])
+        assert excinfo.value.code == 2
@@ -0,0 +1,57 @@
+from src.utils.cache import DiskTier, MemoryTier, ResultCache, cache_key, content_hash
+
+
+class TestResultCache:
+    """Test the two-tier result cache"""
+
+    def test_cache_key_depends_on_params(self):
+        """Keys should differ per operation parameters and ignore their order"""
+        digest = content_hash(b"image bytes")
+        assert cache_key(digest, "resize", width=10, height=20) == cache_key(digest, "resize", height=20, width=10)
+        assert cache_key(digest, "resize", width=10, height=20) != cache_key(digest, "resize", width=20, height=10)
+        assert cache_key(digest, "resize") != cache_key(digest, "crop")
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        """The memory tier should stay under its byte limit, evicting LRU first"""
+        tier = MemoryTier(max_bytes=10)
+        tier.put("a", b"1234")
+        tier.put("b", b"1234")
+        tier.get("a")
+        tier.put("c", b"1234")
+        assert tier.get("b") is None
+        assert tier.get("a") == b"1234"
+        assert tier.stats()["bytes"] <= 10
+        assert tier.stats()["evictions"] == 1
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """Entries written to disk should be found by a new tier instance"""
+        DiskTier(tmp_path, max_bytes=100).put("key", b"value")
+        tier = DiskTier(tmp_path, max_bytes=100)
+        assert tier.get("key") == b"value"
+        assert tier.stats()["hits"] == 1
+
+    def test_disk_tier_evicts_by_size(self, tmp_path):
+        """The disk tier should delete the oldest files beyond its limit"""
+        tier = DiskTier(tmp_path, max_bytes=10)
+        tier.put("a", b"123456")
+        tier.put("b", b"123456")
+        assert tier.get("a") is None
+        assert not (tmp_path / "a.bin").exists()
+
+    def test_disk_hit_promotes_to_memory(self, tmp_path):
+        """A disk hit should be served from memory next time"""
+        cache = ResultCache(memory_bytes=100, disk_bytes=100, directory=tmp_path)
+        cache.disk.put("key", b"value")
+        assert cache.get_json("missing") is None
+        assert cache.get("key") == b"value"
+        assert cache.get("key") == b"value"
+        stats = cache.stats()
+        assert stats["disk"]["hits"] == 1
+        assert stats["memory"]["hits"] == 1
+
+    def test_blob_round_trip(self, tmp_path):
+        """Binary bodies should be stored alongside their JSON metadata"""
+        cache = ResultCache(memory_bytes=0, disk_bytes=1000, directory=tmp_path)
+        cache.put_blob("key", {"width": 4}, b"\x00\xffbody")
+        assert cache.get_blob("key") == ({"width": 4}, b"\x00\xffbody")
+        assert cache.get_blob("missing") is None
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.core.executor import BoundedExecutor, ExecutorSaturated
+
+
+class TestBoundedExecutor:
+    """Test the bounded executor used by the HTTP handlers"""
+
+    def test_run_returns_result(self):
+        """Work should run on a worker thread and return its result"""
+        executor = BoundedExecutor(max_workers=2, max_queue=2)
+
+        async def main():
+            return await executor.run(lambda a, b: (a + b, threading.current_thread().name), 2, 3)
+
+        result, thread_name = asyncio.run(main())
+        executor.shutdown()
+        assert result == 5
+        assert thread_name.startswith("image-worker")
+
+    def test_rejects_when_saturated(self):
+        """Work beyond workers + queue should fail fast with a retry hint"""
+        executor = BoundedExecutor(max_workers=1, max_queue=1)
+        release = threading.Event()
+
+        async def main():
+            running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            assert executor.queue_depth == 1
+            with pytest.raises(ExecutorSaturated) as excinfo:
+                await executor.run(release.wait)
+            release.set()
+            await asyncio.gather(*running)
+            return excinfo.value
+
+        error = asyncio.run(main())
+        stats = executor.stats()
+        executor.shutdown()
+        assert error.retry_after >= 1
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 2
+        assert stats["queue_depth"] == 0
@@ -0,0 +1,39 @@
+import cv2
+import numpy as np
+import pytest
+
+from src.utils.file_handler import encode_image, negotiate_format
+
+
+class TestOutputFormats:
+    """Test output format negotiation and in-memory encoding"""
+
+    def test_defaults_to_jpeg(self):
+        """No preference at all should give JPEG"""
+        assert negotiate_format() == "jpeg"
+        assert negotiate_format("*/*") == "jpeg"
+
+    def test_accept_quality_values(self):
+        """The highest-weighted supported type should win"""
+        assert negotiate_format("image/png;q=0.9, image/webp") == "webp"
+        assert negotiate_format("image/jpeg;q=0.2, image/*;q=0.5") == "webp"
+        assert negotiate_format("image/avif, image/png") == "png"
+
+    def test_nothing_acceptable(self):
+        """Accept headers excluding all image types should give None"""
+        assert negotiate_format("application/json") is None
+        assert negotiate_format("image/*;q=0") is None
+
+    def test_explicit_format(self):
+        """An explicit format should override Accept and be validated"""
+        assert negotiate_format("image/png", "jpg") == "jpeg"
+        assert negotiate_format(None, "WEBP") == "webp"
+        with pytest.raises(ValueError):
+            negotiate_format(None, "gif")
+
+    @pytest.mark.parametrize("image_format", ["jpeg", "webp", "png"])
+    def test_encode_round_trip(self, sample_image, image_format):
+        """Encoded bytes should decode back to an image of the same size"""
+        content = encode_image(sample_image, image_format, quality=80)
+        decoded = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+        assert decoded.shape == sample_image.shape
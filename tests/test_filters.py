@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageEnhance, ImageFilter
+
+from src.core.image_processor import FILTER_TYPES, ImageAnalyzer
+
+
+def pil_apply_filter(image, filter_type):
+    """Previous Pillow-based apply_filter, kept as the reference output"""
+    pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    if filter_type == "blur":
+        filtered = pil_image.filter(ImageFilter.BLUR)
+    elif filter_type == "sharpen":
+        filtered = pil_image.filter(ImageFilter.SHARPEN)
+    elif filter_type == "edge":
+        filtered = pil_image.filter(ImageFilter.FIND_EDGES)
+    elif filter_type == "smooth":
+        filtered = pil_image.filter(ImageFilter.SMOOTH)
+    elif filter_type == "grayscale":
+        filtered = pil_image.convert('L').convert('RGB')
+    else:
+        filtered = ImageEnhance.Color(pil_image).enhance(0)
+        filtered = ImageEnhance.Brightness(filtered).enhance(0.8)
+    return cv2.cvtColor(np.array(filtered), cv2.COLOR_RGB2BGR)
+
+
+def pil_enhance_image(image):
+    """Previous Pillow-based enhance_image, kept as the reference output"""
+    pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    pil_image = ImageEnhance.Contrast(pil_image).enhance(1.3)
+    pil_image = ImageEnhance.Brightness(pil_image).enhance(1.1)
+    pil_image = ImageEnhance.Sharpness(pil_image).enhance(1.2)
+    return cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+
+
+@pytest.fixture
+def textured_image():
+    """Noisy but locally correlated image that exercises every kernel"""
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (90, 120, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(img, (3, 3), 0)
+
+
+class TestNativeFilters:
+    """Native OpenCV filters should reproduce the former Pillow output"""
+
+    @pytest.mark.parametrize("filter_type", FILTER_TYPES)
+    def test_apply_filter_matches_pillow(self, textured_image, filter_type):
+        """Each filter should stay within one grey level of Pillow"""
+        native = ImageAnalyzer.apply_filter(textured_image, filter_type).astype(int)
+        reference = pil_apply_filter(textured_image, filter_type).astype(int)
+        assert native.shape == reference.shape
+        assert np.abs(native - reference).max() <= 1
+
+    def test_enhance_matches_pillow(self, textured_image):
+        """enhance_image should stay within two grey levels of Pillow"""
+        native = ImageAnalyzer.enhance_image(textured_image).astype(int)
+        reference = pil_enhance_image(textured_image).astype(int)
+        difference = np.abs(native - reference)
+        assert difference.max() <= 2
+        assert difference.mean() < 0.5
+
+    def test_apply_filter_in_place(self, textured_image):
+        """Filtering into the source buffer should give the same result"""
+        expected = ImageAnalyzer.apply_filter(textured_image, "sharpen")
+        buffer = textured_image.copy()
+        result = ImageAnalyzer.apply_filter(buffer, "sharpen", out=buffer)
+        assert result is buffer
+        np.testing.assert_array_equal(result, expected)
+
+    def test_apply_filter_into_preallocated_buffer(self, textured_image):
+        """A preallocated output buffer should be reused"""
+        out = np.empty_like(textured_image)
+        result = ImageAnalyzer.apply_filter(textured_image, "sepia", out=out)
+        assert result is out
+
+    def test_unknown_filter(self, sample_image):
+        """Unknown filter names should raise ValueError"""
+        with pytest.raises(ValueError):
+            ImageAnalyzer.apply_filter(sample_image, "vintage")
@@ -0,0 +1,130 @@
+import io
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.core.frames import analyze_frames, iter_frames, sample_frames, transform_frames
+from src.core.image_processor import ImageAnalysis
+
+
+def clip_frames():
+    """Twelve 80x60 frames: six dark ones getting brighter, then six with a white square"""
+    frames = []
+    for index in range(12):
+        frame = np.full((60, 80, 3), 10 + index * 10, dtype=np.uint8)
+        if index >= 6:
+            cv2.rectangle(frame, (10, 10), (40, 40), (255, 255, 255), -1)
+        frames.append(frame)
+    return frames
+
+
+@pytest.fixture
+def animated_gif():
+    """Encoded 12-frame GIF with 40 ms frames"""
+    images = [Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for frame in clip_frames()]
+    buffer = io.BytesIO()
+    images[0].save(buffer, format="GIF", save_all=True, append_images=images[1:], duration=40)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def video_clip(tmp_path):
+    """Encoded 12-frame MPEG-4 clip at 25 fps"""
+    path = str(tmp_path / "clip.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 25, (80, 60))
+    if not writer.isOpened():
+        pytest.skip("No MPEG-4 encoder in this OpenCV build")
+    for frame in clip_frames():
+        writer.write(frame)
+    writer.release()
+    with open(path, "rb") as handle:
+        return handle.read()
+
+
+class TestFrameReader:
+    """Test lazy frame decoding and sampling"""
+
+    def test_iter_animated_frames(self, animated_gif):
+        """Every frame of an animation should be decoded with its timestamp"""
+        frames = list(iter_frames(animated_gif))
+        assert len(frames) == 12
+        assert frames[0].image.shape == (60, 80, 3)
+        assert [frame.timestamp_ms for frame in frames[:3]] == [0, 40, 80]
+
+    def test_step_skips_frames(self, animated_gif):
+        """step=N should yield every Nth frame with N times the duration"""
+        frames = list(iter_frames(animated_gif, step=4))
+        assert [frame.index for frame in frames] == [0, 4, 8]
+        assert frames[0].duration_ms == 160
+
+    def test_video_frames(self, video_clip):
+        """Video clips should decode through OpenCV"""
+        frames = list(iter_frames(video_clip, step=5))
+        assert [frame.index for frame in frames] == [0, 5, 10]
+        assert frames[1].timestamp_ms == pytest.approx(200)
+
+    def test_scene_change_sampling(self, animated_gif):
+        """Only frames that differ enough from the last kept frame should be sampled"""
+        sampled = [frame.index for frame in sample_frames(iter_frames(animated_gif), scene_threshold=15)]
+        assert sampled[0] == 0
+        assert 6 in sampled
+        assert len(sampled) < 6
+        assert len(list(sample_frames(iter_frames(animated_gif), max_frames=5))) == 5
+
+    def test_invalid_input(self):
+        """Bytes that are neither an image nor a video should be rejected"""
+        with pytest.raises(ValueError):
+            list(iter_frames(b"not a clip" * 50))
+
+
+class TestClipProcessing:
+    """Test clip-level analysis and re-encoding"""
+
+    def test_analyze_frames_aggregates(self, animated_gif):
+        """Clip stats should summarise the per-frame metrics and merge their histograms"""
+        result = analyze_frames(animated_gif)
+        assert result["clip_info"]["analyzed_frames"] == 12
+        brightness = [frame["analysis"]["brightness"] for frame in result["frames"]]
+        assert result["summary"]["brightness"]["min"] == min(brightness)
+        assert result["summary"]["brightness"]["max"] == max(brightness)
+        # Equal-sized frames, so the merged histogram's mean is the mean of the frame means
+        assert result["histogram"]["mean"] / 255 * 100 == pytest.approx(np.mean(brightness), abs=0.05)
+
+    def test_analyze_matches_single_frame(self, animated_gif):
+        """Per-frame metrics should equal a standalone analysis of that frame"""
+        first = next(iter_frames(animated_gif))
+        result = analyze_frames(animated_gif, max_frames=1)
+        assert result["frames"][0]["analysis"] == ImageAnalysis(first.image).to_dict("count")
+
+    @pytest.mark.parametrize("image_format", ["webp", "tiff"])
+    def test_transform_animation(self, animated_gif, image_format):
+        """Transformed frames should be re-encoded as a multi-frame image"""
+        body, count, size = transform_frames(
+            animated_gif, lambda image: cv2.resize(image, (40, 30)), image_format, step=2
+        )
+        assert (count, size) == (6, (40, 30))
+        with Image.open(io.BytesIO(body)) as output:
+            assert output.n_frames == 6
+            assert output.size == (40, 30)
+
+    def test_webp_without_streaming_encoder(self, animated_gif, monkeypatch):
+        """Without Pillow's streaming encoder, animations should still encode through save_all"""
+        from src.core import frames
+
+        monkeypatch.setattr(frames, "_webp_anim_module", lambda: None)
+        body, count, _ = transform_frames(animated_gif, lambda image: image, "webp", step=3)
+        with Image.open(io.BytesIO(body)) as output:
+            assert output.n_frames == count == 4
+
+    def test_transform_video_to_mp4(self, video_clip):
+        """Videos should re-encode to MPEG-4"""
+        body, count, size = transform_frames(video_clip, lambda image: image[:30, :40], "mp4")
+        assert (count, size) == (12, (40, 30))
+        assert body[4:8] == b"ftyp"
+
+    def test_unknown_format(self, animated_gif):
+        """Only the multi-frame containers should be accepted"""
+        with pytest.raises(ValueError):
+            transform_frames(animated_gif, lambda image: image, "jpeg")
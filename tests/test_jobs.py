@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+
+import pytest
+
+from src.core.executor import ExecutorSaturated
+from src.core.jobs import JobManager, JobStore, owner_alive, process_owner, run_tiled
+
+
+def wait_for(manager, job_id, timeout=10.0):
+    """Poll a job until it leaves the queued/running states"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+@pytest.fixture
+def output_store(temp_upload_dir, monkeypatch):
+    """Store job outputs in a temporary directory"""
+    from src.utils import storage
+    monkeypatch.setattr(storage, "_store", storage.OutputStore(temp_upload_dir))
+    return storage._store
+
+
+@pytest.fixture
+def manager(output_store):
+    manager = JobManager(JobStore(":memory:"), workers=1, max_backlog=4)
+    yield manager
+    manager.shutdown()
+
+
+class TestJobManager:
+    """Test the background job queue"""
+
+    def test_analyze_job(self, manager, test_image_bytes):
+        """An analyze job should store the analysis as its result"""
+        job = wait_for(manager, manager.submit(test_image_bytes, "analyze"))
+        assert job["status"] == "succeeded"
+        assert job["result"]["image_info"]["width"] == 100
+        assert job["started"] >= job["created"]
+
+    def test_transform_job_writes_output(self, manager, output_store, test_image_bytes):
+        """Image operations should put their encoded result in the output store"""
+        job = wait_for(manager, manager.submit(test_image_bytes, "resize", {"width": 20, "height": 10, "format": "png"}))
+        assert job["result"]["output_size"] == {"width": 20, "height": 10}
+        assert job["result"]["output_name"].endswith(".png")
+        assert output_store.get(job["result"]["output_name"]) is not None
+
+    def test_large_image_jobs_run_tiled(self, manager, output_store, test_image_bytes, monkeypatch):
+        """Jobs on images above the tiling threshold should go through TiledImageAnalyzer"""
+        from src.core import jobs
+        calls = []
+        monkeypatch.setattr(jobs, "TILED_MIN_MEGAPIXELS", 0.001)
+        monkeypatch.setattr(jobs, "run_tiled", lambda *args: calls.append(args[1]) or run_tiled(*args))
+        job = wait_for(manager, manager.submit(test_image_bytes, "filter", {"type": "sepia", "format": "png"}))
+        assert job["status"] == "succeeded"
+        assert calls == ["filter"]
+        assert job["result"]["output_size"] == {"width": 100, "height": 100}
+
+    def test_run_tiled_matches_whole_image(self, sample_image):
+        """Tiled job operations should give the ImageAnalyzer results"""
+        import numpy as np
+        from src.core.image_processor import ImageAnalyzer
+        np.testing.assert_array_equal(run_tiled(sample_image, "filter", {"type": "sharpen"}),
+                                      ImageAnalyzer.apply_filter(sample_image, "sharpen"))
+        assert run_tiled(sample_image, "resize", {"percentage": 50}).shape == (50, 50, 3)
+
+    def test_invalid_jobs_rejected(self, manager, test_image_bytes):
+        """Unknown operations and missing parameters should fail at submission"""
+        with pytest.raises(ValueError):
+            manager.submit(test_image_bytes, "explode")
+        with pytest.raises(ValueError):
+            manager.submit(test_image_bytes, "rotate", {})
+        with pytest.raises(ValueError):
+            manager.submit(test_image_bytes, "analyze", {"objects": "all"})
+        with pytest.raises(ValueError):
+            manager.submit(test_image_bytes, "crop", {"x": [0], "y": 0, "width": 10, "height": 10})
+        with pytest.raises(ValueError):
+            manager.submit(test_image_bytes, "flip", {"direction": "vertical", "format": ["png"]})
+        with pytest.raises(ValueError):
+            manager.submit(test_image_bytes, "flip", {"direction": "vertical", "quality": True})
+
+    def test_failed_job_records_error(self, manager, invalid_file):
+        """Errors raised while processing should be reported on the job"""
+        job = wait_for(manager, manager.submit(invalid_file[0].read(), "enhance"))
+        assert job["status"] == "failed"
+        assert job["error"]
+
+    def test_priority_order_and_backlog(self, output_store, test_image_bytes):
+        """Higher priorities run first and a full backlog rejects submissions"""
+        manager = JobManager(JobStore(":memory:"), workers=0, max_backlog=3)
+        low = manager.submit(test_image_bytes, "analyze", priority=-1)
+        normal = manager.submit(test_image_bytes, "analyze")
+        high = manager.submit(test_image_bytes, "analyze", priority=5)
+        with pytest.raises(ExecutorSaturated):
+            manager.submit(test_image_bytes, "analyze")
+
+        worker = threading.Thread(target=manager._work, daemon=True)
+        manager._threads.append(worker)
+        worker.start()
+        jobs = [wait_for(manager, job_id) for job_id in (low, normal, high)]
+        manager.shutdown()
+        started = [job["started"] for job in jobs]
+        assert started[2] <= started[1] <= started[0]
+        assert manager.stats()["rejected"] == 1
+
+    def test_restart_marks_unfinished_jobs_failed(self, tmp_path):
+        """Jobs queued when the process died should not stay queued forever"""
+        path = str(tmp_path / "jobs.sqlite3")
+        store = JobStore(path, owner="999999999:0")
+        store.create("abc", "analyze", {}, 0)
+        store.close()
+        job = JobStore(path).get("abc")
+        assert job["status"] == "failed"
+        assert "restart" in job["error"]
+
+    def test_restart_keeps_live_workers_jobs(self, tmp_path):
+        """A starting worker should leave jobs of other running workers alone"""
+        path = str(tmp_path / "jobs.sqlite3")
+        live = JobStore(path, owner=process_owner(os.getppid()))
+        live.create("abc", "analyze", {}, 0)
+        assert owner_alive(live.owner)
+        assert JobStore(path).get("abc")["status"] == "queued"
+
+
+class TestJobEndpoints:
+    """Test the /jobs routes"""
+
+    @pytest.fixture(autouse=True)
+    def job_manager(self, manager, monkeypatch):
+        from src.core import jobs
+        monkeypatch.setattr(jobs, "_manager", manager)
+        return manager
+
+    def test_submit_and_poll(self, test_image_bytes):
+        """POST /jobs should answer 202 and GET /jobs/{id} the finished result"""
+        from fastapi.testclient import TestClient
+        from main import app
+
+        client = TestClient(app)
+        response = client.post(
+            "/jobs", data={"operation": "crop", "params": '{"x": 0, "y": 0, "width": 10, "height": 10}'},
+            files={"file": ("test.jpg", test_image_bytes, "image/jpeg")}
+        )
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        deadline = time.monotonic() + 10
+        while (body := client.get(f"/jobs/{job_id}").json())["status"] not in ("succeeded", "failed"):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert body["status"] == "succeeded"
+        assert client.get(body["result"]["download_url"]).status_code == 200
+
+    def test_bad_requests(self, test_image_bytes):
+        """Invalid params are 400 and unknown ids 404"""
+        from fastapi.testclient import TestClient
+        from main import app
+
+        client = TestClient(app)
+        response = client.post("/jobs", data={"operation": "resize", "params": "{}"},
+                               files={"file": ("test.jpg", test_image_bytes, "image/jpeg")})
+        assert response.status_code == 400
+        assert client.get("/jobs/unknown").status_code == 404
@@ -0,0 +1,58 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.utils import metrics
+from src.utils.metrics import Histogram, MetricsMiddleware, MetricsRegistry, stage
+
+
+class TestMetrics:
+    """Test the Prometheus metrics registry and stage timers"""
+
+    def test_histogram_render(self):
+        """Histograms should render cumulative buckets, sum and count"""
+        registry = MetricsRegistry()
+        histogram = registry.register(Histogram("test_seconds", "Test latency", (0.1, 1.0), ("stage",)))
+        histogram.observe(0.05, "decode")
+        histogram.observe(0.5, "decode")
+        text = registry.render()
+        assert "# TYPE test_seconds histogram" in text
+        assert 'test_seconds_bucket{stage="decode",le="0.1"} 1' in text
+        assert 'test_seconds_bucket{stage="decode",le="+Inf"} 2' in text
+        assert 'test_seconds_count{stage="decode"} 2' in text
+
+    def test_stage_disabled_is_shared_noop(self, monkeypatch):
+        """With metrics switched off, stage() should not allocate a timer"""
+        monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+        assert stage("decode") is stage("encode")
+
+    def test_server_timing_header(self):
+        """The middleware should report request stages as Server-Timing"""
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware, server_timing=True)
+
+        @app.get("/work")
+        def work():
+            with stage("decode"):
+                pass
+            return {}
+
+        response = TestClient(app).get("/work")
+        assert response.headers["server-timing"].startswith("decode;dur=")
+
+    def test_metrics_endpoint(self, test_image_bytes, tmp_path, monkeypatch):
+        """/metrics should expose stage timings after an analysis"""
+        from main import app
+        from src.core import similarity
+        from src.utils import cache, storage
+
+        # Keep the analysis from writing cache entries and the hash index into the working tree
+        monkeypatch.setattr(cache, "_cache", cache.ResultCache(directory=tmp_path / "cache"))
+        monkeypatch.setattr(similarity, "_index", similarity.PersistentHashIndex(tmp_path / "index.npz", save_every=0))
+        monkeypatch.setattr(storage, "_store", storage.OutputStore(tmp_path / "outputs"))
+        client = TestClient(app)
+        client.post("/analyze", files={"file": ("test.jpg", test_image_bytes, "image/jpeg")})
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert 'image_api_stage_seconds_count{stage="upload_receive"}' in response.text
+        assert 'image_api_stage_seconds_count{stage="upload_buffer"}' in response.text
+        assert 'route="/analyze"' in response.text
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from src.core.image_processor import ImageAnalyzer
+from src.core.pipeline import TransformPipeline
+
+
+@pytest.fixture
+def gradient_image():
+    """Smooth colour gradient so interpolation differences stay small"""
+    y, x = np.mgrid[0:120, 0:160]
+    img = np.dstack([x * 255 // 159, y * 255 // 119, (x + y) * 255 // 278]).astype(np.uint8)
+    return img
+
+
+class TestTransformPipeline:
+    """Test the fused transformation pipeline"""
+
+    def test_leading_crop_is_zero_copy_view(self, gradient_image):
+        """A crop with nothing pending should be a view on the decoded image"""
+        pipeline = TransformPipeline([
+            {"op": "crop", "x": 10, "y": 5, "width": 50, "height": 40},
+            {"op": "crop", "x": 5, "y": 5, "width": 20, "height": 20}
+        ])
+        assert pipeline.plan(gradient_image.shape) == [("view", 15, 10, 20, 20)]
+        result = pipeline.run(gradient_image)
+        assert np.shares_memory(result, gradient_image)
+        np.testing.assert_array_equal(result, gradient_image[10:30, 15:35])
+
+    def test_geometry_fused_into_single_warp(self, gradient_image):
+        """Consecutive resize/rotate/flip should become one warp step"""
+        pipeline = TransformPipeline([
+            {"op": "resize", "width": 80, "height": 60},
+            {"op": "flip", "direction": "horizontal"},
+            {"op": "flip", "direction": "vertical"}
+        ])
+        steps = pipeline.plan(gradient_image.shape)
+        assert [step[0] for step in steps] == ["warp"]
+        assert steps[0][2] == (80, 60)
+
+        fused = pipeline.run(gradient_image)
+        resized = ImageAnalyzer.resize_image(gradient_image, 80, 60)
+        sequential = ImageAnalyzer.flip_image(ImageAnalyzer.flip_image(resized, "horizontal"), "vertical")
+        assert fused.shape == sequential.shape
+        assert np.abs(fused.astype(int) - sequential.astype(int)).max() <= 2
+
+    def test_upscale_keeps_edges(self, gradient_image):
+        """Fused upscaling should replicate edges like cv2.resize"""
+        operations = [{"op": "resize", "width": 400, "height": 300}, {"op": "flip", "direction": "vertical"}]
+        fused = TransformPipeline(operations).run(gradient_image)
+        sequential = ImageAnalyzer.flip_image(ImageAnalyzer.resize_image(gradient_image, 400, 300), "vertical")
+        assert np.abs(fused.astype(int) - sequential.astype(int)).max() <= 2
+
+    def test_rotation_matches_sequential(self, gradient_image):
+        """A fused crop + rotate should match running the methods one by one"""
+        operations = [
+            {"op": "resize", "percentage": 50},
+            {"op": "rotate", "angle": 90},
+            {"op": "crop", "x": 10, "y": 10, "width": 40, "height": 30}
+        ]
+        fused = TransformPipeline(operations).run(gradient_image)
+        sequential = ImageAnalyzer.resize_by_percentage(gradient_image, 50)
+        sequential = ImageAnalyzer.rotate_image(sequential, 90)
+        sequential = ImageAnalyzer.crop_image(sequential, 10, 10, 40, 30)
+        assert fused.shape == sequential.shape
+        assert np.abs(fused.astype(int) - sequential.astype(int)).max() <= 2
+
+    def test_filter_splits_warps(self, gradient_image):
+        """Filters should run between warp groups"""
+        pipeline = TransformPipeline([
+            {"op": "rotate", "angle": 10},
+            {"op": "filter", "type": "grayscale"},
+            {"op": "flip", "direction": "vertical"}
+        ])
+        assert [step[0] for step in pipeline.plan(gradient_image.shape)] == ["warp", "filter", "warp"]
+
+    def test_single_operation_is_exact(self, gradient_image):
+        """A lone operation should produce the ImageAnalyzer output exactly"""
+        result = TransformPipeline([{"op": "rotate", "angle": 33}]).run(gradient_image)
+        np.testing.assert_array_equal(result, ImageAnalyzer.rotate_image(gradient_image, 33))
+
+    def test_apply_single(self, gradient_image):
+        """apply_single should match the ImageAnalyzer method of each operation"""
+        flipped = TransformPipeline.apply_single(gradient_image, {"op": "flip", "direction": "vertical"})
+        np.testing.assert_array_equal(flipped, ImageAnalyzer.flip_image(gradient_image, "vertical"))
+        sepia = TransformPipeline.apply_single(gradient_image, {"op": "filter", "type": "sepia"})
+        np.testing.assert_array_equal(sepia, ImageAnalyzer.apply_filter(gradient_image, "sepia"))
+
+    @pytest.mark.parametrize("operations", [
+        [],
+        [{"op": "explode"}],
+        [{"op": "filter", "type": "vintage"}],
+        [{"op": "rotate"}],
+        [{"op": "resize", "width": 10}],
+        [{"op": "resize", "width": [10], "height": 10}],
+        [{"op": "crop", "x": {}, "y": 0, "width": 10, "height": 10}],
+        [{"op": "rotate", "angle": "NaN"}],
+        [{"op": "resize", "percentage": True}],
+    ])
+    def test_invalid_operations(self, operations):
+        """Malformed operation lists should raise ValueError"""
+        with pytest.raises(ValueError):
+            TransformPipeline(operations)
+
+    def test_crop_out_of_bounds(self, gradient_image):
+        """Crop bounds are checked against the size at that point of the chain"""
+        pipeline = TransformPipeline([
+            {"op": "resize", "percentage": 50},
+            {"op": "crop", "x": 0, "y": 0, "width": 100, "height": 10}
+        ])
+        with pytest.raises(ValueError):
+            pipeline.plan(gradient_image.shape)
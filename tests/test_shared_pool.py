@@ -0,0 +1,100 @@
+import gc
+import os
+
+import numpy as np
+import pytest
+
+from src.core.image_processor import ImageAnalyzer
+from src.core.shared_pool import (
+    SEGMENT_PREFIX, SegmentPool, SharedArrayWorkers, segment_size, sweep_orphaned_segments
+)
+
+
+def own_segments() -> list:
+    return [name for name in os.listdir("/dev/shm") if name.startswith(f"{SEGMENT_PREFIX}_{os.getpid()}_")]
+
+
+@pytest.fixture(scope="module")
+def workers():
+    """One-process shared-memory pool, shut down after the module"""
+    pool = SharedArrayWorkers(max_workers=1)
+    yield pool
+    pool.shutdown()
+
+
+class TestSegmentPool:
+    """Test recycling and cleanup of shared-memory segments"""
+
+    def test_size_classes(self):
+        """Segments should be sized in powers of two from 1 MiB"""
+        assert segment_size(10) == 2 ** 20
+        assert segment_size(2 ** 20 + 1) == 2 ** 21
+        assert segment_size(2 ** 21) == 2 ** 21
+
+    def test_released_segments_are_reused(self):
+        """A released segment should be handed out again for the same size class"""
+        pool = SegmentPool()
+        first = pool.acquire(3 * 2 ** 20)
+        pool.release(first)
+        assert pool.acquire(2 ** 22).name == first.name
+        assert pool.stats()["reused"] == 1
+        pool.close()
+
+    def test_close_unlinks_everything(self):
+        """close() should unlink free and in-use segments"""
+        pool = SegmentPool(max_free_bytes=0)
+        pool.release(pool.acquire(100))
+        pool.acquire(100)
+        assert pool.stats()["unlinked"] == 1
+        pool.close()
+        assert own_segments() == []
+
+    def test_sweep_orphaned_segments(self, tmp_path):
+        """Segments of owners that no longer run should be removed, others kept"""
+        (tmp_path / f"{SEGMENT_PREFIX}_{2 ** 22 + 12345}_0").write_bytes(b"x")
+        (tmp_path / f"{SEGMENT_PREFIX}_{os.getpid()}_0").write_bytes(b"x")
+        (tmp_path / "other_1_0").write_bytes(b"x")
+        assert sweep_orphaned_segments(str(tmp_path)) == 1
+        assert len(list(tmp_path.iterdir())) == 2
+
+
+class TestSharedArrayWorkers:
+    """Test running transforms in worker processes through shared memory"""
+
+    def test_transform_matches_in_process(self, workers, sample_image):
+        """Results should equal the in-process transform and come back through shared memory"""
+        shared = workers.stats()["shared"]
+        result = workers.submit(ImageAnalyzer.rotate_image, sample_image, 30).result()
+        assert np.array_equal(result, ImageAnalyzer.rotate_image(sample_image, 30))
+        assert workers.stats()["shared"] == shared + 1
+
+    def test_result_segment_recycled(self, workers, sample_image):
+        """The result's segment should return to the pool when the array is collected"""
+        result = workers.submit(ImageAnalyzer.flip_image, sample_image, "vertical").result()
+        free = workers.stats()["free_segments"]
+        del result
+        gc.collect()
+        assert workers.stats()["free_segments"] == free + 1
+
+    def test_oversized_result_is_pickled(self, workers, sample_image):
+        """Results larger than out_nbytes should still arrive, by pickling"""
+        pickled = workers.stats()["pickled"]
+        result = workers.submit(ImageAnalyzer.resize_image, sample_image, 400, 300, out_nbytes=100).result()
+        assert result.shape == (300, 400, 3)
+        assert workers.stats()["pickled"] == pickled + 1
+
+    def test_decode(self, workers, test_image_bytes):
+        """Encoded images should decode in the worker"""
+        image = workers.decode(test_image_bytes).result()
+        assert image.shape == (100, 100, 3)
+        with pytest.raises(ValueError):
+            workers.decode(b"not an image").result()
+
+    def test_errors_release_segments(self, workers, sample_image):
+        """A failing task should raise and hand its segments back"""
+        with pytest.raises(ValueError):
+            workers.submit(ImageAnalyzer.resize_image, sample_image, 0, 0).result()
+        # Results of earlier tests may sit in reference cycles (pytest.raises keeps frames alive)
+        gc.collect()
+        stats = workers.stats()
+        assert stats["segments"] == stats["free_segments"]
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from src.core.similarity import MAX_PENDING, HashIndex, PersistentHashIndex, popcount
+
+
+@pytest.fixture
+def random_hashes():
+    rng = np.random.default_rng(7)
+    return rng.integers(0, 2 ** 63, 5000, dtype=np.uint64) * np.uint64(2) + rng.integers(0, 2, 5000, dtype=np.uint64)
+
+
+def brute_force(hashes, value, max_distance):
+    distances = popcount(hashes ^ np.uint64(value))
+    return sorted(np.nonzero(distances <= max_distance)[0].tolist())
+
+
+class TestHashIndex:
+    """Test the multi-index-hashing perceptual hash index"""
+
+    def test_matches_brute_force(self, random_hashes):
+        """Lookups should find exactly the entries a linear scan finds, before and after rebuilds"""
+        index = HashIndex()
+        for position, value in enumerate(random_hashes.tolist()):
+            index.add(value, str(position))
+        index._rebuild()
+        rng = np.random.default_rng(1)
+        for max_distance in (0, 3, 8, 13):
+            for position in rng.integers(0, len(random_hashes), 10).tolist():
+                # Flip a few bits so the query is near, but not equal to, an entry
+                value = int(random_hashes[position]) ^ 0b1000_0000_0001_0001
+                found = sorted(int(match["id"]) for match in index.query(value, max_distance, limit=len(random_hashes)))
+                assert found == brute_force(random_hashes, value, max_distance)
+
+    def test_nearest_first_and_limit(self):
+        """Results should be ordered by distance and capped at the limit"""
+        index = HashIndex()
+        index.add(0b111, "three")
+        index.add(0b1, "one")
+        index.add(0, "zero")
+        assert [match["id"] for match in index.query(0, 3)] == ["zero", "one", "three"]
+        assert [match["id"] for match in index.query(0, 3, limit=1)] == ["zero"]
+        with pytest.raises(ValueError):
+            index.query(0, 40)
+
+    def test_duplicate_ids_not_added_twice(self):
+        """Re-adding the same id with the same hash should be a no-op"""
+        index = HashIndex()
+        assert index.add(42, "a")
+        assert not index.add(42, "a")
+        assert index.add(42, "b")
+        assert len(index) == 2
+
+    def test_rebuild_after_pending_limit(self):
+        """Crossing MAX_PENDING should move entries into the sorted tables"""
+        index = HashIndex()
+        for value in range(MAX_PENDING + 1):
+            index.add(value << 20, str(value))
+        assert index._indexed == len(index)
+        assert index.query(5 << 20, 0)[0]["id"] == "5"
+
+    def test_save_and_load(self, tmp_path, random_hashes):
+        """A saved index should reload with the same entries and names"""
+        index = HashIndex()
+        for position, value in enumerate(random_hashes[:100].tolist()):
+            index.add(value, f"id{position}", f"näme{position}.jpg")
+        index.save(tmp_path / "index.npz")
+
+        loaded = HashIndex.load(tmp_path / "index.npz")
+        assert len(loaded) == 100
+        assert loaded.query(int(random_hashes[42]), 0) == index.query(int(random_hashes[42]), 0)
+        assert loaded.names[99] == "näme99.jpg"
+
+    def test_persistent_index_saves_periodically(self, tmp_path):
+        """PersistentHashIndex should save every save_every additions and on flush"""
+        path = tmp_path / "index.npz"
+        index = PersistentHashIndex(path, save_every=2)
+        index.add(1, "a")
+        assert not path.exists()
+        index.add(2, "b")
+        assert path.exists()
+        index.add(3, "c")
+        index.flush()
+        assert len(PersistentHashIndex(path)) == 3
+
+    def test_processes_sharing_a_file_merge_on_save(self, tmp_path):
+        """Saves from several indexes on one file should keep every index's entries"""
+        path = tmp_path / "index.npz"
+        first = PersistentHashIndex(path, save_every=0)
+        second = PersistentHashIndex(path, save_every=0)
+        first.add(1, "a")
+        second.add(2, "b")
+        first.flush()
+        second.flush()
+        first.add(3, "c")
+        first.flush()
+        reloaded = PersistentHashIndex(path)
+        assert sorted(reloaded.ids) == ["a", "b", "c"]
+        assert len(first) == 3
@@ -0,0 +1,85 @@
+import subprocess
+import sys
+from collections import Counter
+
+from fastapi.testclient import TestClient
+
+from main import create_app
+from src.core.executor import BoundedExecutor
+from src.core.warmup import warm_up
+from src.utils.startup import StartupTimer
+
+
+class TestStartup:
+    """Test lazy imports, the app factory and start-up timing"""
+
+    def test_import_defers_heavy_modules(self):
+        """Importing the app should not load OpenCV or NumPy"""
+        code = (
+            "import main, src.core.tiling\n"
+            "from src.utils.lazy import is_loaded\n"
+            "print(any(is_loaded(name) for name in ('cv2', 'numpy')))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == "False"
+
+    def test_concurrent_first_use(self):
+        """Many threads touching lazy modules at once should all see the loaded module"""
+        code = (
+            "import threading\n"
+            "from src.utils.lazy import lazy_import\n"
+            "np, cv2 = lazy_import('numpy'), lazy_import('cv2')\n"
+            "barrier, errors = threading.Barrier(16), []\n"
+            "def touch():\n"
+            "    barrier.wait()\n"
+            "    try:\n"
+            "        np.zeros(3), cv2.IMREAD_COLOR\n"
+            "    except Exception as e:\n"
+            "        errors.append(e)\n"
+            "threads = [threading.Thread(target=touch) for _ in range(16)]\n"
+            "for thread in threads: thread.start()\n"
+            "for thread in threads: thread.join()\n"
+            "print(len(errors))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == "0"
+
+    def test_routers_included_once(self):
+        """create_app() should include each router exactly once"""
+        app = create_app(warmup=False)
+        included = Counter(id(route.original_router) for route in app.routes if hasattr(route, "original_router"))
+        assert len(included) == 5
+        assert max(included.values()) == 1
+        assert "/analyze" in app.openapi()["paths"]
+
+    def test_startup_stats(self):
+        """Warm-up timings and the first request should appear in /startup/stats"""
+        with TestClient(create_app(warmup=True)) as client:
+            client.get("/health")
+            stats = client.get("/startup/stats").json()
+        assert stats["imported_ms"] <= stats["app_created_ms"] <= stats["ready_ms"]
+        assert stats["first_request_ms"] is not None
+        assert set(stats["warmup"]) == {"imports", "codecs", "metrics", "thread_pools", "caches"}
+
+    def test_timer_marks_once(self):
+        """Each phase should keep its first timestamp"""
+        timer = StartupTimer()
+        timer.mark("ready")
+        first = timer.stats()["ready_ms"]
+        timer.mark("ready")
+        assert timer.stats()["ready_ms"] == first
+        assert timer.stats()["first_request_ms"] is None
+
+    def test_warm_up_timings(self):
+        """warm_up() should report a duration for each step"""
+        timings = warm_up()
+        assert all(value >= 0 for value in timings.values())
+
+    def test_prestart_spawns_all_workers(self):
+        """prestart() should start every worker thread"""
+        executor = BoundedExecutor(max_workers=3, max_queue=3)
+        try:
+            executor.prestart()
+            assert len(executor._pool._threads) == 3
+        finally:
+            executor.shutdown()
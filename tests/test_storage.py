@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from src.utils.storage import OutputStore, OutputTooLarge
+
+
+class TestOutputStore:
+    """Test the managed store of transformation outputs"""
+
+    def test_put_and_get(self, temp_upload_dir):
+        """Stored outputs should be indexed and written to disk"""
+        store = OutputStore(temp_upload_dir, ttl_seconds=60, max_bytes=1000)
+        stored = store.put("a_resized.jpg", b"jpeg bytes")
+        assert store.get("a_resized.jpg") is stored
+        assert store.path(stored).read_bytes() == b"jpeg bytes"
+        assert store.get("other.jpg") is None
+        assert store.stats()["bytes"] == len(b"jpeg bytes")
+
+    def test_quota_evicts_oldest(self, temp_upload_dir):
+        """Exceeding the size quota should delete the oldest outputs first"""
+        store = OutputStore(temp_upload_dir, ttl_seconds=0, max_bytes=25)
+        for name in ("a.jpg", "b.jpg", "c.jpg"):
+            store.put(name, b"x" * 10)
+        assert store.get("a.jpg") is None
+        assert not (temp_upload_dir / "a.jpg").exists()
+        assert store.get("c.jpg") is not None
+        assert store.stats()["evictions"] == 1
+
+    def test_output_over_quota_rejected(self, temp_upload_dir):
+        """An output larger than the whole quota should be refused without evicting others"""
+        store = OutputStore(temp_upload_dir, ttl_seconds=0, max_bytes=25)
+        store.put("a.jpg", b"x" * 10)
+        with pytest.raises(OutputTooLarge):
+            store.put("big.jpg", b"x" * 26)
+        assert not (temp_upload_dir / "big.jpg").exists()
+        assert store.get("a.jpg") is not None
+
+    def test_sweep_removes_expired(self, temp_upload_dir):
+        """The sweeper should delete outputs older than the TTL"""
+        store = OutputStore(temp_upload_dir, ttl_seconds=60, max_bytes=1000)
+        old = store.put("old.jpg", b"old")
+        store.put("new.jpg", b"new")
+        old.created -= 120
+        assert store.get("old.jpg") is None
+        assert store.sweep() == 1
+        assert not (temp_upload_dir / "old.jpg").exists()
+        assert store.get("new.jpg") is not None
+
+    def test_index_rebuilt_from_directory(self, temp_upload_dir):
+        """Existing outputs should be indexed in age order; other files ignored"""
+        (temp_upload_dir / "old.png").write_bytes(b"1234")
+        os.utime(temp_upload_dir / "old.png", (1, 1))
+        (temp_upload_dir / "new.webp").write_bytes(b"5678")
+        (temp_upload_dir / "notes.txt").write_bytes(b"ignored")
+        (temp_upload_dir / ".cache").mkdir()
+
+        store = OutputStore(temp_upload_dir, ttl_seconds=0, max_bytes=6)
+        assert store.stats()["objects"] == 2
+        store.sweep()
+        assert store.get("old.png") is None
+        assert store.get("new.webp") is not None
+        assert (temp_upload_dir / "notes.txt").exists()
@@ -0,0 +1,98 @@
+import asyncio
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from main import app
+from src.core.image_processor import ImageAnalysis
+from src.core.stream import LatestFrame, QualityEMA, StreamAnalyzer
+
+
+@pytest.fixture
+def textured_image():
+    """Blurred noise image with real blur, brightness and contrast values"""
+    rng = np.random.default_rng(3)
+    return cv2.GaussianBlur(rng.integers(0, 256, (120, 160, 3), dtype=np.uint8), (3, 3), 0)
+
+
+class TestStreamAnalyzer:
+    """Test per-frame stream analysis"""
+
+    def test_matches_image_analysis(self, textured_image):
+        """Metrics should equal ImageAnalysis on the same gray plane"""
+        gray = cv2.cvtColor(textured_image, cv2.COLOR_BGR2GRAY)
+        expected = ImageAnalysis(gray).to_dict("count")
+        encoded = cv2.imencode(".png", gray)[1].tobytes()
+        assert StreamAnalyzer().process(encoded)["analysis"] == expected
+        raw = StreamAnalyzer("bgr", 160, 120).process(textured_image.tobytes())
+        assert raw["analysis"] == ImageAnalysis(textured_image).to_dict("count")
+
+    def test_buffers_reused(self, textured_image):
+        """The Laplacian buffer should be allocated once per frame size"""
+        analyzer = StreamAnalyzer("bgr", 160, 120)
+        analyzer.process(textured_image.tobytes())
+        buffer = analyzer._laplacian
+        analyzer.process(textured_image[::-1].copy().tobytes())
+        assert analyzer._laplacian is buffer
+
+    def test_invalid_frames(self):
+        """Wrongly sized raw frames and bad settings should raise ValueError"""
+        with pytest.raises(ValueError):
+            StreamAnalyzer("gray", 10, 10).process(b"\x00" * 99)
+        with pytest.raises(ValueError):
+            StreamAnalyzer("gray")
+        with pytest.raises(ValueError):
+            StreamAnalyzer().process(b"not an image")
+
+    def test_ema(self):
+        """The moving average should start at the first value and move toward new ones"""
+        ema = QualityEMA(alpha=0.5)
+        ema.update({"blur_score": 10, "brightness": 50, "contrast": 20})
+        ema.update({"blur_score": 30, "brightness": 50, "contrast": 20})
+        summary = ema.to_dict()
+        assert summary["blur_score"]["mean"] == 20
+        assert summary["blur_score"]["std"] == 10
+        assert summary["brightness"]["std"] == 0
+        assert summary["frames"] == 2
+
+
+class TestLatestFrame:
+    """Test the drop-stale-frames mailbox"""
+
+    def test_keeps_newest_frame(self):
+        """Frames arriving while one is pending should replace it"""
+        async def main():
+            slot = LatestFrame()
+            for data in (b"a", b"b", b"c"):
+                slot.put(data)
+            frame = await slot.take()
+            slot.close()
+            return frame, await slot.take(), slot.dropped
+
+        assert asyncio.run(main()) == ((3, b"c"), None, 2)
+
+
+class TestStreamEndpoint:
+    """Test the /ws/analyze WebSocket"""
+
+    def test_frames_answered(self, textured_image):
+        """Each binary frame should get metrics and running averages"""
+        encoded = cv2.imencode(".jpg", textured_image)[1].tobytes()
+        with TestClient(app).websocket_connect("/ws/analyze") as websocket:
+            for _ in range(2):
+                websocket.send_bytes(encoded)
+                reply = websocket.receive_json()
+                assert reply["analysis"]["quality_rating"] in {"Excellent", "Good", "Fair", "Poor"}
+            assert reply["frame"] == 2
+            assert reply["ema"]["frames"] == 2
+            websocket.send_bytes(b"garbage")
+            assert "error" in websocket.receive_json()
+
+    def test_invalid_settings_rejected(self):
+        """Unknown frame formats should close the connection"""
+        with pytest.raises(WebSocketDisconnect):
+            with TestClient(app).websocket_connect("/ws/analyze?format=yuv") as websocket:
+                websocket.receive_json()
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import cv2
+
+from src.core.image_processor import FILTER_TYPES, ImageAnalysis, ImageAnalyzer
+from src.core.tiling import RunningMoments, TiledImageAnalyzer, iter_tiles
+
+
+@pytest.fixture
+def large_image():
+    """Textured image spanning several small tiles"""
+    rng = np.random.default_rng(1)
+    img = rng.integers(0, 256, (130, 170, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(img, (5, 5), 0)
+
+
+@pytest.fixture
+def tiled():
+    """Tiled analyzer with small tiles and memmap scratch outputs"""
+    return TiledImageAnalyzer(tile_size=48)
+
+
+class TestTiledImageAnalyzer:
+    """Tiled processing should match whole-image results"""
+
+    def test_iter_tiles_covers_image(self):
+        """Tiles should cover every pixel exactly once"""
+        coverage = np.zeros((130, 170), dtype=int)
+        for y0, y1, x0, x1 in iter_tiles(130, 170, 48):
+            coverage[y0:y1, x0:x1] += 1
+        assert (coverage == 1).all()
+
+    @pytest.mark.parametrize("filter_type", FILTER_TYPES)
+    def test_filters_match_full_image(self, tiled, large_image, filter_type):
+        """Halo overlap should make tiled filters seamless"""
+        result = tiled.apply_filter(large_image, filter_type)
+        assert isinstance(result, np.memmap)
+        np.testing.assert_array_equal(result, ImageAnalyzer.apply_filter(large_image, filter_type))
+
+    def test_rotate_matches_full_image(self, tiled, large_image):
+        """Tiled rotation should match rotate_image"""
+        result = tiled.rotate_image(large_image, 30)
+        expected = ImageAnalyzer.rotate_image(large_image, 30)
+        assert np.abs(result.astype(int) - expected.astype(int)).max() <= 1
+
+    def test_resize_matches_full_image(self, large_image):
+        """Tiled resize should match resize_image"""
+        result = TiledImageAnalyzer(tile_size=32, use_memmap=False).resize_image(large_image, 90, 200)
+        expected = ImageAnalyzer.resize_image(large_image, 90, 200)
+        assert result.shape == expected.shape
+        assert np.abs(result.astype(int) - expected.astype(int)).max() <= 2
+
+    def test_metrics_match_full_image(self, tiled, large_image):
+        """Metrics merged from tile moments should match ImageAnalysis"""
+        metrics = tiled.analyze(large_image)
+        analysis = ImageAnalysis(large_image)
+        assert metrics["brightness"] == pytest.approx(analysis.brightness, abs=0.01)
+        assert metrics["contrast"] == pytest.approx(analysis.contrast, abs=0.01)
+        assert metrics["blur_score"] == pytest.approx(analysis.blur_score, abs=0.01)
+        assert metrics["histogram"] == analysis.histogram.summary()
+
+    def test_running_moments_merge(self):
+        """Merged moments should equal those of the concatenated data"""
+        rng = np.random.default_rng(2)
+        a, b = rng.normal(5, 2, (10, 7)), rng.normal(-3, 4, (4, 7))
+        merged = RunningMoments.of(a).merge(RunningMoments.of(b))
+        combined = np.concatenate([a, b])
+        assert merged.mean == pytest.approx(combined.mean())
+        assert merged.variance == pytest.approx(combined.var())